@@ -5,24 +5,33 @@ This file connects to our XYZGym.sqlite database and executes 6 different querie
 based on the command-line arguments and prints the results.
 """
 
+import os
 import sqlite3
 from sqlite3 import Error
 import sys
 
-def create_connection(db_file="XYZGym.sqlite"):
+# Shared helpers live in the xyzgym package at the root of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from xyzgym import expiry, profiles, queries
+from xyzgym.attendance_index import member_rows, warm_index
+from xyzgym.render import render
+
+def create_connection(db_file="XYZGym.sqlite", profile=profiles.DEFAULT_PROFILE):
     """
     Create and return a connection to the SQLite database.
-    If the database file does not exist, it will be created.
+    If the database file does not exist, it will be created
+    (except with the read-only "reporting" profile).
+
+    The connection profile sets journal mode, cache, mmap, etc.
+    (see xyzgym/profiles.py). Foreign keys are always enabled and
+    pending schema migrations are applied.
     """
     conn = None
     try:
         # Connect to the database (or create it if it doesn't exist)
-        conn = sqlite3.connect(db_file)
-        # Enable foreign keys support - very important for our relational constraints
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
+        conn = profiles.connect(db_file, profile)
         print(f"[INFO] Connection established: SQLite version {sqlite3.version}")
-    except Error as e:
+    except (Error, ValueError) as e:
         # Inform us if there's any error when connecting
         print(f"[ERROR] Could not connect to database: {e}")
     return conn
@@ -39,21 +48,14 @@ def query1(conn):
     Retrieve a list of all gym members.
     Display member name, email, age, and membership plan.
     """
-    sql = """
-        SELECT m.name, m.email, m.age, mp.planType
-        FROM Member m
-        JOIN Payment p ON m.memberId = p.memberId
-        JOIN MembershipPlan mp ON p.planId = mp.planId;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()  # fetch all rows returned by the query
-        print("[INFO] Query 1: List of all gym members")
-        print("Member Name | Email | Age | Membership Plan")
-        print("------------------------------------------------")
-        for row in rows:
-            print(" | ".join(str(col) for col in row))
+        # SQL lives in the query registry (xyzgym/queries.py)
+        cursor = queries.execute(conn, "report.members_with_plans")
+        # Stream the rows in batches instead of loading them all at once
+        render(cursor,
+               title="[INFO] Query 1: List of all gym members",
+               header=["Member Name | Email | Age | Membership Plan",
+                       "------------------------------------------------"])
     except Error as e:
         print(f"[ERROR] Query 1 failed: {e}")
 
@@ -62,21 +64,14 @@ def query2(conn):
     Query 2:
     Count the number of classes available at each gym facility.
     """
-    sql = """
-        SELECT gf.location, COUNT(c.classId) AS class_count
-        FROM Class c
-        JOIN GymFacility gf ON c.gymID = gf.gymId
-        GROUP BY gf.gymId;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        print("[INFO] Query 2: Count of classes at each gym facility")
-        print("Gym Location | Number of Classes")
-        print("-------------------------------------")
-        for row in rows:
-            print(" | ".join(str(col) for col in row))
+        # Per-gym counts kept by the summary triggers, served from the
+        # result cache until the data changes
+        cursor = queries.execute(conn, "report.classes_per_gym")
+        render(cursor,
+               title="[INFO] Query 2: Count of classes at each gym facility",
+               header=["Gym Location | Number of Classes",
+                       "-------------------------------------"])
     except Error as e:
         print(f"[ERROR] Query 2 failed: {e}")
 
@@ -87,23 +82,17 @@ def query3(conn, class_id):
     Parameter:
       class_id (integer) - the ID of the class.
     """
-    sql = """
-        SELECT m.name
-        FROM Member m
-        JOIN Attends a ON m.memberId = a.memberId
-        WHERE a.classId = ?;
-    """
     try:
-        cursor = conn.cursor()
-        # Passing class_id as a parameter to avoid SQL injection
-        cursor.execute(sql, (class_id,))
-        rows = cursor.fetchall()
-        print(f"[INFO] Query 3: Members attending class {class_id}")
-        if rows:
-            for row in rows:
-                print(row[0])
+        index = warm_index(conn)
+        if index is not None:
+            # Members come from the in-process attendance index; only their
+            # names are looked up, by primary key
+            cursor = member_rows(conn, index.members_of(class_id), "m.name")
         else:
-            print("No members found for this class.")
+            cursor = queries.execute(conn, "report.class_members", (class_id,))
+        render(cursor,
+               title=f"[INFO] Query 3: Members attending class {class_id}",
+               empty="No members found for this class.")
     except Error as e:
         print(f"[ERROR] Query 3 failed: {e}")
 
@@ -114,21 +103,11 @@ def query4(conn, equipment_type):
     Parameter:
       equipment_type (string) - the type of equipment (e.g., Cardio, Strength).
     """
-    sql = """
-        SELECT name, type, quantity
-        FROM Equipment
-        WHERE type = ?;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (equipment_type,))
-        rows = cursor.fetchall()
-        print(f"[INFO] Query 4: Equipment of type '{equipment_type}'")
-        if rows:
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
-        else:
-            print(f"No equipment found of type '{equipment_type}'.")
+        cursor = queries.execute(conn, "report.equipment_by_type", (equipment_type,))
+        render(cursor,
+               title=f"[INFO] Query 4: Equipment of type '{equipment_type}'",
+               empty=f"No equipment found of type '{equipment_type}'.")
     except Error as e:
         print(f"[ERROR] Query 4 failed: {e}")
 
@@ -138,23 +117,14 @@ def query5(conn):
     Find all members with expired memberships.
     A membership is considered expired if membershipEndDate is before the current date.
     """
-    sql = """
-        SELECT memberId, name, membershipEndDate
-        FROM Member
-        WHERE membershipEndDate < date('now');
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        print("[INFO] Query 5: Members with expired memberships")
-        print("Member ID | Name | Membership End Date")
-        print("-------------------------------------------")
-        if rows:
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
-        else:
-            print("No expired memberships found.")
+        # Range lookup on the expiry calendar (end-date index)
+        cursor = expiry.expired(conn)
+        render(cursor,
+               title="[INFO] Query 5: Members with expired memberships",
+               header=["Member ID | Name | Membership End Date",
+                       "-------------------------------------------"],
+               empty="No expired memberships found.")
     except Error as e:
         print(f"[ERROR] Query 5 failed: {e}")
 
@@ -166,38 +136,37 @@ def query6(conn, instructor_id):
     Parameter:
       instructor_id (integer) - the ID of the instructor.
     """
-    sql = """
-        SELECT i.name, i.phone, c.className, c.classType, c.duration, c.classCapacity
-        FROM Class c
-        JOIN Instructor i ON c.instructorId = i.instructorId
-        WHERE i.instructorId = ?;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (instructor_id,))
-        rows = cursor.fetchall()
-        print(f"[INFO] Query 6: Classes taught by instructor {instructor_id}")
-        print("Instructor Name | Phone | Class Name | Class Type | Duration | Capacity")
-        print("----------------------------------------------------------------------------")
-        if rows:
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
-        else:
-            print("No classes found for this instructor.")
+        cursor = queries.execute(conn, "report.classes_by_instructor", (instructor_id,))
+        render(cursor,
+               title=f"[INFO] Query 6: Classes taught by instructor {instructor_id}",
+               header=["Instructor Name | Phone | Class Name | Class Type | Duration | Capacity",
+                       "----------------------------------------------------------------------------"],
+               empty="No classes found for this instructor.")
     except Error as e:
         print(f"[ERROR] Query 6 failed: {e}")
 
 # --- Placeholder for future queries (7-10) ---
 
 def main():
+    # Optional connection profile: --profile interactive|reporting|bulk-load
+    profile = profiles.DEFAULT_PROFILE
+    if "--profile" in sys.argv:
+        position = sys.argv.index("--profile")
+        if position + 1 >= len(sys.argv):
+            print("Usage: python file.py [--profile NAME] <query_number> [additional parameters]")
+            sys.exit(1)
+        profile = sys.argv[position + 1]
+        del sys.argv[position:position + 2]
+
     # Ensure the user provided at least the query number argument
     if len(sys.argv) < 2:
-        print("Usage: python file.py <query_number> [additional parameters]")
+        print("Usage: python file.py [--profile NAME] <query_number> [additional parameters]")
         sys.exit(1)
     
     query_number = sys.argv[1]
     # Establish connection to the database
-    conn = create_connection()
+    conn = create_connection(profile=profile)
     
     if conn is None:
         print("[ERROR] Failed to establish database connection.")
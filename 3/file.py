@@ -8,24 +8,39 @@ This file connects our XYZGym.sqlite database and executes 10 different
 queries based onthe command-line arguments and prints the results.
 """
 
+import os
+import re
 import sqlite3
 from sqlite3 import Error
 import sys
+import time
+from contextlib import redirect_stdout
 
-def create_connection(db_file="XYZGym.sqlite"):
+# Shared helpers live in the xyzgym package at the root of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from xyzgym import age_stats, expiry, instrument, profiles, queries, rollups
+from xyzgym.attendance_index import member_rows, warm_index
+from xyzgym.render import output_stream, render, TextWriter, WRITERS
+
+# Writer for machine-readable output (--format csv|tsv|jsonl); None prints text
+OUTPUT_WRITER = None
+
+def create_connection(db_file="XYZGym.sqlite", profile=profiles.DEFAULT_PROFILE):
     """
     Create and return a connection to the SQLite database.
-    If the database file does not exist, it will be created.
+    If the database file does not exist, it will be created
+    (except with the read-only "reporting" profile).
+
+    The connection profile sets journal mode, cache, mmap, etc.
+    (see xyzgym/profiles.py). Foreign keys are always enabled and
+    pending schema migrations are applied.
     """
     conn = None
     try:
         # Connect to the database (or create it if it doesn't exist)
-        conn = sqlite3.connect(db_file)
-        # Enable foreign keys support - very important for our relational constraints
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
+        conn = profiles.connect(db_file, profile)
         print(f"[INFO] Connection established: SQLite version {sqlite3.version}")
-    except Error as e:
+    except (Error, ValueError) as e:
         # Inform us if there's any error when connecting
         print(f"[ERROR] Could not connect to database: {e}")
     return conn
@@ -40,60 +55,58 @@ def close_connection(conn):
 
 
 
+def output_writer(row_format=None):
+    """
+    Returns the writer the queries render to: the --format writer if one
+    was chosen, else a TextWriter (with row_format, if given).
+    """
+    if OUTPUT_WRITER is not None:
+        return OUTPUT_WRITER
+    return TextWriter(row_format=row_format)
+
+
+
+@instrument.timed
 def query1(conn):
     """
     Query 1:
     Retrieve a list of all gym members.
     Display member name, email, age, and membership plan.
     """
-    # SQL query to join Member, Payment, and MembershipPlan tables
-    sql = """
-        SELECT m.name, m.email, m.age, mp.planType
-        FROM Member m
-        JOIN Payment p ON m.memberId = p.memberId
-        JOIN MembershipPlan mp ON p.planId = mp.planId;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()  # fetch all rows returned by the query
-        print("[INFO] Query 1: List of all gym members")
-        print("Member Name | Email | Age | Membership Plan")
-        print("------------------------------------------------")
-        # Loop through each row and print the columns
-        for row in rows:
-            print(" | ".join(str(col) for col in row))
+        # SQL lives in the query registry (xyzgym/queries.py)
+        cursor = queries.execute(conn, "report.members_with_plans")
+        # Stream the rows in batches instead of loading them all at once
+        render(cursor,
+               title="[INFO] Query 1: List of all gym members",
+               header=["Member Name | Email | Age | Membership Plan",
+                       "------------------------------------------------"],
+               writer=output_writer())
     except Error as e:
         print(f"[ERROR] Query 1 failed: {e}")
 
 
 
+@instrument.timed
 def query2(conn):
     """
     Query 2:
     Count the number of classes available at each gym facility.
     """
-    # SQL to count classes grouped by gym location
-    sql = """
-        SELECT gf.location, COUNT(c.classId) AS class_count
-        FROM Class c
-        JOIN GymFacility gf ON c.gymID = gf.gymId
-        GROUP BY gf.gymId;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        print("[INFO] Query 2: Count of classes at each gym facility")
-        print("Gym Location | Number of Classes")
-        print("-------------------------------------")
-        for row in rows:
-            print(" | ".join(str(col) for col in row))
+        # Served from the result cache until the data changes
+        cursor = queries.execute(conn, "report.classes_per_gym")
+        render(cursor,
+               title="[INFO] Query 2: Count of classes at each gym facility",
+               header=["Gym Location | Number of Classes",
+                       "-------------------------------------"],
+               writer=output_writer())
     except Error as e:
         print(f"[ERROR] Query 2 failed: {e}")
 
 
 
+@instrument.timed
 def query3(conn, class_id):
     """
     Query 3:
@@ -101,29 +114,24 @@ def query3(conn, class_id):
     Parameter:
       class_id (integer) - the ID of the class.
     """
-    # SQL to get member names for a given class
-    sql = """
-        SELECT m.name
-        FROM Member m
-        JOIN Attends a ON m.memberId = a.memberId
-        WHERE a.classId = ?;
-    """
     try:
-        cursor = conn.cursor()
-        # Passing class_id as a parameter to avoid SQL injection
-        cursor.execute(sql, (class_id,))
-        rows = cursor.fetchall()
-        print(f"[INFO] Query 3: Members attending class {class_id}")
-        if rows:
-            for row in rows:
-                print(row[0])
+        index = warm_index(conn)
+        if index is not None:
+            # Members come from the in-process attendance index; only their
+            # names are looked up, by primary key
+            cursor = member_rows(conn, index.members_of(class_id), "m.name")
         else:
-            print("No members found for this class.")
+            cursor = queries.execute(conn, "report.class_members", (class_id,))
+        render(cursor,
+               title=f"[INFO] Query 3: Members attending class {class_id}",
+               empty="No members found for this class.",
+               writer=output_writer())
     except Error as e:
         print(f"[ERROR] Query 3 failed: {e}")
 
 
 
+@instrument.timed
 def query4(conn, equipment_type):
     """
     Query 4:
@@ -131,56 +139,39 @@ def query4(conn, equipment_type):
     Parameter:
       equipment_type (string) - the type of equipment (e.g., Cardio, Strength).
     """
-    # SQL query to select equipment by type
-    sql = """
-        SELECT name, type, quantity
-        FROM Equipment
-        WHERE type = ?;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (equipment_type,))
-        rows = cursor.fetchall()
-        print(f"[INFO] Query 4: Equipment of type '{equipment_type}'")
-        if rows:
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
-        else:
-            print(f"No equipment found of type '{equipment_type}'.")
+        cursor = queries.execute(conn, "report.equipment_by_type", (equipment_type,))
+        render(cursor,
+               title=f"[INFO] Query 4: Equipment of type '{equipment_type}'",
+               empty=f"No equipment found of type '{equipment_type}'.",
+               writer=output_writer())
     except Error as e:
         print(f"[ERROR] Query 4 failed: {e}")
 
 
 
+@instrument.timed
 def query5(conn):
     """
     Query 5:
     Find all members with expired memberships.
     A membership is considered expired if membershipEndDate is before the current date.
     """
-    # SQL query to check membership end dates
-    sql = """
-        SELECT memberId, name, membershipEndDate
-        FROM Member
-        WHERE membershipEndDate < date('now');
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        print("[INFO] Query 5: Members with expired memberships")
-        print("Member ID | Name | Membership End Date")
-        print("-------------------------------------------")
-        if rows:
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
-        else:
-            print("No expired memberships found.")
+        # Range lookup on the expiry calendar (end-date index)
+        cursor = expiry.expired(conn)
+        render(cursor,
+               title="[INFO] Query 5: Members with expired memberships",
+               header=["Member ID | Name | Membership End Date",
+                       "-------------------------------------------"],
+               empty="No expired memberships found.",
+               writer=output_writer())
     except Error as e:
         print(f"[ERROR] Query 5 failed: {e}")
 
 
 
+@instrument.timed
 def query6(conn, instructor_id):
     """
     Query 6:
@@ -189,86 +180,85 @@ def query6(conn, instructor_id):
     Parameter:
       instructor_id (integer) - the ID of the instructor.
     """
-    # SQL join to retrieve classes for a given instructor
-    sql = """
-        SELECT i.name, i.phone, c.className, c.classType, c.duration, c.classCapacity
-        FROM Class c
-        JOIN Instructor i ON c.instructorId = i.instructorId
-        WHERE i.instructorId = ?;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql, (instructor_id,))
-        rows = cursor.fetchall()
-        print(f"[INFO] Query 6: Classes taught by instructor {instructor_id}")
-        print("Instructor Name | Phone | Class Name | Class Type | Duration | Capacity")
-        print("----------------------------------------------------------------------------")
-        if rows:
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
-        else:
-            print("No classes found for this instructor.")
+        cursor = queries.execute(conn, "report.classes_by_instructor", (instructor_id,))
+        render(cursor,
+               title=f"[INFO] Query 6: Classes taught by instructor {instructor_id}",
+               header=["Instructor Name | Phone | Class Name | Class Type | Duration | Capacity",
+                       "----------------------------------------------------------------------------"],
+               empty="No classes found for this instructor.",
+               writer=output_writer())
     except Error as e:
         print(f"[ERROR] Query 6 failed: {e}")
 
 
 
+@instrument.timed
 def query7(conn):
     """
     Query 7:
     Calculate the average age of members with active memberships and those with expired memberships.
     Active memberships: membershipEndDate >= date('now')
     Expired memberships: membershipEndDate < date('now')
+    Also shows age percentiles and a histogram of each group.
     """
     try:
-        cursor = conn.cursor()
-        # Calculate average age for active memberships
-        cursor.execute("SELECT AVG(age) FROM Member WHERE membershipEndDate >= date('now')")
-        active_avg = cursor.fetchone()[0]
-        
-        # Calculate average age for expired memberships
-        cursor.execute("SELECT AVG(age) FROM Member WHERE membershipEndDate < date('now')")
-        expired_avg = cursor.fetchone()[0]
-        
+        # Members per status and age, kept up to date by triggers
+        stats = age_stats.age_statistics(conn)
+        active = stats[age_stats.ACTIVE]
+        expired = stats[age_stats.EXPIRED]
+
+        if OUTPUT_WRITER is not None:
+            # Machine-readable output: one row per status
+            OUTPUT_WRITER.columns(["status", "members", "mean_age", "p25", "median", "p75", "p90"])
+            OUTPUT_WRITER.rows([(label, dist.members, dist.mean) + tuple(dist.percentile(p) for p in (25, 50, 75, 90))
+                                for label, dist in (("active", active), ("expired", expired))])
+            OUTPUT_WRITER.flush()
+            return
+
         print("[INFO] Query 7: Average age of members")
-        print(f"Active Memberships: {active_avg if active_avg is not None else 'N/A'}")
-        print(f"Expired Memberships: {expired_avg if expired_avg is not None else 'N/A'}")
+        print(f"Active Memberships: {active.mean if active.mean is not None else 'N/A'}")
+        print(f"Expired Memberships: {expired.mean if expired.mean is not None else 'N/A'}")
+
+        print("\nStatus | Members | P25 | Median | P75 | P90")
+        print("---------------------------------------------")
+        for label, dist in (("Active", active), ("Expired", expired)):
+            ages = [dist.percentile(p) for p in (25, 50, 75, 90)]
+            print(f"{label} | {dist.members} | " + " | ".join("N/A" if a is None else str(a) for a in ages))
+
+        active_bands = active.histogram()
+        expired_bands = expired.histogram()
+        print("\nAge | Active | Expired")
+        print("----------------------")
+        for start in sorted(active_bands.keys() | expired_bands.keys()):
+            print(f"{start}-{start + age_stats.HISTOGRAM_BAND - 1} | "
+                  f"{active_bands.get(start, 0)} | {expired_bands.get(start, 0)}")
     except Error as e:
         print(f"[ERROR] Query 7 failed: {e}")
 
 
 
+@instrument.timed
 def query8(conn):
     """
     Query 8:
     Find the top three instructors who teach the most classes along with the count of classes they teach.
     """
-    # SQL to group by instructor and count classes, then limit to the top three
-    sql = """
-        SELECT i.name, COUNT(c.classId) AS class_count
-        FROM Class c
-        JOIN Instructor i ON c.instructorId = i.instructorId
-        GROUP BY i.instructorId
-        ORDER BY class_count DESC
-        LIMIT 3;
-    """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        print("[INFO] Query 8: Top three instructors by number of classes taught")
-        print("Instructor Name | Number of Classes")
-        print("--------------------------------------")
-        if rows:
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
-        else:
-            print("No instructor data found.")
+        # Served from the result cache until the data changes
+        cursor = queries.execute(conn, "report.top_instructors")
+        render(cursor,
+               title="[INFO] Query 8: Top three instructors by number of classes taught",
+               header=["Instructor Name | Number of Classes",
+                       "--------------------------------------"],
+               empty="No instructor data found.",
+               writer=output_writer())
     except Error as e:
         print(f"[ERROR] Query 8 failed: {e}")
 
 
 
+@instrument.timed
 def query9(conn, class_type):
     """
     Query 9:
@@ -277,129 +267,214 @@ def query9(conn, class_type):
       class_type (string) - the type of the class (e.g., Yoga, HIIT).
     """
     try:
-        cursor = conn.cursor()
-        # First, determine the total number of classes available for the given type
-        cursor.execute("SELECT COUNT(*) FROM Class WHERE classType = ?", (class_type,))
-        total_classes = cursor.fetchone()[0]
+        index = warm_index(conn)
+        # First, determine the classes available for the given type
+        if index is not None:
+            total_classes = len(index.classes_of_type(class_type))
+        else:
+            total_classes = queries.execute(conn, "report.class_type_count", (class_type,)).fetchone()[0]
         if total_classes == 0:
             print(f"[INFO] No classes found of type '{class_type}'.")
             return
-        # SQL to find members who attended exactly the total count of classes of that type
-        sql = """
-            SELECT m.memberId, m.name
-            FROM Member m
-            JOIN Attends a ON m.memberId = a.memberId
-            JOIN Class c ON a.classId = c.classId
-            WHERE c.classType = ?
-            GROUP BY m.memberId, m.name
-            HAVING COUNT(DISTINCT c.classId) = ?;
-        """
-        cursor.execute(sql, (class_type, total_classes))
-        rows = cursor.fetchall()
-        print(f"[INFO] Query 9: Members who attended all classes of type '{class_type}'")
-        if rows:
-            for row in rows:
-                print(f"Member ID: {row[0]} | Name: {row[1]}")
+        if index is not None:
+            # Members who attended all of them: intersect the classes' member bitmaps
+            members = index.members_in_all(index.classes_of_type(class_type))
+            cursor = member_rows(conn, members, "m.memberId, m.name")
         else:
-            print("No member has attended all classes of this type.")
+            # Members who attended as many distinct classes of the type as there are
+            cursor = queries.execute(conn, "report.members_in_all_classes", (class_type, total_classes))
+        render(cursor,
+               title=f"[INFO] Query 9: Members who attended all classes of type '{class_type}'",
+               empty="No member has attended all classes of this type.",
+               writer=output_writer(row_format="Member ID: {} | Name: {}"))
     except Error as e:
         print(f"[ERROR] Query 9 failed: {e}")
 
 
 
-def query10(conn):
+@instrument.timed
+def query10(conn, window=rollups.DEFAULT_WINDOW):
     """
     Query 10:
-    Get all members who attended classes in the last month along with class names and types.
-    """
-    sql = """
-        SELECT m.name,
-               COUNT(*) AS total_classes,
-               GROUP_CONCAT(c.className, ', ') AS classes_attended,
-               GROUP_CONCAT(DISTINCT c.classType) AS class_types
-        FROM Attends a
-        JOIN Member m ON a.memberId = m.memberId
-        JOIN Class c ON a.classId = c.classId
-        WHERE a.attendanceDate >= date('now', '-1 month')
-        GROUP BY m.memberId, m.name;
+    Get all members who attended classes recently along with class names and types.
+    Parameter:
+      window (integer) - how many days back to look: 7, 30 or 90.
     """
     try:
-        cursor = conn.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
-        print("[INFO] Query 10: Recent class attendance (last month)")
-        if rows:
-            # Define fixed widths for each column
-            header = f"{'Member Name':<20} {'Total Classes Attended':<25} {'Classes Attended':<40} {'Class Types':<30}"
-            print(header)
-            print("=" * len(header))
-            for row in rows:
-                member_name, total_classes, classes_attended, class_types = row
-                print(f"{member_name:<20} {total_classes:<25} {classes_attended:<40} {class_types:<30}")
-        else:
-            print("No classes attended in the last month.")
-    except Error as e:
+        # One row per member and class, read from the daily rollups
+        cursor = rollups.recent_attendance(conn, window)
+        # Define fixed widths for each column (memberId and classId are not shown)
+        row_format = "{1:<20} {3:<25} {4:<12} {5:>8}"
+        header = "{:<20} {:<25} {:<12} {:>8}".format("Member Name", "Class Name", "Class Type", "Sessions")
+        render(cursor,
+               title=f"[INFO] Query 10: Recent class attendance (last {window} days)",
+               header=[header, "=" * len(header)],
+               header_if_rows=True,
+               empty=f"No classes attended in the last {window} days.",
+               writer=output_writer(row_format=row_format))
+    except (Error, ValueError) as e:
         print(f"[ERROR] Query 10 failed: {e}")
 
 
 
 
 
-def main():
-    # Ensure the user provided at least the query number argument
-    if len(sys.argv) < 2:
-        print("Usage: python QueryApp.py <query_number> [additional parameters]")
-        sys.exit(1)
-    
-    query_number = sys.argv[1]
+def run_query(conn, query_number, params):
+    """
+    Runs one query by number.
+    Parameter:
+      query_number (string) - "1" to "10".
+      params (list) - the query's parameters as strings, e.g. ["5"] for query 3.
+    Raises ValueError (with the usage line) if a required parameter is missing.
+    """
+    if query_number == '1':
+        query1(conn)
+    elif query_number == '2':
+        query2(conn)
+    elif query_number == '3':
+        if len(params) < 1:
+            raise ValueError("Usage: python QueryApp.py 3 <classId>")
+        # Convert argument to integer for the class ID
+        query3(conn, int(params[0]))
+    elif query_number == '4':
+        if len(params) < 1:
+            raise ValueError("Usage: python QueryApp.py 4 <equipment_type>")
+        query4(conn, params[0])
+    elif query_number == '5':
+        query5(conn)
+    elif query_number == '6':
+        if len(params) < 1:
+            raise ValueError("Usage: python QueryApp.py 6 <instructorId>")
+        query6(conn, int(params[0]))
+    elif query_number == '7':
+        query7(conn)
+    elif query_number == '8':
+        query8(conn)
+    elif query_number == '9':
+        if len(params) < 1:
+            raise ValueError("Usage: python QueryApp.py 9 <classType>")
+        query9(conn, params[0])
+    elif query_number == '10':
+        # Optional window in days: 7, 30 (default) or 90
+        window = int(params[0]) if params else rollups.DEFAULT_WINDOW
+        query10(conn, window)
+    else:
+        print("Invalid query number. Please provide a query number between 1 and 10.")
+
+
+
+def parse_batch(specs):
+    """
+    Turns batch entries such as "1", "3:5" or "9 Yoga" into
+    (query_number, params) pairs.
+    """
+    batch = []
+    for spec in specs:
+        parts = [p for p in re.split(r"[:\s]+", spec.strip()) if p]
+        if parts:
+            batch.append((parts[0], parts[1:]))
+    return batch
+
+
+
+def read_manifest(path):
+    """
+    Reads a batch manifest: one query per line ("3 5", "9 Yoga", "10 90"),
+    blank lines and lines starting with # are skipped.
+    """
+    with open(path, encoding="utf-8") as f:
+        return parse_batch(line for line in f if not line.lstrip().startswith("#"))
+
+
+
+def run_batch(conn, batch):
+    """
+    Runs several queries on one connection inside one read transaction,
+    so they all see the same snapshot of the database, then prints how
+    long each one took.
+    Parameter:
+      batch (list) - (query_number, params) pairs, see parse_batch().
+    """
+    batch_start = time.perf_counter()
+    if not conn.read_only:
+        # Bring the maintained tables up to date first, so nothing has to
+        # write inside the read transaction
+        age_stats.advance(conn)
+        rollups.refresh(conn)
+
+    timings = []
+    conn.execute("BEGIN")
+    try:
+        for query_number, params in batch:
+            start = time.perf_counter()
+            status = "ok"
+            if OUTPUT_WRITER is not None:
+                # JSON Lines: tag every record with the query it came from
+                OUTPUT_WRITER.fields = {"query": int(query_number) if query_number.isdigit() else query_number}
+                OUTPUT_WRITER.names = None
+            try:
+                run_query(conn, query_number, params)
+            except ValueError as e:
+                print(e)
+                status = "skipped"
+            timings.append((query_number, " ".join(params), time.perf_counter() - start, status))
+            print()
+    finally:
+        # End the read transaction
+        conn.commit()
+
+    print(f"[INFO] Batch summary: {len(timings)} queries")
+    print("Query | Parameters | Time (ms) | Status")
+    print("---------------------------------------")
+    for query_number, params, seconds, status in timings:
+        print(f"{query_number} | {params or '-'} | {seconds * 1000:.1f} | {status}")
+    print(f"Total: {(time.perf_counter() - batch_start) * 1000:.1f} ms")
+
+
+
+def pop_option(name, flag=False):
+    """
+    Removes an option from sys.argv and returns its value.
+    Parameter:
+      name (string) - the option, e.g. "--profile".
+      flag (bool) - the option takes no value; returns True if it was given.
+    Returns None if the option is absent (False for a flag).
+    """
+    if name not in sys.argv:
+        return False if flag else None
+    position = sys.argv.index(name)
+    if flag:
+        del sys.argv[position]
+        return True
+    if position + 1 >= len(sys.argv):
+        raise ValueError(f"{name} needs a value")
+    value = sys.argv[position + 1]
+    del sys.argv[position:position + 2]
+    return value
+
+
+
+def run_reports(profile, batch, query_number, params):
+    """
+    Connects, runs one query (or a batch) and closes the connection.
+    """
     # Establish connection to the database
-    conn = create_connection()
+    conn = create_connection(profile=profile)
     
     if conn is None:
         print("[ERROR] Failed to establish database connection.")
         sys.exit(1)
     
     try:
-        # Dispatch to the appropriate query based on the command-line argument.
-        if query_number == '1':
-            query1(conn)
-        elif query_number == '2':
-            query2(conn)
-        elif query_number == '3':
-            if len(sys.argv) < 3:
-                print("Usage: python QueryApp.py 3 <classId>")
-                sys.exit(1)
-            # Convert argument to integer for the class ID
-            class_id = int(sys.argv[2])
-            query3(conn, class_id)
-        elif query_number == '4':
-            if len(sys.argv) < 3:
-                print("Usage: python QueryApp.py 4 <equipment_type>")
-                sys.exit(1)
-            equipment_type = sys.argv[2]
-            query4(conn, equipment_type)
-        elif query_number == '5':
-            query5(conn)
-        elif query_number == '6':
-            if len(sys.argv) < 3:
-                print("Usage: python QueryApp.py 6 <instructorId>")
-                sys.exit(1)
-            instructor_id = int(sys.argv[2])
-            query6(conn, instructor_id)
-        elif query_number == '7':
-            query7(conn)
-        elif query_number == '8':
-            query8(conn)
-        elif query_number == '9':
-            if len(sys.argv) < 3:
-                print("Usage: python QueryApp.py 9 <classType>")
-                sys.exit(1)
-            class_type = sys.argv[2]
-            query9(conn, class_type)
-        elif query_number == '10':
-            query10(conn)
+        if batch is not None:
+            run_batch(conn, batch)
         else:
-            print("Invalid query number. Please provide a query number between 1 and 10.")
+            # Dispatch to the appropriate query based on the command-line argument.
+            try:
+                run_query(conn, query_number, params)
+            except ValueError as e:
+                print(e)
+                sys.exit(1)
     except Error as e:
         print(f"[ERROR] An error occurred: {e}")
     finally:
@@ -408,5 +483,78 @@ def main():
 
 
 
+def main():
+    global OUTPUT_WRITER
+    usage = ("Usage: python QueryApp.py [options] <query_number> [additional parameters]\n"
+             "       python QueryApp.py [options] --batch <query[:param]> ...\n"
+             "       python QueryApp.py [options] --manifest <file>\n"
+             "Options: --profile NAME, --format text|csv|tsv|jsonl, --output FILE, --gzip,\n"
+             "         --instrument [--slow-ms N] [--slow-log FILE]")
+    try:
+        # Optional connection profile: --profile interactive|reporting|bulk-load
+        profile = pop_option("--profile") or profiles.DEFAULT_PROFILE
+        # Optional output format and destination, e.g. --format csv --output q1.csv.gz --gzip
+        output_format = pop_option("--format") or "text"
+        output = pop_option("--output")
+        compress = pop_option("--gzip", flag=True)
+        # Optional query instrumentation, e.g. --instrument --slow-ms 50 --slow-log slow.log
+        instrumented = pop_option("--instrument", flag=True)
+        slow_ms = pop_option("--slow-ms")
+        slow_log = pop_option("--slow-log")
+        slow_ms = float(slow_ms) if slow_ms is not None else None
+    except ValueError:
+        print(usage)
+        sys.exit(1)
+    if output_format not in WRITERS:
+        print(f"[ERROR] Unknown format '{output_format}' (choose from {', '.join(WRITERS)})")
+        sys.exit(1)
+    if instrumented:
+        # The summary is printed at exit, on stderr when stdout carries data
+        instrument.enable(slow_ms, slow_log, at_exit=sys.stdout if output_format == "text" else sys.stderr)
+
+    # Ensure the user provided at least the query number argument
+    if len(sys.argv) < 2:
+        print(usage)
+        sys.exit(1)
+
+    # Batch mode: every query on one connection, e.g. --batch 1 2 3:5 9:Yoga
+    # or --manifest nightly.txt
+    batch = None
+    if sys.argv[1] == "--batch":
+        batch = parse_batch(sys.argv[2:])
+    elif sys.argv[1] == "--manifest":
+        if len(sys.argv) < 3:
+            print(usage)
+            sys.exit(1)
+        try:
+            batch = read_manifest(sys.argv[2])
+        except OSError as e:
+            print(f"[ERROR] Could not read manifest: {e}")
+            sys.exit(1)
+    if batch is not None and not batch:
+        print("[ERROR] No queries given for the batch.")
+        sys.exit(1)
+    if batch is not None and output_format in ("csv", "tsv"):
+        # One CSV/TSV stream holds one table; a batch has a header per query
+        print(f"[ERROR] --format {output_format} cannot hold several queries; "
+              f"use --format jsonl (each record has a 'query' field) for a batch.")
+        sys.exit(1)
+
+    try:
+        with output_stream(output, compress) as stream:
+            if output_format == "text":
+                with redirect_stdout(stream):
+                    run_reports(profile, batch, sys.argv[1], sys.argv[2:])
+            else:
+                OUTPUT_WRITER = WRITERS[output_format](stream)
+                # Status messages go to stderr so they never mix with the data
+                with redirect_stdout(sys.stderr):
+                    run_reports(profile, batch, sys.argv[1], sys.argv[2:])
+    except OSError as e:
+        print(f"[ERROR] Could not write output: {e}")
+        sys.exit(1)
+
+
+
 if __name__ == '__main__':
     main()
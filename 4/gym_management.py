@@ -7,8 +7,16 @@ Description: manages members, classes, and equipment for a gym
 It connects to a SQLite database and allows CRUD operations through
 a menu-driven interface using an object-oriented design.
 """
+import os
 import sqlite3
-from datetime import date
+import sys
+
+# Shared helpers live in the xyzgym package at the root of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from xyzgym import classmerge, clock, enrollment, expiry, importer, instrument, profiles, queries, search
+from xyzgym.pagination import KeysetPager, choose_id
+from xyzgym.render import render
+from xyzgym.transaction import UnitOfWork
 
 
 class DatabaseConnection:
@@ -20,21 +28,26 @@ class DatabaseConnection:
         Initializes a DatabaseConnection instance with no active connection.
         """
         self.conn = None
+        self.uow = None
 
-    def connect(self, db_name):
+    def connect(self, db_name, profile=profiles.DEFAULT_PROFILE):
         """
-        Connects to the specified SQLite database and enables foreign key constraints.
+        Connects to the specified SQLite database using a connection profile,
+        enables foreign key constraints and applies any pending schema migrations.
 
         Args:
             db_name (str): The name of the database file.
+            profile (str): Connection profile (see xyzgym/profiles.py).
         """
         try:
-            self.conn = sqlite3.connect(db_name)
-            self.conn.execute("PRAGMA foreign_keys = ON;")
+            self.conn = profiles.connect(db_name, profile)
             print(f"[INFO] Successfully connected to {db_name}")
-        except sqlite3.Error as e:
+        except (sqlite3.Error, ValueError) as e:
             print(f"[ERROR] Connection failed: {e}")
             self.conn = None
+            return
+        # One unit of work per connection, shared by all the managers
+        self.uow = UnitOfWork(self.conn)
 
     def close(self):
         """
@@ -48,32 +61,52 @@ class MemberManager:
     """
     Handles operations related to gym members such as add, update, delete, and search.
     """
-    def __init__(self, conn):
+    PICK_LIST_HEADER = ["Member ID | Member Name | Email | Age | Membership Plan",
+                        "----------------------------------------------------------"]
+    # Plans offered when adding a member: planId -> amount paid
+    PLAN_PRICES = {1: 50.0, 2: 500.0}  # 1 = Monthly, 2 = Annual
+
+    def __init__(self, conn, uow=None):
         """
         Initializes MemberManager with an active database connection.
 
         Args:
             conn: An active SQLite database connection.
+            uow (UnitOfWork): Transaction manager shared with the other managers.
+                Defaults to a new one for conn.
         """
         self.conn = conn
+        self.uow = uow if uow is not None else UnitOfWork(conn)
 
+    def member_pager(self):
+        """
+        Returns a pager over all members, one row per member with the plan
+        of their most recent payment.
+        """
+        return KeysetPager(self.conn, queries.sql("member.pick_list"), "m.memberId")
+
+    @instrument.timed
+    def search_members(self, text):
+        """
+        Returns the pick list rows of the members best matching text
+        (name, email, phone or address).
+        """
+        return search.search_members(self.conn, text).fetchall()
+
+    def member_listing(self):
+        """
+        Returns a cursor over all members and their membership plans.
+        """
+        return queries.execute(self.conn, "member.listing")
+
+    @instrument.timed
     def display_all_members(self):
         """
         Displays all members and their membership plans.
         """
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT m.memberId, m.name, m.email, m.age, IFNULL(mp.planType, 'No Plan')
-                FROM Member m
-                LEFT JOIN Payment p ON m.memberId = p.memberId
-                LEFT JOIN MembershipPlan mp ON p.planId = mp.planId;
-            """)
-            rows = cursor.fetchall()
-            print("Member ID | Member Name | Email | Age | Membership Plan")
-            print("----------------------------------------------------------")
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
+            render(self.member_listing(), header=["Member ID | Member Name | Email | Age | Membership Plan",
+                                   "----------------------------------------------------------"])
         except sqlite3.Error as e:
             print(f"[ERROR] Unable to fetch members: {e}")
 
@@ -94,38 +127,12 @@ class MemberManager:
             print("2. Annual")
             plan_choice = input("Enter 1 or 2: ")
             
-            if plan_choice == "1":
-                plan_id = 1  # Assuming planId=1 is Monthly
-                amount_paid = 50.0  # Example: $50 for monthly
-            elif plan_choice == "2":
-                plan_id = 2  # Assuming planId=2 is Annual
-                amount_paid = 500.0  # Example: $500 for annual
-            else:
+            if plan_choice not in ("1", "2"):
                 print("[ERROR] Invalid plan choice. Member not added.")
                 return
-            
-            payment_date = date.today().isoformat()  # Today's date in YYYY-MM-DD
-            
-            cursor = self.conn.cursor()
-    
-            # Insert into Member
-            cursor.execute("""
-                INSERT INTO Member (name, email, age, membershipStartDate, membershipEndDate)
-                VALUES (?, ?, ?, ?, ?)
-            """, (name, email, age, membership_start_date, membership_end_date))
-            self.conn.commit()  # Commit after adding Member
-    
-            member_id = cursor.lastrowid  # Get the ID of the newly inserted member
-    
-            # Insert into Payment
-            cursor.execute("""
-                INSERT INTO Payment (memberId, planId, amountPaid, paymentDate)
-                VALUES (?, ?, ?, ?)
-            """, (member_id, plan_id, amount_paid, payment_date))
-            self.conn.commit()  # Commit after adding Payment
-            
-            cursor.close()
-    
+
+            self.create_member(name, email, age, membership_start_date,
+                               membership_end_date, int(plan_choice))
             print("[INFO] Member and Payment added successfully.")
     
         except sqlite3.OperationalError as oe:
@@ -133,80 +140,140 @@ class MemberManager:
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to add member: {e}")
 
+    @instrument.timed
+    def create_member(self, name, email, age, membership_start_date, membership_end_date, plan_id):
+        """
+        Adds a member and their first payment (made today).
+
+        Args:
+            name (str): Member name.
+            email (str): Email address; must be unique.
+            age (int): Age; at least 15.
+            membership_start_date (str): YYYY-MM-DD.
+            membership_end_date (str): YYYY-MM-DD, not before the start date.
+            plan_id (int): 1 (Monthly) or 2 (Annual).
+
+        Returns:
+            int: The new memberId.
+
+        Raises:
+            ValueError: If plan_id is not one of PLAN_PRICES.
+            sqlite3.Error: If a constraint fails; nothing is written.
+        """
+        if plan_id not in self.PLAN_PRICES:
+            raise ValueError(f"Invalid plan choice: {plan_id}")
+        payment_date = clock.today().isoformat()  # Today's date (UTC) in YYYY-MM-DD
+
+        # Member and Payment are written in one transaction, so a member
+        # is never left without a payment
+        with self.uow:
+            # Insert into Member
+            cursor = queries.execute(self.conn, "member.insert",
+                                     (name, email, age, membership_start_date, membership_end_date))
+            member_id = cursor.lastrowid  # Get the ID of the newly inserted member
+
+            # Insert into Payment
+            queries.execute(self.conn, "member.insert_payment",
+                            (member_id, plan_id, self.PLAN_PRICES[plan_id], payment_date))
+        return member_id
+
+    def import_members_from_csv(self):
+        """
+        Bulk imports members and their payments from a CSV file.
+        """
+        csv_file = input("Enter path of the CSV file to import: ").strip()
+        try:
+            result = importer.import_members(self.conn, csv_file, uow=self.uow)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Could not read CSV file: {e}")
+            return
+        except sqlite3.Error as e:
+            print(f"[ERROR] Failed to import members: {e}")
+            return
+        result.print_report()
+        if result.rejected:
+            rejects_file = input("Save rejected rows to CSV (leave blank to skip): ").strip()
+            if rejects_file:
+                importer.write_rejects(result, rejects_file)
+                print(f"[INFO] Rejected rows written to {rejects_file}")
+
+    def list_expiring_memberships(self):
+        """
+        Lists the memberships that end in the next few days, for renewals.
+        """
+        days = input(f"Show memberships ending within how many days? [{expiry.DEFAULT_EXPIRING_DAYS}]: ").strip()
+        if days and not days.isdigit():
+            print("[ERROR] Please enter a number of days.")
+            return
+        days = int(days) if days else expiry.DEFAULT_EXPIRING_DAYS
+        try:
+            render(expiry.expiring_within(self.conn, days),
+                   title=f"\nMemberships ending in the next {days} day(s):",
+                   header=expiry.MEMBER_HEADER,
+                   empty="No memberships end in that period.")
+        except sqlite3.Error as e:
+            print(f"[ERROR] Unable to list expiring memberships: {e}")
+
     def update_member(self):
         """
        Updates an existing member's email and age information.
        """
         try:
-            cursor = self.conn.cursor()
-    
-            # FIRST: Show list of members
-            cursor.execute("""
-                SELECT m.memberId, m.name, m.email, m.age, IFNULL(mp.planType, 'No Plan')
-                FROM Member m
-                LEFT JOIN Payment p ON m.memberId = p.memberId
-                LEFT JOIN MembershipPlan mp ON p.planId = mp.planId;
-            """)
-            members = cursor.fetchall()
-    
-            if not members:
+            # FIRST: Show the members one page at a time
+            pager = self.member_pager()
+            if not pager.first():
                 print("No members found to update.")
                 return
     
-            print("\nAvailable Members:")
-            print("Member ID | Member Name | Email | Age | Membership Plan")
-            print("----------------------------------------------------------")
-            for member in members:
-                print(f"{member[0]} | {member[1]} | {member[2]} | {member[3]} | {member[4]}")
-    
             # THEN: Ask for Member ID
-            member_id = int(input("\nEnter the ID of the member to update: "))
+            member_id = choose_id(pager, "Available Members", self.PICK_LIST_HEADER,
+                                  "\nEnter the ID of the member to update: ",
+                                  search=self.search_members)
+            if member_id is None:
+                print("Update cancelled.")
+                return
             new_email = input("Enter new email: ")
             new_age = int(input("Enter new age: "))
     
-            cursor.execute("""
-                UPDATE Member
-                SET email = ?, age = ?
-                WHERE memberId = ?
-            """, (new_email, new_age, member_id))
-            self.conn.commit()
+            self.edit_member(member_id, new_email, new_age)
             print("[INFO] Member updated successfully.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to update member: {e}")
 
+    @instrument.timed
+    def edit_member(self, member_id, email, age):
+        """
+        Changes a member's email and age.
+
+        Returns:
+            int: 1 if the member was updated, 0 if it does not exist.
+        """
+        with self.uow:
+            cursor = queries.execute(self.conn, "member.update_contact", (email, age, member_id))
+        return cursor.rowcount
+
     def delete_member(self):
         """
        Deletes a member from the database.
        """
         try:
-            cursor = self.conn.cursor()
-    
-            # FIRST: Show list of members
-            cursor.execute("""
-                SELECT m.memberId, m.name, m.email, m.age, IFNULL(mp.planType, 'No Plan')
-                FROM Member m
-                LEFT JOIN Payment p ON m.memberId = p.memberId
-                LEFT JOIN MembershipPlan mp ON p.planId = mp.planId;
-            """)
-            members = cursor.fetchall()
-    
-            if not members:
+            # FIRST: Show the members one page at a time
+            pager = self.member_pager()
+            if not pager.first():
                 print("No members found to delete.")
                 return
     
-            print("\nAvailable Members:")
-            print("Member ID | Member Name | Email | Age | Membership Plan")
-            print("----------------------------------------------------------")
-            for member in members:
-                print(f"{member[0]} | {member[1]} | {member[2]} | {member[3]} | {member[4]}")
-    
             # THEN: Ask for Member ID
-            member_id = int(input("\nEnter the ID of the member to delete: "))
+            member_id = choose_id(pager, "Available Members", self.PICK_LIST_HEADER,
+                                  "\nEnter the ID of the member to delete: ",
+                                  search=self.search_members)
+            if member_id is None:
+                print("Deletion cancelled.")
+                return
     
             # Validate ID exists
-            cursor.execute("SELECT name FROM Member WHERE memberId = ?", (member_id,))
-            result = cursor.fetchone()
+            result = queries.execute(self.conn, "member.name", (member_id,)).fetchone()
             if not result:
                 print("[ERROR] Member ID not found.")
                 return
@@ -216,88 +283,98 @@ class MemberManager:
                 print("Deletion cancelled.")
                 return
     
-            # Delete from Member (foreign key constraints should handle related records)
-            cursor.execute("DELETE FROM Member WHERE memberId = ?", (member_id,))
-            self.conn.commit()
+            self.remove_member(member_id)
             print("[INFO] Member deleted successfully.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to delete member: {e}")
 
+    @instrument.timed
+    def remove_member(self, member_id):
+        """
+        Deletes a member; foreign keys cascade to their payments and attendance.
+
+        Returns:
+            int: 1 if the member was deleted, 0 if it does not exist.
+        """
+        with self.uow:
+            cursor = queries.execute(self.conn, "member.delete", (member_id,))
+        return cursor.rowcount
+
 
     def find_members_by_class(self):
         """
         Finds and displays members enrolled in a specific class.
         """
         try:
-            cursor = self.conn.cursor()
-    
-            # First, show available classes
-            cursor.execute("SELECT classId, className FROM Class;")
-            classes = cursor.fetchall()
-    
-            if not classes:
+            # First, show available classes one page at a time
+            pager = KeysetPager(self.conn, queries.sql("class.short_pick_list"), "classId")
+            if not pager.first():
                 print("No classes found.")
                 return
     
-            print("\nAvailable Classes:")
-            print("Class ID | Class Name")
-            print("----------------------")
-            for cl in classes:
-                print(f"{cl[0]} | {cl[1]}")
-    
-            class_id = int(input("\nEnter Class ID to find members: "))
+            class_id = choose_id(pager, "Available Classes", ["Class ID | Class Name",
+                                                              "----------------------"],
+                                 "\nEnter Class ID to find members: ",
+                                 search=lambda text: [row[:2] for row in
+                                                      search.search_classes(self.conn, text)])
+            if class_id is None:
+                return
     
             # Now, find members for that class
-            cursor.execute("""
-                SELECT DISTINCT m.name
-                FROM Member m
-                JOIN Attends a ON m.memberId = a.memberId
-                WHERE a.classId = ?
-            """, (class_id,))
-            rows = cursor.fetchall()
-    
-            if rows:
-                print("\nMembers attending class:")
-                for row in rows:
-                    print(row[0])
-            else:
-                print("\nNo members found for this class.")
+            render(self.members_in_class(class_id), header=["\nMembers attending class:"], header_if_rows=True,
+                   empty="\nNo members found for this class.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to find members: {e}")
 
+    def members_in_class(self, class_id):
+        """
+        Returns a cursor over the names of the members who attended a class.
+        """
+        return queries.execute(self.conn, "member.names_in_class", (class_id,))
+
 class ClassManager:
     """
     Manages CRUD operations and reporting related to gym classes.
     """
-    def __init__(self, conn):
+    PICK_LIST_HEADER = ["Class ID | Class Name | Class Type",
+                        "-----------------------------------"]
+
+    def __init__(self, conn, uow=None):
         """
        Initializes ClassManager with a database connection.
 
        Args:
            conn: The active database connection.
+           uow (UnitOfWork): Transaction manager shared with the other managers.
+               Defaults to a new one for conn.
        """
         self.conn = conn
+        self.uow = uow if uow is not None else UnitOfWork(conn)
+
+    def class_attendance(self):
+        """
+        Returns a cursor over every class with its attendance count.
+        """
+        # Served from the result cache until the data changes
+        return queries.execute(self.conn, "class.attendance")
+
+    @instrument.timed
+    def search_classes(self, text):
+        """
+        Returns the pick list rows of the classes whose name best matches text.
+        """
+        return search.search_classes(self.conn, text).fetchall()
 
+    @instrument.timed
     def list_classes_and_attendance(self):
         """
         Lists all classes along with their attendance counts.
         """
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT c.classId, c.className, COUNT(a.memberId) AS attendance
-                FROM Class c
-                LEFT JOIN Attends a ON c.classId = a.classId
-                GROUP BY c.classId;
-            """)
-            rows = cursor.fetchall()
-    
-            print("Class ID | Class Name | Attendance")
-            print("-----------------------------------")
-            for row in rows:
-                print(f"{row[0]} | {row[1]} | {row[2]}")
+            render(self.class_attendance(), header=["Class ID | Class Name | Attendance",
+                                   "-----------------------------------"])
     
         except sqlite3.Error as e:
             print(f"[ERROR] Unable to list classes: {e}")
@@ -315,99 +392,92 @@ class ClassManager:
             duration = int(input("Enter class duration (minutes): "))
             capacity = int(input("Enter class capacity: "))
             
-            instructor_id = 1  # Hardcoded for now
-            gym_id = 1  # Hardcoded because there's only one gym
-            
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO Class (className, classType, duration, classCapacity, instructorId, gymID)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (class_name, class_type, duration, capacity, instructor_id, gym_id))
-            self.conn.commit()
+            self.create_class(class_name, class_type, duration, capacity)
             print("[INFO] Class added successfully.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to add class: {e}")
 
+    @instrument.timed
+    def create_class(self, class_name, class_type, duration, capacity, instructor_id=1, gym_id=1):
+        """
+        Adds a class. The instructor defaults to 1 and the gym to the only gym.
+
+        Returns:
+            int: The new classId.
+        """
+        with self.uow:
+            cursor = queries.execute(self.conn, "class.insert",
+                                     (class_name, class_type, duration, capacity, instructor_id, gym_id))
+        return cursor.lastrowid
+
     def update_class(self):
         """
         Updates the name and type of an existing class.
         """
         try:
-            cursor = self.conn.cursor()
-    
-            # FIRST: Show list of classes
-            cursor.execute("""
-                SELECT classId, className, classType
-                FROM Class;
-            """)
-            classes = cursor.fetchall()
-    
-            if not classes:
+            # FIRST: Show the classes one page at a time
+            pager = KeysetPager(self.conn, queries.sql("class.pick_list"), "classId")
+            if not pager.first():
                 print("No classes found to update.")
                 return
     
-            print("\nAvailable Classes:")
-            print("Class ID | Class Name | Class Type")
-            print("-----------------------------------")
-            for cl in classes:
-                print(f"{cl[0]} | {cl[1]} | {cl[2]}")
-    
             # THEN: Ask user for class ID
-            class_id = int(input("\nEnter class ID to update: "))
+            class_id = choose_id(pager, "Available Classes", self.PICK_LIST_HEADER,
+                                 "\nEnter class ID to update: ", search=self.search_classes)
+            if class_id is None:
+                print("Update cancelled.")
+                return
             new_name = input("Enter new class name: ")
     
             print("\nAvailable Class Types: Yoga, Zumba, HIIT, Weights")
             new_type = input("Enter new class type (exactly as shown): ")
             
-            cursor.execute("""
-                UPDATE Class
-                SET className = ?, classType = ?
-                WHERE classId = ?
-            """, (new_name, new_type, class_id))
-            self.conn.commit()
+            self.edit_class(class_id, new_name, new_type)
             print("[INFO] Class updated successfully.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to update class: {e}")
 
+    @instrument.timed
+    def edit_class(self, class_id, class_name, class_type):
+        """
+        Renames a class and changes its type.
+
+        Returns:
+            int: 1 if the class was updated, 0 if it does not exist.
+        """
+        with self.uow:
+            cursor = queries.execute(self.conn, "class.update", (class_name, class_type, class_id))
+        return cursor.rowcount
+
     def delete_class(self):
         """
         Deletes a class if there are no attendees registered.
         """
         try:
-            cursor = self.conn.cursor()
-    
-            # FIRST: Show list of classes
-            cursor.execute("""
-                SELECT classId, className, classType
-                FROM Class;
-            """)
-            classes = cursor.fetchall()
-    
-            if not classes:
+            # FIRST: Show the classes one page at a time
+            pager = KeysetPager(self.conn, queries.sql("class.pick_list"), "classId")
+            if not pager.first():
                 print("No classes found to delete.")
                 return
     
-            print("\nAvailable Classes:")
-            print("Class ID | Class Name | Class Type")
-            print("-----------------------------------")
-            for cl in classes:
-                print(f"{cl[0]} | {cl[1]} | {cl[2]}")
-    
             # THEN: Ask for Class ID
-            class_id = int(input("\nEnter class ID to delete: "))
+            class_id = choose_id(pager, "Available Classes", self.PICK_LIST_HEADER,
+                                 "\nEnter class ID to delete: ", search=self.search_classes)
+            if class_id is None:
+                print("Deletion cancelled.")
+                return
     
             # Validate ID exists
-            cursor.execute("SELECT className FROM Class WHERE classId = ?", (class_id,))
-            result = cursor.fetchone()
+            result = queries.execute(self.conn, "class.name", (class_id,)).fetchone()
             if not result:
                 print("[ERROR] Class ID not found.")
                 return
     
              # Check if class has attendees
-            cursor.execute("SELECT COUNT(*) FROM Attends WHERE classId = ?", (class_id,))
-            attendees = cursor.fetchone()[0]
+            attendees = queries.execute(self.conn, "class.attendance_count", (class_id,)).fetchone()[0]
+            new_class_id = None
             if attendees > 0:
                 print(f"[WARNING] Class '{result[0]}' has {attendees} registered member(s).")
                 move_choice = input("Would you like to reassign them to another class? (Y/N): ").strip().lower()
@@ -415,73 +485,170 @@ class ClassManager:
                     return
 
             # Show other classes for reassignment
-                cursor.execute("""
-                    SELECT classId, className
-                    FROM Class
-                    WHERE classId != ?;
-                """, (class_id,))
-                other_classes = cursor.fetchall()
-                print("\nAvailable Classes to Move To:")
-                print("Class ID | Class Name")
-                print("---------------------")
-                for oc in other_classes:
-                    print(f"{oc[0]} | {oc[1]}")
-
-                new_class_id = int(input("Enter new class ID to reassign members to: "))
-                valid_ids = [c[0] for c in other_classes]
-                if new_class_id not in valid_ids:
+                other_classes = KeysetPager(self.conn, queries.sql("class.short_pick_list"),
+                                            "classId", where="classId != ?", params=(class_id,))
+                new_class_id = choose_id(other_classes, "Available Classes to Move To",
+                                         ["Class ID | Class Name", "---------------------"],
+                                         "Enter new class ID to reassign members to: ",
+                                         search=lambda text: [row[:2] for row in self.search_classes(text)
+                                                              if row[0] != class_id])
+                if (new_class_id is None or new_class_id == class_id
+                        or queries.execute(self.conn, "class.name", (new_class_id,)).fetchone() is None):
                     print("[ERROR] Invalid class ID chosen. Deletion cancelled.")
                     return
 
-                # Reassign members
-                cursor.execute(
-                    "UPDATE Attends SET classId = ? WHERE classId = ?",
-                    (new_class_id, class_id)
-                )
-                self.conn.commit()
-                print(f"[INFO] Moved {attendees} member(s) to class ID {new_class_id}.")
-
             # Confirm deletion
             confirm = input(f"Are you sure you want to delete class '{result[0]}'? (Y/N): ").strip().lower()
             if confirm != 'y':
                 print("Deletion cancelled.")
                 return
 
-            # Delete Class
-            cursor.execute("DELETE FROM Class WHERE classId = ?", (class_id,))
-            self.conn.commit()
+            merged = self.remove_class(class_id, new_class_id)
+            if new_class_id is not None:
+                print(f"[INFO] Moved {merged['moved']} attendance record(s) to class ID {new_class_id}"
+                      f" ({merged['deduplicated']} duplicate(s) dropped).")
             print("[INFO] Class deleted successfully.")
 
-        except sqlite3.Error as e:
+        except (ValueError, sqlite3.Error) as e:
             print(f"[ERROR] Failed to delete class: {e}")
 
+    @instrument.timed
+    def remove_class(self, class_id, reassign_to=None):
+        """
+        Deletes a class, first moving its attendance records to another class.
+
+        Args:
+            class_id (int): The class to delete.
+            reassign_to (int): The class that takes over its attendees; only
+                needed when the class has attendees.
+
+        Returns:
+            dict: The counts of merge_classes(), or None if the class does
+            not exist.
+
+        Raises:
+            ValueError: If the class has attendees and reassign_to is missing,
+                the class itself, or not an existing class.
+        """
+        with self.uow:
+            if queries.execute(self.conn, "class.name", (class_id,)).fetchone() is None:
+                return None
+            return self.merge_classes({class_id: reassign_to})
+
+    @instrument.timed
+    def merge_classes(self, mapping, discard=False):
+        """
+        Merges classes into others and retires classes in one transaction;
+        see xyzgym/classmerge.py. A member who already attended the target
+        class on the same date keeps that record and the moved one is dropped.
+
+        Args:
+            mapping (dict): {classId: target classId, or None to retire the class}.
+            discard (bool): Delete the attendance of retired classes.
+
+        Returns:
+            dict: Counts of classes deleted and attendance records moved,
+            deduplicated and discarded.
+
+        Raises:
+            ValueError: If the mapping names a missing class, merges a class
+                into itself or into a class that goes away too, or retires a
+                class with attendees without discard. Nothing is changed.
+        """
+        return classmerge.merge(self.conn, mapping, discard, uow=self.uow)
+
+    def enroll_member(self):
+        """
+        Enrolls a member in a class on a given day, if the class has a seat left.
+        """
+        try:
+            pager = KeysetPager(self.conn, queries.sql("class.pick_list"), "classId")
+            if not pager.first():
+                print("No classes found.")
+                return
+            class_id = choose_id(pager, "Available Classes", self.PICK_LIST_HEADER,
+                                 "\nEnter class ID to enroll in: ", search=self.search_classes)
+            if class_id is None:
+                print("Enrollment cancelled.")
+                return
+
+            members = KeysetPager(self.conn, queries.sql("member.pick_list"), "m.memberId")
+            members.first()
+            member_id = choose_id(members, "Available Members", MemberManager.PICK_LIST_HEADER,
+                                  "\nEnter the ID of the member to enroll: ",
+                                  search=lambda text: search.search_members(self.conn, text).fetchall())
+            if member_id is None:
+                print("Enrollment cancelled.")
+                return
+
+            day = input("Enter session date (YYYY-MM-DD, blank = today): ").strip() or clock.today()
+            if self.enroll(member_id, class_id, day):
+                print("[INFO] Member enrolled successfully.")
+            else:
+                print("[INFO] Member was already enrolled in this session.")
+            enrolled, capacity = enrollment.occupancy(self.conn, class_id, day)
+            print(f"[INFO] {enrolled} of {capacity} seats taken.")
+
+        except enrollment.SessionFull as e:
+            print(f"[ERROR] {e}.")
+        except (ValueError, sqlite3.Error) as e:
+            print(f"[ERROR] Failed to enroll member: {e}")
+
+    @instrument.timed
+    def enroll(self, member_id, class_id, day):
+        """
+        Takes a seat in a class session for a member (see xyzgym/enrollment.py).
+
+        Returns:
+            bool: True if the member was enrolled, False if they already were.
+
+        Raises:
+            ValueError: If the member or class does not exist, or day is not a date.
+            enrollment.SessionFull: If the session has no seats left.
+        """
+        return enrollment.enroll(self.conn, member_id, class_id, day, self.uow)
+
 
 class EquipmentManager:
     """
     Manages CRUD operations related to gym equipment.
     """
-    def __init__(self, conn):
+    PICK_LIST_HEADER = ["Equipment ID | Name | Type | Quantity",
+                        "---------------------------------------"]
+
+    def __init__(self, conn, uow=None):
         """
         Initializes EquipmentManager with a database connection.
 
         Args:
             conn: The active database connection.
+            uow (UnitOfWork): Transaction manager shared with the other managers.
+                Defaults to a new one for conn.
         """
         self.conn = conn
+        self.uow = uow if uow is not None else UnitOfWork(conn)
 
+    def equipment_listing(self):
+        """
+        Returns a cursor over all equipment.
+        """
+        return queries.execute(self.conn, "equipment.listing")
+
+    @instrument.timed
+    def search_equipment(self, text):
+        """
+        Returns the rows of the equipment whose name best matches text.
+        """
+        return search.search_equipment(self.conn, text).fetchall()
+
+    @instrument.timed
     def show_all_equipment(self):
         """
         Displays a list of all equipment in the gym.
         """
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT equipmentId, name, type, quantity FROM Equipment;")
-            rows = cursor.fetchall()
-    
-            print("Equipment ID | Name | Type | Quantity")
-            print("---------------------------------------")
-            for row in rows:
-                print(" | ".join(str(col) for col in row))
+            render(self.equipment_listing(), header=["Equipment ID | Name | Type | Quantity",
+                                   "---------------------------------------"])
     
         except sqlite3.Error as e:
             print(f"[ERROR] Unable to fetch equipment: {e}")
@@ -497,87 +664,83 @@ class EquipmentManager:
             equipment_type = input("Enter equipment type (exactly as shown): ")
     
             quantity = int(input("Enter quantity: "))
-            gym_id = 1  # Hardcoded because there is only one gym
             
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO Equipment (name, type, quantity, gymId)
-                VALUES (?, ?, ?, ?)
-            """, (name, equipment_type, quantity, gym_id))
-            self.conn.commit()
+            self.create_equipment(name, equipment_type, quantity)
             print("[INFO] Equipment inserted successfully.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to insert equipment: {e}")
 
+    @instrument.timed
+    def create_equipment(self, name, equipment_type, quantity, gym_id=1):
+        """
+        Adds an equipment item; the gym defaults to the only gym.
+
+        Returns:
+            int: The new equipmentId.
+        """
+        with self.uow:
+            cursor = queries.execute(self.conn, "equipment.insert", (name, equipment_type, quantity, gym_id))
+        return cursor.lastrowid
+
     def update_equipment(self):
         """
         Updates the quantity of an existing equipment item.
         """
         try:
-            cursor = self.conn.cursor()
-    
-            # FIRST: Show list of equipment
-            cursor.execute("""
-                SELECT equipmentId, name, type, quantity
-                FROM Equipment;
-            """)
-            equipment_list = cursor.fetchall()
-    
-            if not equipment_list:
+            # FIRST: Show the equipment one page at a time
+            pager = KeysetPager(self.conn, queries.sql("equipment.listing"), "equipmentId")
+            if not pager.first():
                 print("No equipment found to update.")
                 return
     
-            print("\nAvailable Equipment:")
-            print("Equipment ID | Name | Type | Quantity")
-            print("---------------------------------------")
-            for eq in equipment_list:
-                print(f"{eq[0]} | {eq[1]} | {eq[2]} | {eq[3]}")
-    
-            equipment_id = int(input("\nEnter equipment ID to update: "))
+            equipment_id = choose_id(pager, "Available Equipment", self.PICK_LIST_HEADER,
+                                     "\nEnter equipment ID to update: ",
+                                     search=self.search_equipment)
+            if equipment_id is None:
+                print("Update cancelled.")
+                return
             new_quantity = int(input("Enter new quantity: "))
     
-            cursor.execute("""
-                UPDATE Equipment
-                SET quantity = ?
-                WHERE equipmentId = ?
-            """, (new_quantity, equipment_id))
-            self.conn.commit()
+            self.edit_equipment(equipment_id, new_quantity)
             print("[INFO] Equipment updated successfully.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to update equipment: {e}")
 
+    @instrument.timed
+    def edit_equipment(self, equipment_id, quantity):
+        """
+        Changes the quantity of an equipment item.
+
+        Returns:
+            int: 1 if the item was updated, 0 if it does not exist.
+        """
+        with self.uow:
+            cursor = queries.execute(self.conn, "equipment.update_quantity", (quantity, equipment_id))
+        return cursor.rowcount
+
     def delete_equipment(self):
         """
         Deletes an equipment item from the database.
         """
         try:
-            cursor = self.conn.cursor()
-    
-            # FIRST: Show list of equipment
-            cursor.execute("""
-                SELECT equipmentId, name, type, quantity
-                FROM Equipment;
-            """)
-            equipment_list = cursor.fetchall()
-    
-            if not equipment_list:
+            # FIRST: Show the equipment one page at a time
+            pager = KeysetPager(self.conn, queries.sql("equipment.listing"), "equipmentId")
+            if not pager.first():
                 print("No equipment found to delete.")
                 return
     
-            print("\nAvailable Equipment:")
-            print("Equipment ID | Name | Type | Quantity")
-            print("---------------------------------------")
-            for eq in equipment_list:
-                print(f"{eq[0]} | {eq[1]} | {eq[2]} | {eq[3]}")
-    
             # THEN: Ask for Equipment ID
-            equipment_id = int(input("\nEnter equipment ID to delete: "))
+            equipment_id = choose_id(pager, "Available Equipment", self.PICK_LIST_HEADER,
+                                     "\nEnter equipment ID to delete: ",
+                                     search=self.search_equipment)
+            if equipment_id is None:
+                print("Deletion cancelled.")
+                return
     
             # Validate ID exists
-            cursor.execute("SELECT name FROM Equipment WHERE equipmentId = ?", (equipment_id,))
-            result = cursor.fetchone()
+            result = queries.execute(self.conn, "equipment.name", (equipment_id,)).fetchone()
             if not result:
                 print("[ERROR] Equipment ID not found.")
                 return
@@ -587,23 +750,39 @@ class EquipmentManager:
                 print("Deletion cancelled.")
                 return
     
-            # Delete Equipment
-            cursor.execute("DELETE FROM Equipment WHERE equipmentId = ?", (equipment_id,))
-            self.conn.commit()
+            self.remove_equipment(equipment_id)
             print("[INFO] Equipment deleted successfully.")
     
         except sqlite3.Error as e:
             print(f"[ERROR] Failed to delete equipment: {e}")
 
+    @instrument.timed
+    def remove_equipment(self, equipment_id):
+        """
+        Deletes an equipment item.
+
+        Returns:
+            int: 1 if the item was deleted, 0 if it does not exist.
+        """
+        with self.uow:
+            cursor = queries.execute(self.conn, "equipment.delete", (equipment_id,))
+        return cursor.rowcount
+
 class GymManagementApp:
     """
     Main application class for managing the gym database.
     Provides menus to manage members, classes, and equipment.
     """
-    def __init__(self):
+    def __init__(self, instrumented=False):
         """
         Initializes GymManagementApp with no active database connection.
+
+        Args:
+            instrumented (bool): Time every query of the session (see
+                xyzgym/instrument.py); off by default because the hooks slow
+                down every statement.
         """
+        self.instrumented = instrumented
         self.db = DatabaseConnection()
         self.member_manager = None
         self.class_manager = None
@@ -614,16 +793,32 @@ class GymManagementApp:
         Starts the application: connects to the database and launches the main menu.
         """
         db_name = input("Enter database name (e.g., XYZGym.sqlite): ")
+        # Time every query of the session; see the Performance summary menu entry
+        if self.instrumented:
+            instrument.enable()
         self.db.connect(db_name)
         if self.db.conn is None:
             print("Exiting program.")
             return
-        self.member_manager = MemberManager(self.db.conn)
-        self.class_manager = ClassManager(self.db.conn)
-        self.equipment_manager = EquipmentManager(self.db.conn)
+        self.member_manager = MemberManager(self.db.conn, self.db.uow)
+        self.class_manager = ClassManager(self.db.conn, self.db.uow)
+        self.equipment_manager = EquipmentManager(self.db.conn, self.db.uow)
+        self.daily_sweep()
         self.main_menu()
+        if self.instrumented:
+            instrument.summary()
         self.db.close()
 
+    def daily_sweep(self):
+        """
+        Reports the memberships that expired (or were renewed) since the
+        last time the program ran.
+        """
+        try:
+            expiry.print_sweep(expiry.sweep(self.db.conn))
+        except sqlite3.Error as e:
+            print(f"[ERROR] Membership sweep failed: {e}")
+
     def main_menu(self):
         """
        Displays the main menu to navigate between sections.
@@ -633,7 +828,8 @@ class GymManagementApp:
             print("1. Members Menu")
             print("2. Classes Menu")
             print("3. Equipment Menu")
-            print("4. Logout and Exit")
+            print("4. Performance summary")
+            print("5. Logout and Exit")
             choice = input("Enter your choice: ")
             if choice == "1":
                 self.members_menu()
@@ -642,6 +838,11 @@ class GymManagementApp:
             elif choice == "3":
                 self.equipment_menu()
             elif choice == "4":
+                if self.instrumented:
+                    instrument.summary()
+                else:
+                    print("[INFO] Query instrumentation is off; start the program with --instrument.")
+            elif choice == "5":
                 print("Logging out...")
                 break
             else:
@@ -658,7 +859,9 @@ class GymManagementApp:
             print("3. Update member")
             print("4. Delete member")
             print("5. Find members by class")
-            print("6. Return to Main Menu")
+            print("6. Bulk import members from CSV")
+            print("7. Memberships expiring soon")
+            print("8. Return to Main Menu")
             choice = input("Enter your choice: ")
             if choice == "1":
                 self.member_manager.display_all_members()
@@ -671,6 +874,10 @@ class GymManagementApp:
             elif choice == "5":
                 self.member_manager.find_members_by_class()
             elif choice == "6":
+                self.member_manager.import_members_from_csv()
+            elif choice == "7":
+                self.member_manager.list_expiring_memberships()
+            elif choice == "8":
                 break
             else:
                 print("Invalid choice. Please try again.")
@@ -685,7 +892,8 @@ class GymManagementApp:
             print("2. Add new class")
             print("3. Update class")
             print("4. Delete class")
-            print("5. Return to Main Menu")
+            print("5. Enroll member in class")
+            print("6. Return to Main Menu")
             choice = input("Enter your choice: ")
             if choice == "1":
                 self.class_manager.list_classes_and_attendance()
@@ -696,6 +904,8 @@ class GymManagementApp:
             elif choice == "4":
                 self.class_manager.delete_class()
             elif choice == "5":
+                self.class_manager.enroll_member()
+            elif choice == "6":
                 break
             else:
                 print("Invalid choice. Please try again.")
@@ -726,5 +936,5 @@ class GymManagementApp:
                 print("Invalid choice. Please try again.")
 
 if __name__ == "__main__":
-    app = GymManagementApp()
+    app = GymManagementApp(instrumented="--instrument" in sys.argv[1:])
     app.run()
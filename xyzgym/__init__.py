@@ -0,0 +1,6 @@
+"""
+xyzgym
+-----------
+Shared support code for the XYZGym database scripts in the stage folders
+(2/file.py, 3/file.py and 4/gym_management.py).
+"""
@@ -0,0 +1,149 @@
+"""
+age_stats.py
+-----------
+Maintained age statistics of active and expired members (query7).
+
+MemberAgeStats holds the number of members per (status, age), so the mean,
+percentiles and an age histogram of each status come from at most one row
+per distinct age, whatever the number of members. Triggers (schema
+migration 5) update it when a member is inserted, deleted or has their age
+or membershipEndDate changed.
+
+Status is evaluated against the day stored in MemberAgeStatsState.asOf.
+When the day moves on, advance() moves only the members whose membership
+ended in between from "active" to "expired", using the
+membershipEndDate index (which also covers age).
+"""
+
+from xyzgym import clock
+from xyzgym.transaction import UnitOfWork
+
+ACTIVE, EXPIRED = 0, 1
+HISTOGRAM_BAND = 10
+
+
+class AgeDistribution:
+    """
+    Ages of the members in one status bucket, as age -> member count.
+    """
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+
+    @property
+    def members(self):
+        return sum(self.counts.values())
+
+    @property
+    def mean(self):
+        """Average age, or None when the bucket is empty."""
+        total = self.members
+        if not total:
+            return None
+        return sum(age * n for age, n in self.counts.items()) / total
+
+    def percentile(self, pct):
+        """Returns the pct-th percentile age (nearest-rank), or None when empty."""
+        total = self.members
+        if not total:
+            return None
+        rank = max(1, -(-total * pct // 100))  # ceil without floats
+        seen = 0
+        for age in sorted(self.counts):
+            seen += self.counts[age]
+            if seen >= rank:
+                return age
+
+    def histogram(self, band=HISTOGRAM_BAND):
+        """Returns {band start: members}, e.g. {10: 4, 20: 31, ...} for 10-year bands."""
+        bands = {}
+        for age, n in self.counts.items():
+            start = age - age % band
+            bands[start] = bands.get(start, 0) + n
+        return bands
+
+
+def _today():
+    return clock.today().isoformat()
+
+
+def _crossed(conn, as_of, today):
+    """Member counts per age whose membership ended in [as_of, today)."""
+    return conn.execute("""
+        SELECT age, COUNT(*) FROM Member
+        WHERE membershipEndDate >= ? AND membershipEndDate < ? AND age IS NOT NULL
+        GROUP BY age
+    """, (as_of, today)).fetchall()
+
+
+def rebuild(conn, today=None):
+    """Recomputes MemberAgeStats from Member in one conditional-aggregation pass."""
+    today = today or _today()
+    with UnitOfWork(conn):
+        conn.execute("DELETE FROM MemberAgeStats")
+        conn.execute("""
+            INSERT INTO MemberAgeStats (expired, age, members)
+            SELECT membershipEndDate < ?, age, COUNT(*)
+            FROM Member WHERE age IS NOT NULL
+            GROUP BY 1, 2
+        """, (today,))
+        conn.execute("UPDATE MemberAgeStatsState SET asOf = ? WHERE id = 1", (today,))
+
+
+def advance(conn, today=None):
+    """
+    Moves the statistics forward to today, expiring the memberships that
+    ended since the last call.
+
+    Returns:
+        int: Number of members moved from active to expired.
+    """
+    today = today or _today()
+    as_of = conn.execute("SELECT asOf FROM MemberAgeStatsState WHERE id = 1").fetchone()[0]
+    if as_of == today:
+        return 0
+    if as_of > today:
+        # Clock went backwards: statuses cannot be moved back cheaply
+        rebuild(conn, today)
+        return 0
+    crossed = _crossed(conn, as_of, today)
+    with UnitOfWork(conn):
+        for age, n in crossed:
+            conn.execute("UPDATE MemberAgeStats SET members = members - ? WHERE expired = 0 AND age = ?",
+                         (n, age))
+            conn.execute("""
+                INSERT INTO MemberAgeStats (expired, age, members) VALUES (1, ?, ?)
+                ON CONFLICT (expired, age) DO UPDATE SET members = members + excluded.members
+            """, (age, n))
+        conn.execute("DELETE FROM MemberAgeStats WHERE members <= 0")
+        conn.execute("UPDATE MemberAgeStatsState SET asOf = ? WHERE id = 1", (today,))
+    return sum(n for _, n in crossed)
+
+
+def age_statistics(conn, today=None):
+    """
+    Returns the age distributions of active and expired members.
+
+    Writable connections first advance() the stored statistics. A
+    read-only connection applies the same correction in memory.
+
+    Returns:
+        dict: {ACTIVE: AgeDistribution, EXPIRED: AgeDistribution}
+    """
+    today = today or _today()
+    crossed = []
+    if getattr(conn, "read_only", False):
+        as_of = conn.execute("SELECT asOf FROM MemberAgeStatsState WHERE id = 1").fetchone()[0]
+        if as_of < today:
+            crossed = _crossed(conn, as_of, today)
+    else:
+        advance(conn, today)
+
+    buckets = {ACTIVE: AgeDistribution(), EXPIRED: AgeDistribution()}
+    for expired, age, n in conn.execute("SELECT expired, age, members FROM MemberAgeStats"):
+        buckets[expired].counts[age] = n
+    for age, n in crossed:
+        buckets[ACTIVE].counts[age] -= n
+        if not buckets[ACTIVE].counts[age]:
+            del buckets[ACTIVE].counts[age]
+        buckets[EXPIRED].counts[age] = buckets[EXPIRED].counts.get(age, 0) + n
+    return buckets
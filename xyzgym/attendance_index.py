@@ -0,0 +1,318 @@
+"""
+attendance_index.py
+-----------
+In-process index of who attended which class, for query3 and query9.
+
+For every class the index keeps a compressed bitmap of the member IDs that
+attended it, plus a map from class type to the set of classes of that type.
+"Members who attended every class of type X" becomes an intersection of
+bitmaps, and "members of class N" or "how many members attended class N"
+is answered without touching SQLite.
+
+Bitmaps are split into chunks of 65536 IDs (the high bits of the member ID
+select the chunk). A chunk holding few members is a sorted array of the low
+16 bits; a busy chunk becomes a 65536-bit mask. Memory stays proportional to
+the number of distinct (class, member) pairs.
+
+The index is built once per connection from the (classId, memberId) index
+on Attends and brought up to date before each use. Triggers (schema
+migration 9) bump a per-class version in AttendanceClassVersion on every
+insert, delete and update of Attends; the index remembers the versions it
+loaded, and a class whose version moved is reloaded from Attends. The
+class -> type map is re-read too. Nothing is re-read while the database is
+unchanged. Reloading a whole class costs one range scan of
+idx_attends_class_member (about 2 ms for the largest class of the 1.5M-row
+dataset) even for a single new row, but needs no change log and stays exact
+under deletes, updates and rowid reuse.
+
+Building the index costs a full pass over Attends (about 1.7 s on the medium
+dataset), so it only pays off over many queries. warm_index() returns it
+for long-lived connections (the server and the report runner set
+conn.long_lived) or once it exists; otherwise query3 / query9 run as
+indexed SQL (report.class_members, report.members_in_all_classes).
+"""
+
+import json
+from array import array
+from bisect import bisect_left
+
+from xyzgym.cache import data_stamp
+
+CHUNK_BITS = 16
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+CHUNK_BYTES = (1 << CHUNK_BITS) // 8
+# Chunks with more members than this are stored as a bitmask
+ARRAY_LIMIT = 4096
+
+
+def _mask_from_lows(lows):
+    """Packs low IDs into a 65536-bit int."""
+    bits = bytearray(CHUNK_BYTES)
+    for low in lows:
+        bits[low >> 3] |= 1 << (low & 7)
+    return int.from_bytes(bits, "little")
+
+
+def _lows_from_mask(mask):
+    """Returns the set bits of a chunk bitmask in ascending order."""
+    lows = []
+    for index, byte in enumerate(mask.to_bytes(CHUNK_BYTES, "little")):
+        if byte:
+            base = index << 3
+            lows.extend(base + bit for bit in range(8) if byte >> bit & 1)
+    return lows
+
+
+def _pack(lows):
+    """Builds a chunk container from ascending, distinct low IDs."""
+    if len(lows) > ARRAY_LIMIT:
+        return _mask_from_lows(lows)
+    return array("H", lows)
+
+
+def _chunk_len(chunk):
+    return chunk.bit_count() if isinstance(chunk, int) else len(chunk)
+
+
+def _chunk_and(a, b):
+    """Intersects two chunk containers; returns None when empty."""
+    if isinstance(a, int) and isinstance(b, int):
+        mask = a & b
+        if not mask:
+            return None
+        return mask if mask.bit_count() > ARRAY_LIMIT else array("H", _lows_from_mask(mask))
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        bits = b.to_bytes(CHUNK_BYTES, "little")
+        lows = [low for low in a if bits[low >> 3] >> (low & 7) & 1]
+    else:
+        other = set(b)
+        lows = [low for low in a if low in other]
+    return array("H", lows) if lows else None
+
+
+class MemberBitmap:
+    """
+    Compressed set of member IDs.
+    """
+    __slots__ = ("_chunks",)
+
+    def __init__(self):
+        self._chunks = {}  # high bits -> array("H") of low bits, or int bitmask
+
+    @classmethod
+    def from_sorted(cls, member_ids):
+        """Builds a bitmap from ascending member IDs (duplicates allowed)."""
+        bitmap = cls()
+        high, lows = None, []
+        for member_id in member_ids:
+            chunk = member_id >> CHUNK_BITS
+            if chunk != high:
+                if lows:
+                    bitmap._chunks[high] = _pack(lows)
+                high, lows = chunk, []
+            low = member_id & CHUNK_MASK
+            if not lows or lows[-1] != low:
+                lows.append(low)
+        if lows:
+            bitmap._chunks[high] = _pack(lows)
+        return bitmap
+
+    def __contains__(self, member_id):
+        chunk = self._chunks.get(member_id >> CHUNK_BITS)
+        if chunk is None:
+            return False
+        low = member_id & CHUNK_MASK
+        if isinstance(chunk, int):
+            return bool(chunk >> low & 1)
+        pos = bisect_left(chunk, low)
+        return pos < len(chunk) and chunk[pos] == low
+
+    def __len__(self):
+        return sum(_chunk_len(chunk) for chunk in self._chunks.values())
+
+    def __bool__(self):
+        return bool(self._chunks)
+
+    def __iter__(self):
+        """Yields the member IDs in ascending order."""
+        for high in sorted(self._chunks):
+            chunk = self._chunks[high]
+            base = high << CHUNK_BITS
+            lows = _lows_from_mask(chunk) if isinstance(chunk, int) else chunk
+            for low in lows:
+                yield base + low
+
+    def __and__(self, other):
+        result = MemberBitmap()
+        small, large = sorted((self._chunks, other._chunks), key=len)
+        for high, chunk in small.items():
+            if high in large:
+                both = _chunk_and(chunk, large[high])
+                if both is not None:
+                    result._chunks[high] = both
+        return result
+
+
+class AttendanceIndex:
+    """
+    Member bitmaps per class and classes per type for one connection.
+    """
+    def __init__(self, conn):
+        """
+        Args:
+            conn: An active SQLite database connection.
+        """
+        self.conn = conn
+        self.members = {}      # classId -> MemberBitmap
+        self.versions = {}     # classId -> AttendanceClassVersion.version loaded
+        self.class_types = {}  # classType -> set of classIds
+        self.builds = 0
+        self.refreshes = 0
+        self._stamp = None
+
+    def _read(self, method):
+        """Runs method inside one read transaction, so every query sees the same data."""
+        if self.conn.in_transaction:
+            return method()
+        self.conn.execute("BEGIN")
+        try:
+            return method()
+        finally:
+            self.conn.commit()
+
+    def build(self):
+        """Loads the whole index from Attends and Class."""
+        self._read(self._build)
+        self._stamp = data_stamp(self.conn)
+        self.builds += 1
+
+    def _build(self):
+        self.members.clear()
+        self.versions = self._read_versions()
+        cursor = self.conn.execute("SELECT classId, memberId FROM Attends ORDER BY classId, memberId")
+        class_id, member_ids = None, []
+        for row_class, member_id in cursor:
+            if row_class != class_id:
+                self._load_class(class_id, member_ids)
+                class_id, member_ids = row_class, []
+            member_ids.append(member_id)
+        self._load_class(class_id, member_ids)
+        self._load_types()
+
+    def _load_class(self, class_id, member_ids):
+        if member_ids:
+            self.members[class_id] = MemberBitmap.from_sorted(member_ids)
+
+    def _read_versions(self):
+        return dict(self.conn.execute("SELECT classId, version FROM AttendanceClassVersion"))
+
+    def _load_types(self):
+        self.class_types = {}
+        for class_id, class_type in self.conn.execute("SELECT classId, classType FROM Class"):
+            self.class_types.setdefault(class_type, set()).add(class_id)
+        known = set().union(*self.class_types.values())
+        for class_id in [c for c in self.members if c not in known]:
+            del self.members[class_id]
+
+    def refresh(self):
+        """Brings the index up to date if the database changed since last time."""
+        if self._stamp is None:
+            self.build()
+            return
+        stamp = data_stamp(self.conn)
+        if stamp == self._stamp:
+            return
+        self._read(self._refresh)
+        self._stamp = data_stamp(self.conn)
+        self.refreshes += 1
+
+    def _refresh(self):
+        # Reload exactly the classes whose attendance changed
+        versions = self._read_versions()
+        for class_id in versions.keys() | self.versions.keys():
+            if versions.get(class_id) != self.versions.get(class_id):
+                self._reload_class(class_id)
+        self.versions = versions
+        self._load_types()
+
+    def _reload_class(self, class_id):
+        self.members.pop(class_id, None)
+        member_ids = [r[0] for r in self.conn.execute(
+            "SELECT memberId FROM Attends WHERE classId = ? ORDER BY memberId", (class_id,))]
+        self._load_class(class_id, member_ids)
+
+    def members_of(self, class_id):
+        """Returns the MemberBitmap of a class (empty if nobody attended it)."""
+        return self.members.get(class_id) or MemberBitmap()
+
+    def member_count(self, class_id):
+        """Returns how many distinct members attended a class."""
+        return len(self.members_of(class_id))
+
+    def classes_of_type(self, class_type):
+        """Returns the set of classIds of a class type."""
+        return self.class_types.get(class_type, set())
+
+    def members_in_all(self, class_ids):
+        """Returns the members who attended every class in class_ids."""
+        if not class_ids:
+            return MemberBitmap()
+        bitmaps = sorted((self.members_of(c) for c in class_ids), key=len)
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            if not result:
+                break
+            result = result & bitmap
+        return result
+
+
+def attendance_index(conn):
+    """
+    Returns the up-to-date attendance index of a connection.
+
+    The index is kept on the connection (a profiles.GymConnection) and
+    built on first use; other connection types get a fresh index.
+    """
+    index = getattr(conn, "attendance_index", None)
+    if index is None:
+        index = AttendanceIndex(conn)
+        try:
+            conn.attendance_index = index
+        except AttributeError:
+            pass
+    index.refresh()
+    return index
+
+
+def warm_index(conn):
+    """
+    Returns the up-to-date attendance index if using it pays off: the
+    connection is long-lived (conn.long_lived) or its index is already
+    built. Returns None for a one-shot connection, which should query
+    Attends directly instead of building the index for a single answer.
+    """
+    if getattr(conn, "attendance_index", None) is None and not getattr(conn, "long_lived", False):
+        return None
+    return attendance_index(conn)
+
+
+def member_rows(conn, member_ids, columns="m.memberId, m.name"):
+    """
+    Looks up members by ID, in the order given.
+
+    Args:
+        conn: An active SQLite database connection.
+        member_ids: Iterable of member IDs, e.g. a MemberBitmap.
+        columns (str): Columns of Member (alias m) to return.
+
+    Returns:
+        An executed cursor.
+    """
+    return conn.execute(f"""
+        SELECT {columns}
+        FROM json_each(?) j
+        CROSS JOIN Member m ON m.memberId = j.value
+        ORDER BY j.key
+    """, (json.dumps(list(member_ids)),))
@@ -0,0 +1,392 @@
+"""
+bench.py
+-----------
+Latency benchmark for the report queries query1 ... query10 in 3/file.py.
+
+Each query runs at several dataset sizes with representative parameters.
+For every case the harness records p50/p95/p99 latency, rows per second and
+peak memory. Time spent inside SQLite (execute and fetch) is reported
+separately from the time spent formatting and printing the rows.
+
+These times are cold: the connection's result cache and attendance index
+are dropped before every timed run, as for a one-shot `file.py` call, so
+query2, query3, query8 and query9 really reach SQLite. The warm p50
+(warm_total_ms) is measured separately with both kept, as a long-lived
+connection such as the server sees them.
+
+Usage (from the repository root):
+    python -m xyzgym.bench run --sizes tiny,small --output before.json
+    python -m xyzgym.bench run --db big.sqlite --output after.json
+    python -m xyzgym.bench compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import date, datetime
+
+from xyzgym import clock, datagen, profiles
+from xyzgym.stages import load_reports
+
+DEFAULT_REPEAT = 15
+DEFAULT_THRESHOLD = 0.10
+# Ignore differences smaller than this; they are timer noise
+NOISE_FLOOR_MS = 0.05
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor that adds the time spent in execute/fetch calls, and the number
+    of rows fetched, to its connection's counters.
+    """
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            self.connection.sql_seconds += time.perf_counter() - start
+
+    def execute(self, *args):
+        self._timed(sqlite3.Cursor.execute, *args)
+        return self
+
+    def executemany(self, *args):
+        self._timed(sqlite3.Cursor.executemany, *args)
+        return self
+
+    def fetchone(self):
+        row = self._timed(sqlite3.Cursor.fetchone)
+        if row is not None:
+            self.connection.sql_rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._timed(sqlite3.Cursor.fetchmany, *args)
+        self.connection.sql_rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(sqlite3.Cursor.fetchall)
+        self.connection.sql_rows += len(rows)
+        return rows
+
+    def __next__(self):
+        row = self._timed(sqlite3.Cursor.__next__)
+        self.connection.sql_rows += 1
+        return row
+
+
+class TimedConnection(profiles.GymConnection):
+    """
+    Connection whose cursors are TimedCursors. Use as the factory argument
+    of sqlite3.connect().
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Clears the SQL time and row counters."""
+        self.sql_seconds = 0.0
+        self.sql_rows = 0
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+
+def percentile(values, pct):
+    """
+    Returns the pct-th percentile of values (nearest-rank method).
+
+    Args:
+        values (list): Measurements; need not be sorted.
+        pct (float): Percentile between 0 and 100.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil without floats
+    return ordered[int(rank) - 1]
+
+
+def _summary(seconds):
+    """Returns p50/p95/p99 of a list of durations, in milliseconds."""
+    return {f"p{p}": round(percentile(seconds, p) * 1000, 4) for p in (50, 95, 99)}
+
+
+def representative_cases(conn):
+    """
+    Picks the query cases to benchmark for a database.
+
+    Parameterized queries run with a busy and a quiet value where that
+    matters (the most attended class and an arbitrary one, the instructor
+    with the most classes and an arbitrary one) and with every type for
+    the equipment and class type queries.
+
+    Returns:
+        list: (query name, [arguments]) pairs.
+    """
+    busiest_class = conn.execute(
+        "SELECT classId FROM Attends GROUP BY classId ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    some_class = conn.execute("SELECT MAX(classId) FROM Class").fetchone()
+    busiest_instructor = conn.execute(
+        "SELECT instructorId FROM Class GROUP BY instructorId ORDER BY COUNT(*) DESC LIMIT 1").fetchone()
+    some_instructor = conn.execute("SELECT MAX(instructorId) FROM Instructor").fetchone()
+
+    cases = [("query1", []), ("query2", [])]
+    for row in {busiest_class, some_class}:
+        if row and row[0] is not None:
+            cases.append(("query3", [row[0]]))
+    for equipment_type in datagen.EQUIPMENT_TYPES:
+        cases.append(("query4", [equipment_type]))
+    cases.append(("query5", []))
+    for row in {busiest_instructor, some_instructor}:
+        if row and row[0] is not None:
+            cases.append(("query6", [row[0]]))
+    cases += [("query7", []), ("query8", [])]
+    for class_type in datagen.CLASS_TYPES:
+        cases.append(("query9", [class_type]))
+    cases.append(("query10", []))
+    return cases
+
+
+def reset_caches(conn):
+    """
+    Drops the connection's cached results and attendance index, so the next
+    query reads from SQLite like the first query of a fresh connection.
+    """
+    if conn.result_cache is not None:
+        conn.result_cache.clear()
+    conn.attendance_index = None
+
+
+def run_case(conn, func, args, repeat, sink):
+    """
+    Runs one query function repeatedly and measures it.
+
+    The query's printed output goes to sink, so formatting and writing are
+    still paid for but nothing reaches the terminal. Peak memory is taken
+    from a separate run under tracemalloc, which would otherwise slow down
+    the timed runs.
+
+    Returns:
+        dict: Latency summaries (cold), warm total latency, rows per second
+        and peak memory.
+    """
+    totals, sql_times, format_times, warm_totals = [], [], [], []
+    rows = 0
+    with redirect_stdout(sink):
+        func(conn, *args)  # warm-up: page cache and statement cache
+        for _ in range(repeat):
+            reset_caches(conn)
+            conn.reset_counters()
+            start = time.perf_counter()
+            func(conn, *args)
+            elapsed = time.perf_counter() - start
+            totals.append(elapsed)
+            sql_times.append(conn.sql_seconds)
+            format_times.append(max(0.0, elapsed - conn.sql_seconds))
+            rows = conn.sql_rows
+
+        # Warm: result cache and attendance index kept between runs
+        conn.long_lived = True
+        try:
+            func(conn, *args)
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(conn, *args)
+                warm_totals.append(time.perf_counter() - start)
+        finally:
+            conn.long_lived = False
+            reset_caches(conn)
+
+        tracemalloc.start()
+        try:
+            func(conn, *args)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    median_total = percentile(totals, 50)
+    return {
+        "runs": repeat,
+        "rows": rows,
+        "total_ms": _summary(totals),
+        "sql_ms": _summary(sql_times),
+        "format_ms": _summary(format_times),
+        "warm_total_ms": _summary(warm_totals),
+        "rows_per_sec": round(rows / median_total, 1) if median_total > 0 else None,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def dataset_path(data_dir, scale, seed, as_of):
+    """Returns the cached database file for a scale, generating it if needed."""
+    path = os.path.join(data_dir, f"bench_{scale}_{seed}_{as_of.isoformat()}.sqlite")
+    if not os.path.exists(path):
+        print(f"[INFO] Generating {scale} dataset at {path}")
+        datagen.generate(path, scale, seed, as_of)
+    return path
+
+
+def run_benchmark(databases, repeat=DEFAULT_REPEAT, only=None, profile="reporting"):
+    """
+    Benchmarks the report queries against each database.
+
+    Args:
+        databases (list): (size label, database path) pairs.
+        repeat (int): Timed runs per case.
+        only (set): Query names to run; all ten when None.
+        profile (str): Connection profile the queries run under.
+
+    Returns:
+        list: One result dict per (size, query, arguments) case.
+    """
+    reports = load_reports()
+    results = []
+    print("[INFO] Times are cold (no cached results or attendance index); "
+          "'warm' keeps both, as a long-lived connection does.")
+    with open(os.devnull, "w") as sink:
+        for size, path in databases:
+            conn = profiles.connect(path, profile, verbose=False, factory=TimedConnection)
+            try:
+                for name, args in representative_cases(conn):
+                    if only and name not in only:
+                        continue
+                    result = {"size": size, "query": name, "args": args}
+                    result.update(run_case(conn, getattr(reports, name), args, repeat, sink))
+                    results.append(result)
+                    print(f"{size} | {name}{tuple(args) if args else ''} | "
+                          f"p50 {result['total_ms']['p50']} ms "
+                          f"(sql {result['sql_ms']['p50']} ms, format {result['format_ms']['p50']} ms) | "
+                          f"warm p50 {result['warm_total_ms']['p50']} ms | "
+                          f"{result['rows']} rows")
+            finally:
+                conn.close()
+    return results
+
+
+def _case_key(result):
+    """Identifies the same case across two result files."""
+    return (result["size"], result["query"], json.dumps(result["args"]))
+
+
+def compare(base, new, threshold=DEFAULT_THRESHOLD, metric="p50"):
+    """
+    Compares two benchmark runs.
+
+    A case regresses when its total or SQL time at the chosen percentile grew
+    by more than threshold (a fraction, 0.10 = 10%) and by more than the
+    timer noise floor.
+
+    Args:
+        base (dict): Earlier run, as written by run.
+        new (dict): Later run.
+
+    Returns:
+        list: (key, field, base ms, new ms, ratio, regressed) rows.
+    """
+    base_cases = {_case_key(r): r for r in base["results"]}
+    report = []
+    for result in new["results"]:
+        key = _case_key(result)
+        if key not in base_cases:
+            continue
+        for field in ("total_ms", "sql_ms"):
+            old_ms = base_cases[key][field][metric]
+            new_ms = result[field][metric]
+            ratio = new_ms / old_ms if old_ms else float("inf")
+            regressed = new_ms - old_ms > NOISE_FLOOR_MS and ratio > 1 + threshold
+            report.append((key, field, old_ms, new_ms, ratio, regressed))
+    return report
+
+
+def _cmd_run(args):
+    as_of = args.as_of or clock.today()
+    if args.db:
+        databases = [(os.path.basename(path), path) for path in args.db]
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        databases = [(scale, dataset_path(args.data_dir, scale, args.seed, as_of))
+                     for scale in args.sizes.split(",")]
+    only = set(args.queries.split(",")) if args.queries else None
+
+    results = run_benchmark(databases, args.repeat, only, args.profile)
+    output = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "seed": args.seed,
+            "as_of": as_of.isoformat(),
+            "repeat": args.repeat,
+            "profile": args.profile,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"[INFO] Wrote {len(results)} results to {args.output}")
+    return 0
+
+
+def _cmd_compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    report = compare(base, new, args.threshold, args.metric)
+    regressions = 0
+    print(f"Size | Query | Args | Field | Base {args.metric} ms | New {args.metric} ms | Change")
+    print("------------------------------------------------------------------------------")
+    for (size, query, query_args), field, old_ms, new_ms, ratio, regressed in report:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{size} | {query} | {query_args} | {field} | {old_ms} | {new_ms} | {ratio:.2f}x{flag}")
+        regressions += regressed
+    print(f"[INFO] {regressions} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the XYZGym report queries.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run the benchmark")
+    run.add_argument("--sizes", default="tiny,small", help="comma-separated datagen scales")
+    run.add_argument("--db", action="append", help="benchmark an existing database instead (repeatable)")
+    run.add_argument("--data-dir", default="bench_data", help="where generated datasets are kept")
+    run.add_argument("--seed", type=int, default=359)
+    run.add_argument("--as-of", type=date.fromisoformat, default=None)
+    run.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    run.add_argument("--queries", help="comma-separated subset, e.g. query1,query9")
+    run.add_argument("--profile", default="reporting", choices=sorted(profiles.PROFILES),
+                     help="connection profile for the queries")
+    run.add_argument("--output", default="bench_results.json")
+
+    cmp_ = sub.add_parser("compare", help="compare two result files")
+    cmp_.add_argument("base")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                      help="allowed slowdown as a fraction (default 0.10)")
+    cmp_.add_argument("--metric", choices=["p50", "p95", "p99"], default="p50")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        return _cmd_run(args)
+    return _cmd_compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+cache.py
+-----------
+Write-aware result cache for reports that are re-run often on data that
+rarely changes (classes per gym, top instructors, class attendance).
+
+Results are keyed on the SQL text and its parameters and kept in LRU order
+under a memory cap. Every lookup first reads a cheap version stamp for the
+connection:
+    PRAGMA data_version  changes when another connection commits a write
+    total_changes        changes when this connection writes
+If either moved since the cache was last used, all entries are dropped, so
+a cached result is never older than the last write that could affect it.
+
+A hit costs the PRAGMA plus a dictionary lookup instead of re-running the
+join and GROUP BY.
+"""
+
+import sys
+from collections import OrderedDict
+
+# Approximate memory the cached rows of one connection may use
+DEFAULT_MAX_BYTES = 8 * 1024 ** 2
+# A single result larger than this fraction of the cap is not cached
+MAX_ENTRY_FRACTION = 0.25
+FETCH_SIZE = 1000
+
+
+def data_stamp(conn):
+    """
+    Returns a value that changes whenever the database may have changed:
+    (PRAGMA data_version, conn.total_changes).
+    """
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    return data_version, conn.total_changes
+
+
+def _rows_size(rows):
+    """Rough number of bytes held by a list of row tuples."""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+    return size
+
+
+class CachedCursor:
+    """
+    Read-only stand-in for an executed cursor, serving rows from memory.
+
+    When a result was too big to cache, the rows already read come first
+    and the rest are pulled from the live cursor.
+    """
+    def __init__(self, rows, description=None, rest=None):
+        self._rows = rows
+        self._pos = 0
+        self._rest = rest
+        self.description = description
+
+    def fetchmany(self, size=FETCH_SIZE):
+        batch = self._rows[self._pos:self._pos + size]
+        self._pos += len(batch)
+        if len(batch) < size and self._rest is not None:
+            batch = batch + self._rest.fetchmany(size - len(batch))
+        return batch
+
+    def fetchone(self):
+        batch = self.fetchmany(1)
+        return batch[0] if batch else None
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        if self._rest is not None:
+            rows = rows + self._rest.fetchall()
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class ResultCache:
+    """
+    LRU cache of query results for one connection.
+    """
+    def __init__(self, conn, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            conn: An active SQLite database connection.
+            max_bytes (int): Memory cap for the cached rows.
+        """
+        self.conn = conn
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # (sql, params) -> (rows, description, size)
+        self._stamp = None
+
+    def _check_version(self):
+        """Drops every entry if the database changed since the last lookup."""
+        stamp = data_stamp(self.conn)
+        if stamp != self._stamp:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self._stamp = stamp
+
+    def clear(self):
+        """Removes all cached results."""
+        self._entries.clear()
+        self.bytes = 0
+
+    def execute(self, sql, params=()):
+        """
+        Returns the result of sql as a cursor-like object, from the cache
+        when the data has not changed since it was stored.
+        """
+        self._check_version()
+        key = (sql, tuple(params))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return CachedCursor(entry[0], entry[1])
+
+        self.misses += 1
+        cursor = self.conn.execute(sql, key[1])
+        rows = []
+        size = 0
+        limit = self.max_bytes * MAX_ENTRY_FRACTION
+        while True:
+            batch = cursor.fetchmany(FETCH_SIZE)
+            if not batch:
+                break
+            rows += batch
+            size += _rows_size(batch)
+            if size > limit:
+                # Too big to keep; stream the remainder instead
+                return CachedCursor(rows, cursor.description, rest=cursor)
+        self._store(key, rows, cursor.description, size)
+        return CachedCursor(rows, cursor.description)
+
+    def _store(self, key, rows, description, size):
+        """Adds an entry and evicts least recently used ones over the cap."""
+        self._entries[key] = (rows, description, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, old_size) = self._entries.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+
+    def stats(self):
+        """Returns the hit/miss counters and current size."""
+        return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations}
+
+
+def cached_execute(conn, sql, params=()):
+    """
+    Runs sql through the connection's result cache.
+
+    The cache is created on first use and kept on the connection (a
+    profiles.GymConnection). Other connection types just run the query.
+
+    Returns:
+        A cursor, or a CachedCursor with the same fetch methods.
+    """
+    cache = getattr(conn, "result_cache", None)
+    if cache is None:
+        try:
+            cache = conn.result_cache = ResultCache(conn)
+        except AttributeError:
+            return conn.execute(sql, params)
+    return cache.execute(sql, params)
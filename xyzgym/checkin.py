@@ -0,0 +1,420 @@
+"""
+checkin.py
+-----------
+Check-in ingestion with a group-commit writer.
+
+Turnstiles and kiosks report check-ins (member, class, day) as they
+happen. Committing every swipe on its own would need a transaction per
+event, so producers only put events on a bounded queue and a single writer
+thread turns them into Attends rows in batches:
+
+    - the writer takes the first waiting event and keeps collecting until
+      it has batch_size events or flush_interval seconds have passed;
+    - the batch is written with one INSERT OR IGNORE ... SELECT over the
+      batch passed as a JSON array, and one commit. A single statement
+      releases the GIL once for the whole batch, where executemany takes it
+      back for every row and queues behind busy producer threads. The
+      Attends primary key (memberId, classId, attendanceDate) makes a
+      repeated swipe a no-op, so retries are safe;
+    - if a row is refused (the class session is full, see enrollment.py, or
+      the member or class does not exist), the batch is rolled back to its
+      savepoint and written row by row, so only the refused rows are left
+      out.
+
+When the queue is full, submit() blocks (or raises queue.Full with
+block=False or a timeout), which slows producers down to the rate the
+writer can commit. stats() reports the counts, the queue depth and how
+long producers had to wait, and the commit and end-to-end latencies.
+
+An event is on disk once its batch is committed: at most flush_interval
+after it was submitted while the writer keeps up. flush() waits until
+every event submitted so far is committed; close() drains the queue.
+
+Usage (from the repository root):
+    python -m xyzgym.checkin copy.sqlite bench --events 200000 --producers 4
+    python -m xyzgym.checkin copy.sqlite bench --rate 40000      # paced producers
+    python -m xyzgym.checkin copy.sqlite bench --batch-size 500 --flush-ms 5
+"""
+
+import argparse
+import json
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import date, timedelta
+
+from xyzgym import clock, enrollment, profiles, queries
+from xyzgym.instrument import Histogram
+from xyzgym.transaction import UnitOfWork
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 0.02  # seconds
+DEFAULT_QUEUE_SIZE = 20000
+# The benchmark checks in to a class of its own, from this day on
+BENCH_START = date(2099, 6, 1)
+
+class CheckInWriter:
+    """
+    Bounded check-in queue with one writer thread that commits the events
+    in batches.
+
+        writer = CheckInWriter("4/XYZGym.sqlite").start()
+        writer.submit(12, 3)            # today
+        writer.submit(12, 3, "2025-04-01")
+        writer.close()
+    """
+    def __init__(self, db_file, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 queue_size=DEFAULT_QUEUE_SIZE, profile=profiles.DEFAULT_PROFILE):
+        """
+        Args:
+            db_file (str): Path of the database file.
+            batch_size (int): Most events written per transaction.
+            flush_interval (float): Most seconds an event waits for others
+                to join its batch.
+            queue_size (int): Events that may wait for the writer before
+                producers are held back.
+            profile (str): Connection profile of the writer.
+        """
+        if batch_size < 1 or queue_size < 1 or flush_interval < 0:
+            raise ValueError("batch_size and queue_size must be positive, flush_interval not negative")
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.profile = profile
+        # One lock for the queue and the counters. The writer takes a whole
+        # batch per acquisition, so producers and writer rarely meet on it.
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)   # writer: events or stop
+        self._room = threading.Condition(self._lock)    # producers: queue below queue_size
+        self._idle = threading.Condition(self._lock)    # flush(): nothing queued or in flight
+        self._in_flight = 0
+        self._writer_waiting = False
+        self._thread = None
+        self._stopping = False
+        self.last_error = None
+        # Producer side
+        self.submitted = 0
+        self.rejected = 0          # queue.Full raised to a producer
+        self.producer_waits = 0    # submits that found the queue full
+        self.producer_wait_seconds = 0.0
+        # Writer side
+        self.inserted = 0
+        self.duplicates = 0
+        self.full = 0
+        self.invalid = 0
+        self.failed = 0            # events of batches that could not be written
+        self.batches = 0
+        self.largest_batch = 0
+        self.max_queue_depth = 0
+        self.commit_ms = Histogram()
+        self.lag_ms = Histogram()  # submit to commit, for the oldest event of each batch
+
+    def start(self):
+        """Starts the writer thread; returns self."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="xyzgym-checkin", daemon=True)
+            self._thread.start()
+        return self
+
+    # -- producers ----------------------------------------------------------
+
+    def submit(self, member_id, class_id, day=None, block=True, timeout=None):
+        """
+        Queues a check-in.
+
+        Args:
+            member_id (int): The member.
+            class_id (int): The class.
+            day: The day (date or YYYY-MM-DD); default today.
+            block (bool): Wait for room when the queue is full.
+            timeout (float): Most seconds to wait for room.
+
+        Raises:
+            queue.Full: If the queue stays full (or is full and block is False).
+            ValueError: If day is not a date, or the writer is closed.
+        """
+        day = clock.today().isoformat() if day is None else enrollment.session_date(day)
+        with self._lock:
+            if len(self._events) >= self.queue_size and not self._stopping:
+                if not block:
+                    self.rejected += 1
+                    raise queue.Full
+                start = time.perf_counter()
+                has_room = self._room.wait_for(
+                    lambda: len(self._events) < self.queue_size or self._stopping, timeout)
+                self.producer_waits += 1
+                self.producer_wait_seconds += time.perf_counter() - start
+                if not has_room:
+                    self.rejected += 1
+                    raise queue.Full
+            if self._stopping:
+                raise ValueError("Check-in writer is closed")
+            self._events.append((member_id, class_id, day, time.perf_counter()))
+            self.submitted += 1
+            # Wake the writer for a first event, or when a batch is complete
+            if self._writer_waiting and (len(self._events) == 1 or len(self._events) >= self.batch_size):
+                self._ready.notify()
+
+    def flush(self, timeout=None):
+        """
+        Waits until the queue is empty and the last batch is committed.
+
+        Returns:
+            bool: False if timeout (seconds) ran out first.
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._events and not self._in_flight, timeout)
+
+    def close(self):
+        """Writes everything still queued and stops the writer thread."""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._ready.notify()
+            self._room.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+    # -- writer -------------------------------------------------------------
+
+    def _collect(self):
+        """
+        Returns the next batch, or None once stopped with nothing left.
+
+        Waits for an event, then until batch_size events are queued or the
+        oldest has waited flush_interval (a backlog is taken right away).
+        """
+        with self._lock:
+            self._writer_waiting = True
+            try:
+                while not self._events:
+                    if self._stopping:
+                        return None
+                    self._ready.wait()
+                deadline = self._events[0][3] + self.flush_interval
+                while len(self._events) < self.batch_size and not self._stopping:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._ready.wait(remaining)
+            finally:
+                self._writer_waiting = False
+            depth = len(self._events)
+            batch = [self._events.popleft() for _ in range(min(self.batch_size, depth))]
+            self._in_flight = len(batch)
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self._room.notify_all()
+        return batch
+
+    def _write(self, conn, batch):
+        """Writes one batch in one transaction; returns the counts."""
+        rows = [event[:3] for event in batch]
+        sql = queries.sql("enrollment.insert")
+        counts = {"inserted": 0, "full": 0, "invalid": 0}
+        with UnitOfWork(conn):
+            conn.execute("SAVEPOINT checkin_batch")
+            try:
+                counts["inserted"] = queries.execute(conn, "checkin.insert_batch",
+                                                     (json.dumps(rows),)).rowcount
+            except sqlite3.IntegrityError:
+                # Some row was refused; find out which ones
+                conn.execute("ROLLBACK TO SAVEPOINT checkin_batch")
+                for row in rows:
+                    try:
+                        counts["inserted"] += conn.execute(sql, row).rowcount
+                    except sqlite3.IntegrityError as e:
+                        full = (enrollment.SESSION_FULL in str(e)
+                                and queries.execute(conn, "checkin.references_exist", row[:2]).fetchone()[0])
+                        counts["full" if full else "invalid"] += 1
+            conn.execute("RELEASE SAVEPOINT checkin_batch")
+        return counts
+
+    def _run(self):
+        conn = profiles.connect(self.db_file, self.profile, verbose=False)
+        try:
+            while True:
+                batch = self._collect()
+                if batch is None:
+                    break
+                start = time.perf_counter()
+                try:
+                    counts = self._write(conn, batch)
+                    error = None
+                except sqlite3.Error as e:
+                    counts, error = None, e
+                end = time.perf_counter()
+                with self._lock:
+                    self.batches += 1
+                    self.largest_batch = max(self.largest_batch, len(batch))
+                    if counts is None:
+                        self.failed += len(batch)
+                        self.last_error = str(error)
+                    else:
+                        self.inserted += counts["inserted"]
+                        self.full += counts["full"]
+                        self.invalid += counts["invalid"]
+                        self.duplicates += len(batch) - sum(counts.values())
+                        self.commit_ms.add((end - start) * 1000)
+                        self.lag_ms.add((end - batch[0][3]) * 1000)
+                    self._in_flight = 0
+                    if not self._events:
+                        self._idle.notify_all()
+                if error is not None:
+                    print(f"[ERROR] Check-in batch of {len(batch)} not written: {error}", file=sys.stderr)
+        finally:
+            conn.close()
+
+    # -- metrics ------------------------------------------------------------
+
+    def stats(self):
+        """
+        Returns the counters and backpressure metrics as a dict.
+        """
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "inserted": self.inserted,
+                "duplicates": self.duplicates,
+                "full": self.full,
+                "invalid": self.invalid,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "meanBatch": round((self.inserted + self.duplicates + self.full + self.invalid)
+                                   / self.batches, 1) if self.batches else 0,
+                "largestBatch": self.largest_batch,
+                "queueDepth": len(self._events),
+                "queueSize": self.queue_size,
+                "maxQueueDepth": self.max_queue_depth,
+                "producerWaits": self.producer_waits,
+                "producerWaitSeconds": round(self.producer_wait_seconds, 3),
+                "commitMsP50": self.commit_ms.percentile(0.5),
+                "commitMsP99": self.commit_ms.percentile(0.99),
+                "lagMsP50": self.lag_ms.percentile(0.5),
+                "lagMsP99": self.lag_ms.percentile(0.99),
+                "lagMsMax": round(self.lag_ms.max_ms, 1),
+                "lastError": self.last_error,
+            }
+
+
+def print_stats(stats):
+    print(f"Events: submitted {stats['submitted']}, inserted {stats['inserted']}, "
+          f"duplicates {stats['duplicates']}, full {stats['full']}, invalid {stats['invalid']}, "
+          f"failed {stats['failed']}, rejected {stats['rejected']}")
+    print(f"Batches: {stats['batches']} (mean {stats['meanBatch']}, largest {stats['largestBatch']}), "
+          f"commit p50 <={stats['commitMsP50']:g} ms, p99 <={stats['commitMsP99']:g} ms")
+    print(f"Queue: depth {stats['queueDepth']} of {stats['queueSize']}, max {stats['maxQueueDepth']}; "
+          f"producers waited {stats['producerWaits']} time(s), {stats['producerWaitSeconds']} s")
+    print(f"Submit to commit: p50 <={stats['lagMsP50']:g} ms, p99 <={stats['lagMsP99']:g} ms, "
+          f"max {stats['lagMsMax']} ms")
+
+
+def bench(db_file, events=200000, producers=4, repeat=0.1, rate=None, **writer_options):
+    """
+    Pushes check-ins from several producer threads through a CheckInWriter
+    and checks that every distinct one was written once. The check-ins go
+    to a new class (deleted afterwards, with its rows), from the members in
+    random order; a fraction of them is sent twice. The run writes to
+    db_file; use a copy.
+
+    Args:
+        events (int): Distinct check-ins.
+        producers (int): Producer threads.
+        repeat (float): Fraction of the check-ins sent a second time.
+        rate (float): Check-ins per second for all producers together, or
+            None for as fast as they can (on few CPUs the producers then
+            take CPU time from the writer).
+        **writer_options: batch_size, flush_interval, queue_size.
+
+    Returns:
+        tuple: (seconds, stats, rows found in Attends)
+    """
+    setup = profiles.connect(db_file, verbose=False)
+    try:
+        members = [row[0] for row in setup.execute(
+            "SELECT memberId FROM Member ORDER BY memberId LIMIT ?", (events,))]
+        # Members swipe in no particular order
+        random.Random(events).shuffle(members)
+        if not members:
+            raise ValueError(f"No members in {db_file}")
+        with UnitOfWork(setup):
+            class_id = queries.execute(setup, "class.insert", (
+                "Check-in benchmark", "HIIT", 60, events, 1, 1)).lastrowid
+    except BaseException:
+        setup.close()
+        raise
+
+    # Check-in i is member i % len(members) on day i // len(members)
+    days = [(BENCH_START + timedelta(days=n)).isoformat() for n in range(events // len(members) + 1)]
+    step = int(1 / repeat) if repeat > 0 else 0
+    writer = CheckInWriter(db_file, **writer_options).start()
+
+    def produce(offset):
+        begin = time.perf_counter()
+        for n, i in enumerate(range(offset, events, producers)):
+            if rate and n % 100 == 0:
+                ahead = begin + n * producers / rate - time.perf_counter()
+                if ahead > 0:
+                    time.sleep(ahead)
+            event = (members[i % len(members)], class_id, days[i // len(members)])
+            writer.submit(*event)
+            if step and i % step == 0:
+                writer.submit(*event)
+
+    threads = [threading.Thread(target=produce, args=(n,)) for n in range(producers)]
+    start = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+        seconds = time.perf_counter() - start
+        written = setup.execute("SELECT COUNT(*) FROM Attends WHERE classId = ?", (class_id,)).fetchone()[0]
+    finally:
+        writer.close()
+        with UnitOfWork(setup):
+            queries.execute(setup, "class.delete", (class_id,))
+        setup.close()
+    return seconds, writer.stats(), written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Group-commit check-in ingestion.")
+    parser.add_argument("db_file")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--producers", type=int, default=4)
+    parser.add_argument("--repeat", type=float, default=0.1, help="fraction of check-ins sent twice")
+    parser.add_argument("--rate", type=float, help="check-ins per second (default: as fast as possible)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--flush-ms", type=float, default=DEFAULT_FLUSH_INTERVAL * 1000)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    args = parser.parse_args(argv)
+
+    try:
+        seconds, stats, written = bench(args.db_file, args.events, args.producers, args.repeat, args.rate,
+                                        batch_size=args.batch_size, flush_interval=args.flush_ms / 1000,
+                                        queue_size=args.queue_size)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Check-in benchmark failed: {e}")
+        return 1
+    print(f"[INFO] {stats['submitted']} check-ins from {args.producers} producers in {seconds:.2f} s "
+          f"({stats['submitted'] / seconds:.0f}/s)")
+    print_stats(stats)
+    if written != args.events or stats["inserted"] != args.events:
+        print(f"[ERROR] Expected {args.events} rows, found {written} ({stats['inserted']} inserted).")
+        return 1
+    print(f"[INFO] All {written} distinct check-ins written once.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+classmerge.py
+-----------
+Merges and retires many classes in one transaction.
+
+A merge is a mapping {source classId: target classId}; a source mapped to
+None is retired. merge() loads the whole mapping into a temporary table
+(temp.ClassMergeMap, primary key sourceId) with one statement and then runs
+a fixed number of set-based statements, however many classes are involved:
+
+    1. UPDATE OR IGNORE moves every attendance record of the merged classes
+       to its target. A record whose (member, target class, date) row
+       already exists is a duplicate: OR IGNORE leaves it where it is.
+    2. Whatever is still attached to a merged class is such a duplicate and
+       is deleted.
+    3. Attendance of retired classes is deleted (only with discard=True;
+       otherwise a retired class must have no attendees).
+    4. The classes are deleted.
+
+Records are found through idx_attends_class_member, and the triggers on
+Attends keep the attendance summary, the daily rollups and the session
+occupancy counters in step, so nothing has to be rebuilt afterwards. The
+whole merge is checked before anything is written and commits or rolls
+back as one unit of work.
+
+Usage (from the repository root):
+    python -m xyzgym.classmerge 4/XYZGym.sqlite merge 12:3 13:3 14
+    python -m xyzgym.classmerge 4/XYZGym.sqlite merge --csv merges.csv --discard
+    python -m xyzgym.classmerge copy.sqlite bench --classes 2000 --targets 500
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+
+from xyzgym import enrollment, profiles, queries, summaries
+from xyzgym.transaction import UnitOfWork
+
+# Problems listed in the error of a rejected merge
+PROBLEM_LIMIT = 10
+
+
+def parse_mapping(items):
+    """
+    Turns "SOURCE:TARGET" / "SOURCE" strings (or [source, target] rows, with
+    an empty target) into a mapping {source: target or None}.
+
+    Raises:
+        ValueError: If a class ID is not a number.
+    """
+    mapping = {}
+    for item in items:
+        if isinstance(item, str):
+            item = item.split(":", 1)
+        source, target = (list(item) + [None])[:2]
+        target = "" if target is None else str(target).strip()
+        try:
+            mapping[int(str(source).strip())] = int(target) if target else None
+        except ValueError:
+            raise ValueError(f"Invalid merge '{source}:{target}' (use SOURCE:TARGET or SOURCE)") from None
+    return mapping
+
+
+def read_csv(path):
+    """
+    Reads a mapping from a CSV file with source and target class IDs per
+    row (an empty target retires the class); a header row is skipped.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    if rows and not rows[0][0].strip().isdigit():
+        rows = rows[1:]
+    return parse_mapping(rows)
+
+
+def merge(conn, mapping, discard=False, uow=None):
+    """
+    Merges and retires classes in one transaction.
+
+    Args:
+        conn: An active SQLite database connection.
+        mapping (dict): {source classId: target classId, or None to retire it}.
+        discard (bool): Delete the attendance of retired classes; without
+            it a retired class must have no attendees.
+        uow (UnitOfWork): Transaction manager to use, if the caller has one.
+
+    Returns:
+        dict: classes (deleted), moved (records now in a target class),
+        deduplicated (records dropped because the member already attended
+        the target class that day) and discarded (records of retired classes).
+
+    Raises:
+        ValueError: If a class or target does not exist, a class is merged
+            into itself or into a class that is merged too, or a retired
+            class has attendees and discard is False. Nothing is changed.
+    """
+    mapping = parse_mapping(mapping.items())
+    result = {"classes": 0, "moved": 0, "deduplicated": 0, "discarded": 0}
+    if not mapping:
+        return result
+    uow = uow if uow is not None else UnitOfWork(conn)
+    queries.create_temp_tables(conn)
+    with uow:
+        queries.execute(conn, "classmerge.map_clear")
+        queries.execute(conn, "classmerge.map_insert", (json.dumps(list(mapping.items())),))
+        problems = queries.execute(conn, "classmerge.problems", (discard, PROBLEM_LIMIT)).fetchall()
+        if problems:
+            listed = "; ".join(f"{source}" + (f" -> {target}" if target is not None else "") + f": {problem}"
+                               for source, target, problem in problems)
+            raise ValueError(f"Cannot merge classes ({listed})")
+        result["moved"] = queries.execute(conn, "classmerge.move_attendance").rowcount
+        result["deduplicated"] = queries.execute(conn, "classmerge.delete_duplicates").rowcount
+        if discard:
+            result["discarded"] = queries.execute(conn, "classmerge.delete_retired_attendance").rowcount
+        result["classes"] = queries.execute(conn, "classmerge.delete_classes").rowcount
+        queries.execute(conn, "classmerge.map_clear")
+    return result
+
+
+def print_result(result, seconds=None):
+    timing = f" in {seconds:.2f} s" if seconds is not None else ""
+    print(f"[INFO] Deleted {result['classes']} class(es){timing}: {result['moved']} attendance "
+          f"record(s) moved, {result['deduplicated']} duplicate(s) dropped, "
+          f"{result['discarded']} discarded.")
+
+
+def bench(db_file, classes, targets):
+    """
+    Merges `classes` classes into the first `targets` classes, round robin,
+    and checks the summary and session counters afterwards. Writes to
+    db_file; run it on a copy.
+
+    Returns:
+        tuple: (seconds, merge result, counters out of sync)
+
+    Raises:
+        ValueError: If the database has fewer than classes + targets classes.
+    """
+    conn = profiles.connect(db_file, verbose=False)
+    try:
+        ids = [row[0] for row in conn.execute("SELECT classId FROM Class ORDER BY classId")]
+        if len(ids) < classes + targets or targets < 1:
+            raise ValueError(f"Need {classes + targets} classes, the database has {len(ids)}")
+        mapping = {source: ids[i % targets] for i, source in enumerate(ids[targets:targets + classes])}
+        start = time.perf_counter()
+        result = merge(conn, mapping)
+        seconds = time.perf_counter() - start
+        drift = len(summaries.verify(conn)) + len(enrollment.verify(conn))
+    finally:
+        conn.close()
+    return seconds, result, drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge or retire classes in bulk.")
+    parser.add_argument("db_file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    merger = sub.add_parser("merge", help="merge classes into others (SOURCE:TARGET) or retire them (SOURCE)")
+    merger.add_argument("merges", nargs="*")
+    merger.add_argument("--csv", help="file with source,target rows")
+    merger.add_argument("--discard", action="store_true",
+                        help="delete the attendance of retired classes")
+    bench_parser = sub.add_parser("bench", help="bulk merge benchmark (writes; use a copy)")
+    bench_parser.add_argument("--classes", type=int, default=1000)
+    bench_parser.add_argument("--targets", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        try:
+            seconds, result, drift = bench(args.db_file, args.classes, args.targets)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"[ERROR] Merge benchmark failed: {e}")
+            return 1
+        print_result(result, seconds)
+        rows = result["moved"] + result["deduplicated"]
+        print(f"[INFO] {rows / seconds if seconds else 0:.0f} attendance records/s; "
+              f"{drift} summary or session counter(s) out of sync.")
+        return 1 if drift else 0
+
+    try:
+        mapping = parse_mapping(args.merges)
+        if args.csv:
+            mapping.update(read_csv(args.csv))
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    if not mapping:
+        print("[ERROR] Nothing to merge; give SOURCE:TARGET pairs or --csv.")
+        return 1
+    try:
+        conn = profiles.connect(args.db_file, verbose=False)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+    try:
+        start = time.perf_counter()
+        print_result(merge(conn, mapping, args.discard), time.perf_counter() - start)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Class merge failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""
+clock.py
+-----------
+The one clock that decides what "today" is.
+
+The schema's triggers and migrations and the report SQL (query5's
+date('now')) see the day in UTC, so every Python default for "today" uses
+the same UTC day. Mixing in the local date would make a membership count
+as expired in one place and active in another for part of each day.
+"""
+
+from datetime import datetime, timezone
+
+
+def today():
+    """Returns the current day in UTC, the day SQLite's date('now') returns."""
+    return datetime.now(timezone.utc).date()
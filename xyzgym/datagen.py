@@ -0,0 +1,352 @@
+"""
+datagen.py
+-----------
+Synthetic data generator for the XYZGym schema.
+
+Fills a new database file with realistic, reproducible data at a chosen
+scale so the report queries and the management menus can be tried at
+production size. The same seed and as-of date always produce identical data.
+
+Usage (from the repository root):
+    python -m xyzgym.datagen big.sqlite --scale large --seed 7
+    python -m xyzgym.datagen mid.sqlite --members 50000 --attends 500000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from xyzgym import clock, migrations
+from xyzgym.schema import create_schema
+
+# Row counts for each preset. Attends is a target; the generator stops there.
+SCALES = {
+    "tiny":   {"gyms": 3,   "instructors": 10,   "classes": 40,    "members": 1000,    "attends": 10000},
+    "small":  {"gyms": 10,  "instructors": 60,   "classes": 400,   "members": 20000,   "attends": 200000},
+    "medium": {"gyms": 40,  "instructors": 300,  "classes": 2500,  "members": 150000,  "attends": 1500000},
+    "large":  {"gyms": 120, "instructors": 1000, "classes": 8000,  "members": 400000,  "attends": 5000000},
+}
+
+# Rows per executemany() call / transaction during the bulk load
+CHUNK_SIZE = 100000
+
+# Values allowed by the CHECK constraints in crtdb.sql
+CLASS_TYPES = ["Yoga", "Zumba", "HIIT", "Weights"]
+CLASS_TYPE_WEIGHTS = [30, 20, 25, 25]
+EQUIPMENT_TYPES = ["Cardio", "Strength", "Flexibility", "Recovery"]
+MIN_AGE = 15
+
+# The plans from insdb.sql; add_member() relies on planId 1 = Monthly, 2 = Annual
+PLANS = [(1, "Monthly", 50), (2, "Annual", 500), (3, "Monthly", 55), (4, "Annual", 480), (5, "Monthly", 60)]
+PLAN_WEIGHTS = [40, 20, 15, 15, 10]
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Carlos", "Karen", "Daniel", "Nancy", "Matthew", "Lisa",
+    "Anthony", "Maria", "Mark", "Sandra", "Adan", "Ashley", "Luis", "Emily",
+    "Eli", "Sofia", "Diego", "Grace", "Kevin", "Chloe", "Brian", "Olivia",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+    "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson",
+    "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson", "Delgado", "Ray",
+]
+STREETS = ["Main St", "Elm St", "Pine St", "Oak St", "Birch St", "Maple Ave", "Cedar Rd", "Lake Dr"]
+CITIES = ["Portales", "Clovis", "Roswell", "Lubbock", "Amarillo", "Albuquerque", "Santa Fe", "El Paso"]
+DISTRICTS = ["Downtown", "Westside", "Eastside", "North", "South", "Uptown", "Midtown", "Airport"]
+SPECIALTIES = ["Yoga", "Pilates", "Boxing", "Dance", "Strength", "Endurance", "Mobility", "Sprint"]
+CLASS_PREFIXES = ["Morning", "Evening", "Beginner", "Advanced", "Power", "Express", "Weekend", "Intro"]
+EQUIPMENT_NAMES = {
+    "Cardio": ["Treadmill", "Rowing Machine", "Elliptical", "Spin Bike", "Stair Climber"],
+    "Strength": ["Bench Press", "Dumbbells", "Squat Rack", "Cable Machine", "Kettlebells"],
+    "Flexibility": ["Resistance Bands", "Yoga Mats", "Stretch Straps", "Foam Blocks"],
+    "Recovery": ["Foam Roller", "Massage Gun", "Sauna Pass", "Ice Bath"],
+}
+
+
+def _phone(rng):
+    """Returns a random 555 phone number."""
+    return f"555-{rng.randrange(10000):04d}"
+
+
+def _person(rng):
+    """Returns a random (first, last) name pair."""
+    return rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+
+def _chunked(rows, size=CHUNK_SIZE):
+    """Yields lists of at most size rows from an iterable."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _load(conn, table, columns, rows):
+    """
+    Bulk inserts rows into a table in CHUNK_SIZE transactions.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    placeholders = ", ".join("?" for _ in columns)
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+    total = 0
+    for chunk in _chunked(rows):
+        conn.execute("BEGIN")
+        conn.executemany(sql, chunk)
+        conn.commit()
+        total += len(chunk)
+    return total
+
+
+def gym_rows(rng, count):
+    """Generates GymFacility rows."""
+    for gym_id in range(1, count + 1):
+        location = f"{rng.choice(DISTRICTS)} {rng.choice(CITIES)} Gym"
+        first, last = _person(rng)
+        yield (gym_id, location, _phone(rng), f"{first} {last}")
+
+
+def instructor_rows(rng, count):
+    """Generates Instructor rows with unique emails."""
+    for instructor_id in range(1, count + 1):
+        first, last = _person(rng)
+        email = f"{first.lower()}.{last.lower()}.{instructor_id}@xyzgym.example"
+        yield (instructor_id, f"{first} {last}", rng.choice(SPECIALTIES), _phone(rng), email)
+
+
+def class_rows(rng, count, instructors, gyms):
+    """
+    Generates Class rows. A few instructors teach many classes, most teach a
+    handful, which gives query8 a meaningful top three.
+    """
+    instructor_weights = [1.0 / (i ** 0.8) for i in range(1, instructors + 1)]
+    instructor_cum = _cumulative(instructor_weights)
+    for class_id in range(1, count + 1):
+        class_type = rng.choices(CLASS_TYPES, weights=CLASS_TYPE_WEIGHTS)[0]
+        name = f"{rng.choice(CLASS_PREFIXES)} {class_type}"
+        duration = rng.choice([30, 45, 60, 75, 90])
+        capacity = rng.choice([8, 10, 12, 15, 20, 25, 30, 40])
+        instructor_id = rng.choices(range(1, instructors + 1), cum_weights=instructor_cum)[0]
+        gym_id = rng.randint(1, gyms)
+        yield (class_id, name, class_type, duration, capacity, instructor_id, gym_id)
+
+
+def equipment_rows(rng, gyms):
+    """Generates a few pieces of equipment of every type for each gym."""
+    equipment_id = 0
+    for gym_id in range(1, gyms + 1):
+        for equipment_type in EQUIPMENT_TYPES:
+            for name in rng.sample(EQUIPMENT_NAMES[equipment_type], 2):
+                equipment_id += 1
+                yield (equipment_id, name, equipment_type, rng.randint(1, 20), gym_id)
+
+
+def member_rows(rng, count, as_of, plans):
+    """
+    Generates Member rows and records each member's plan in plans.
+
+    Memberships start within the last three years. Monthly plans run for one
+    to twelve months and annual plans for one or two years, so a realistic
+    share of memberships has already expired on the as-of date.
+    """
+    plan_ids = [p[0] for p in PLANS]
+    for member_id in range(1, count + 1):
+        first, last = _person(rng)
+        # Most members are in their twenties and thirties; never under MIN_AGE
+        age = max(MIN_AGE, int(rng.triangular(MIN_AGE, 75, 27)))
+        start = as_of - timedelta(days=rng.randrange(3 * 365))
+        plan_id = rng.choices(plan_ids, weights=PLAN_WEIGHTS)[0]
+        if PLANS[plan_id - 1][1] == "Monthly":
+            periods = rng.randint(1, 12)
+            end = start + timedelta(days=30 * periods)
+        else:
+            periods = rng.randint(1, 2)
+            end = start + timedelta(days=365 * periods)
+        plans.append((plan_id, start, periods))
+        email = f"{first.lower()}.{last.lower()}.{member_id}@example.com"
+        address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}"
+        yield (member_id, f"{first} {last}", email, _phone(rng), address, age,
+               start.isoformat(), end.isoformat())
+
+
+def payment_rows(rng, plans, as_of):
+    """
+    Generates Payment rows: one payment per billing period of each membership,
+    up to the as-of date, at the plan's cost.
+    """
+    payment_id = 0
+    for member_id, (plan_id, start, periods) in enumerate(plans, start=1):
+        _, plan_type, cost = PLANS[plan_id - 1]
+        step = 30 if plan_type == "Monthly" else 365
+        for period in range(periods):
+            paid_on = start + timedelta(days=step * period)
+            if paid_on > as_of:
+                break
+            payment_id += 1
+            yield (payment_id, member_id, plan_id, float(cost), paid_on.isoformat())
+
+
+def attends_rows(rng, target, classes, members, as_of):
+    """
+    Generates Attends rows as class sessions.
+
+    Every class meets one to three times a week. Each session is filled to
+    between a third and all of its capacity, so no session is ever over
+    capacity. Members are drawn with a skewed popularity, so regulars show up
+    far more often than occasional visitors. Sessions are laid out backwards
+    from the as-of date until the target row count is reached, so the most
+    recent weeks (used by query10) are always populated.
+
+    Args:
+        target (int): Number of Attends rows to produce.
+        classes (list): (classId, classCapacity) pairs.
+        members (int): Number of members.
+    """
+    if target <= 0 or not classes or members <= 0:
+        return
+    member_cum = _cumulative([1.0 / (i ** 0.6) for i in range(1, members + 1)])
+    # Shuffle member ids so popularity is not tied to the id order
+    member_ids = list(range(1, members + 1))
+    rng.shuffle(member_ids)
+    schedule = [(class_id, capacity, sorted(rng.sample(range(7), rng.randint(1, 3))))
+                for class_id, capacity in classes]
+
+    produced = 0
+    week = 0
+    while produced < target:
+        week_start = as_of - timedelta(days=as_of.weekday() + 7 * week)
+        for class_id, capacity, weekdays in schedule:
+            for weekday in weekdays:
+                session_day = week_start + timedelta(days=weekday)
+                if session_day > as_of:
+                    continue
+                fill = rng.randint(max(1, capacity // 3), capacity)
+                fill = min(fill, members, target - produced)
+                picks = rng.choices(member_ids, cum_weights=member_cum, k=fill * 2)
+                seen = set()
+                day = session_day.isoformat()
+                for member_id in picks:
+                    if member_id in seen:
+                        continue
+                    seen.add(member_id)
+                    yield (member_id, class_id, day)
+                    if len(seen) == fill:
+                        break
+                produced += len(seen)
+                if produced >= target:
+                    return
+        week += 1
+
+
+def _cumulative(weights):
+    """Returns running totals of weights for random.choices(cum_weights=...)."""
+    total = 0.0
+    cum = []
+    for w in weights:
+        total += w
+        cum.append(total)
+    return cum
+
+
+def generate(db_file, scale="small", seed=359, as_of=None, overwrite=False, **counts):
+    """
+    Creates a new database file filled with synthetic data.
+
+    Args:
+        db_file (str): Path of the database to create.
+        scale (str): One of the SCALES presets.
+        seed (int): Random seed; the same seed and as_of give identical data.
+        as_of (date): The "current" date the data is laid out around.
+            Defaults to today.
+        overwrite (bool): Replace db_file if it already exists.
+        **counts: Overrides for individual preset counts
+            (gyms, instructors, classes, members, attends).
+
+    Returns:
+        dict: The number of rows written to each table.
+    """
+    sizes = dict(SCALES[scale])
+    sizes.update({k: v for k, v in counts.items() if v is not None})
+    as_of = as_of or clock.today()
+    rng = random.Random(seed)
+
+    if os.path.exists(db_file):
+        if not overwrite:
+            raise FileExistsError(f"{db_file} already exists (use overwrite to replace it)")
+        os.remove(db_file)
+
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    try:
+        # The file is new, so a crash just means generating it again
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA cache_size = -200000")
+        create_schema(conn)
+
+        written = {}
+        written["GymFacility"] = _load(conn, "GymFacility", ["gymId", "location", "phone", "manager"],
+                                       gym_rows(rng, sizes["gyms"]))
+        written["Instructor"] = _load(conn, "Instructor", ["instructorId", "name", "specialty", "phone", "email"],
+                                      instructor_rows(rng, sizes["instructors"]))
+        written["MembershipPlan"] = _load(conn, "MembershipPlan", ["planId", "planType", "cost"], PLANS)
+        class_list = list(class_rows(rng, sizes["classes"], sizes["instructors"], sizes["gyms"]))
+        written["Class"] = _load(conn, "Class", ["classId", "className", "classType", "duration",
+                                                 "classCapacity", "instructorId", "gymId"], class_list)
+        written["Equipment"] = _load(conn, "Equipment", ["equipmentId", "name", "type", "quantity", "gymId"],
+                                     equipment_rows(rng, sizes["gyms"]))
+        plans = []
+        written["Member"] = _load(conn, "Member", ["memberId", "name", "email", "phone", "address", "age",
+                                                   "membershipStartDate", "membershipEndDate"],
+                                  member_rows(rng, sizes["members"], as_of, plans))
+        written["Payment"] = _load(conn, "Payment", ["paymentId", "memberId", "planId", "amountPaid", "paymentDate"],
+                                   payment_rows(rng, plans, as_of))
+        written["Attends"] = _load(conn, "Attends", ["memberId", "classId", "attendanceDate"],
+                                   attends_rows(rng, sizes["attends"], [(c[0], c[4]) for c in class_list],
+                                                sizes["members"], as_of))
+
+        # Indexes are cheaper to build once the data is in place
+        migrations.migrate(conn, verbose=False)
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic XYZGym database.")
+    parser.add_argument("db_file", help="database file to create")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=359)
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None,
+                        help="date the data is laid out around (YYYY-MM-DD, default: today)")
+    parser.add_argument("--force", action="store_true", help="overwrite an existing file")
+    for name in ("gyms", "instructors", "classes", "members", "attends"):
+        parser.add_argument(f"--{name}", type=int, default=None, help=f"override the number of {name}")
+    args = parser.parse_args(argv)
+
+    try:
+        written = generate(args.db_file, args.scale, args.seed, args.as_of, args.force,
+                           gyms=args.gyms, instructors=args.instructors, classes=args.classes,
+                           members=args.members, attends=args.attends)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not generate database: {e}")
+        return 1
+    print(f"[INFO] Generated {args.db_file} (scale={args.scale}, seed={args.seed})")
+    for table, count in written.items():
+        print(f"{table} | {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
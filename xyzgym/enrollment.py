@@ -0,0 +1,365 @@
+"""
+enrollment.py
+-----------
+Class enrollment with the class capacity enforced.
+
+A class session is a class on one day. ClassSessionOccupancy (schema
+migration 8) keeps the number of members enrolled in every session, and
+triggers on Attends keep it in step with every insert, delete and move. A
+BEFORE INSERT trigger refuses a new attendance record once the session has
+classCapacity members, so the check costs two primary-key lookups instead
+of a COUNT over Attends, and it applies to every writer of Attends, not
+just this module.
+
+The check and the increment happen inside the INSERT statement, while the
+connection holds the database write lock, so two clients can never take
+the last seat together, whether they are threads or separate processes.
+Enrollments from threads of one process also queue on a process-wide lock
+before they ask SQLite for the write lock: a thread waiting on the Python
+lock wakes up as soon as it is free, while SQLite's busy handler polls with
+growing sleeps. Other processes wait in the busy handler (busy_timeout of
+the connection profile). Each enrollment is its own short transaction; in
+WAL mode with synchronous=NORMAL a commit does not wait for an fsync.
+
+Usage (from the repository root):
+    python -m xyzgym.enrollment 4/XYZGym.sqlite enroll 12 3 2025-04-01
+    python -m xyzgym.enrollment 4/XYZGym.sqlite occupancy 3 2025-04-01
+    python -m xyzgym.enrollment 4/XYZGym.sqlite sessions 3
+    python -m xyzgym.enrollment 4/XYZGym.sqlite verify
+    python -m xyzgym.enrollment copy.sqlite bench --clients 16 --attempts 4000
+"""
+
+import argparse
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date
+
+from xyzgym import clock, profiles, queries
+from xyzgym.bench import percentile
+from xyzgym.render import render
+from xyzgym.transaction import UnitOfWork
+
+# Message of the capacity trigger (migration 8)
+SESSION_FULL = "class session is full"
+SESSIONS_LIMIT = 30
+# The benchmark enrolls into a class of its own, on this day
+BENCH_DATE = "2099-01-01"
+
+# Counts computed from Attends, for verify() and rebuild()
+OCCUPANCY_SOURCE = """
+    SELECT a.classId, date(a.attendanceDate), COUNT(*) FROM Attends a
+    JOIN Class c ON c.classId = a.classId
+    GROUP BY 1, 2
+"""
+
+_write_lock = threading.Lock()
+
+
+class SessionFull(sqlite3.IntegrityError):
+    """Raised when a class session has no seats left."""
+
+
+def session_date(value):
+    """
+    Returns a session day as YYYY-MM-DD.
+
+    Raises:
+        ValueError: If value is not a date.
+    """
+    if isinstance(value, date):
+        return value.isoformat()
+    try:
+        return date.fromisoformat(str(value).strip()).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid session date '{value}' (use YYYY-MM-DD)") from None
+
+
+def _serialized(conn, serialize):
+    # Inside an open transaction the connection already holds (or waits on)
+    # the write lock; taking the Python lock too could only add waiting
+    if serialize and not conn.in_transaction:
+        return _write_lock
+    return nullcontext()
+
+
+def enroll(conn, member_id, class_id, day, uow=None, serialize=True):
+    """
+    Enrolls a member in a class session if it has a seat left.
+
+    Args:
+        conn: An active SQLite database connection.
+        member_id (int): The member.
+        class_id (int): The class.
+        day: The session day (date or YYYY-MM-DD).
+        uow (UnitOfWork): Transaction manager to use, if the caller has one.
+        serialize (bool): Queue on the process-wide enrollment lock first.
+
+    Returns:
+        bool: True if the member was enrolled, False if they already were.
+
+    Raises:
+        ValueError: If the member or class does not exist, or day is not a date.
+        SessionFull: If the session already has classCapacity members.
+    """
+    day = session_date(day)
+    uow = uow if uow is not None else UnitOfWork(conn)
+    with _serialized(conn, serialize), uow:
+        if queries.execute(conn, "class.name", (class_id,)).fetchone() is None:
+            raise ValueError(f"Class {class_id} not found")
+        if queries.execute(conn, "member.name", (member_id,)).fetchone() is None:
+            raise ValueError(f"Member {member_id} not found")
+        try:
+            cursor = queries.execute(conn, "enrollment.insert", (member_id, class_id, day))
+        except sqlite3.IntegrityError as e:
+            if SESSION_FULL in str(e):
+                raise SessionFull(f"Class {class_id} is full on {day}") from None
+            raise
+    return cursor.rowcount == 1
+
+
+def cancel(conn, member_id, class_id, day, uow=None, serialize=True):
+    """
+    Gives up a member's seat in a class session.
+
+    Returns:
+        bool: True if the member was enrolled.
+
+    Raises:
+        ValueError: If day is not a date.
+    """
+    day = session_date(day)
+    uow = uow if uow is not None else UnitOfWork(conn)
+    with _serialized(conn, serialize), uow:
+        cursor = queries.execute(conn, "enrollment.delete", (member_id, class_id, day))
+    return cursor.rowcount == 1
+
+
+def occupancy(conn, class_id, day):
+    """
+    Returns (enrolled, capacity) for a class session, or None if the class
+    does not exist.
+
+    Raises:
+        ValueError: If day is not a date.
+    """
+    row = queries.execute(conn, "enrollment.occupancy", (session_date(day), class_id)).fetchone()
+    if row is None:
+        return None
+    return row[1], row[0]
+
+
+def sessions(conn, class_id, start=None, limit=SESSIONS_LIMIT):
+    """
+    Returns a cursor of (sessionDate, enrolled, classCapacity) for the
+    sessions of a class from start (default: today) on, that have at least
+    one member enrolled.
+    """
+    start = session_date(start) if start is not None else clock.today().isoformat()
+    return queries.execute(conn, "enrollment.sessions", (class_id, start, limit))
+
+
+def verify(conn):
+    """
+    Compares ClassSessionOccupancy with counts computed from Attends.
+
+    Returns:
+        list: ((classId, sessionDate), stored count, actual count) for every
+        session that differs; a missing row has a count of None.
+    """
+    stored = {(row[0], row[1]): row[2] for row in conn.execute(
+        "SELECT classId, sessionDate, enrolled FROM ClassSessionOccupancy")}
+    actual = {(row[0], row[1]): row[2] for row in conn.execute(OCCUPANCY_SOURCE)}
+    return [(key, stored.get(key), actual.get(key))
+            for key in sorted(stored.keys() | actual.keys())
+            if stored.get(key) != actual.get(key)]
+
+
+def rebuild(conn, uow=None):
+    """
+    Recomputes ClassSessionOccupancy from Attends in one transaction.
+
+    Returns:
+        int: Number of sessions written.
+    """
+    uow = uow if uow is not None else UnitOfWork(conn)
+    with uow:
+        conn.execute("DELETE FROM ClassSessionOccupancy")
+        cursor = conn.execute(
+            f"INSERT INTO ClassSessionOccupancy (classId, sessionDate, enrolled) {OCCUPANCY_SOURCE}")
+    return cursor.rowcount
+
+
+def bench(db_file, clients=8, attempts=4000, capacity=None, serialize=True):
+    """
+    Enrolls distinct members into one session of a new class from several
+    threads at once, each with its own connection, then checks that exactly
+    capacity members got a seat. The class (and its enrollments) is deleted
+    afterwards. The run writes to db_file; use a copy.
+
+    Args:
+        clients (int): Number of threads.
+        attempts (int): Number of enrollments tried (one per member).
+        capacity (int): Seats in the class (default: three quarters of attempts).
+        serialize (bool): Use the process-wide enrollment lock.
+
+    Returns:
+        dict: Counts, timings and the consistency check.
+
+    Raises:
+        ValueError: If the database has fewer than attempts members.
+    """
+    capacity = capacity if capacity is not None else attempts * 3 // 4
+    setup = profiles.connect(db_file, verbose=False)
+    try:
+        members = [row[0] for row in setup.execute("SELECT memberId FROM Member LIMIT ?", (attempts,))]
+        if len(members) < attempts:
+            raise ValueError(f"Only {len(members)} members in {db_file}; lower --attempts")
+        with UnitOfWork(setup):
+            class_id = queries.execute(setup, "class.insert", (
+                "Enrollment benchmark", "HIIT", 60, capacity, 1, 1)).lastrowid
+    except BaseException:
+        setup.close()
+        raise
+
+    outcomes = {"enrolled": 0, "duplicate": 0, "full": 0, "busy": 0}
+    latencies = []
+    results_lock = threading.Lock()
+
+    def client(chunk):
+        conn = profiles.connect(db_file, verbose=False)
+        mine = {key: 0 for key in outcomes}
+        seconds = []
+        try:
+            for member_id in chunk:
+                start = time.perf_counter()
+                try:
+                    mine["enrolled" if enroll(conn, member_id, class_id, BENCH_DATE,
+                                              serialize=serialize) else "duplicate"] += 1
+                except SessionFull:
+                    mine["full"] += 1
+                except sqlite3.OperationalError:
+                    mine["busy"] += 1
+                seconds.append(time.perf_counter() - start)
+        finally:
+            conn.close()
+        with results_lock:
+            for key, count in mine.items():
+                outcomes[key] += count
+            latencies.extend(seconds)
+
+    threads = [threading.Thread(target=client, args=(members[i::clients],)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    try:
+        counted = setup.execute("SELECT COUNT(*) FROM Attends WHERE classId = ? AND attendanceDate = ?",
+                                (class_id, BENCH_DATE)).fetchone()[0]
+        counter = occupancy(setup, class_id, BENCH_DATE)[0]
+    finally:
+        with UnitOfWork(setup):
+            queries.execute(setup, "class.delete", (class_id,))
+        setup.close()
+    return dict(outcomes, clients=clients, attempts=attempts, capacity=capacity,
+                seconds=wall, per_second=attempts / wall if wall else 0.0,
+                p50_ms=(percentile(latencies, 50) or 0) * 1000,
+                p99_ms=(percentile(latencies, 99) or 0) * 1000,
+                counter=counter, counted=counted,
+                consistent=counter == counted == min(capacity, attempts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Class enrollment with capacity checks.")
+    parser.add_argument("db_file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, helptext in (("enroll", "enroll a member in a class session"),
+                           ("cancel", "give up a member's seat")):
+        command = sub.add_parser(name, help=helptext)
+        command.add_argument("member_id", type=int)
+        command.add_argument("class_id", type=int)
+        command.add_argument("day")
+    occupied = sub.add_parser("occupancy", help="seats taken in a class session")
+    occupied.add_argument("class_id", type=int)
+    occupied.add_argument("day")
+    listed = sub.add_parser("sessions", help="upcoming sessions of a class")
+    listed.add_argument("class_id", type=int)
+    listed.add_argument("--from", dest="start")
+    sub.add_parser("verify", help="compare the session counters with Attends")
+    sub.add_parser("rebuild", help="recompute the session counters")
+    bench_parser = sub.add_parser("bench", help="concurrent enrollment benchmark (writes; use a copy)")
+    bench_parser.add_argument("--clients", type=int, default=8)
+    bench_parser.add_argument("--attempts", type=int, default=4000)
+    bench_parser.add_argument("--capacity", type=int)
+    bench_parser.add_argument("--no-lock", action="store_true",
+                              help="leave the queueing to SQLite's busy handler")
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        try:
+            result = bench(args.db_file, args.clients, args.attempts, args.capacity, not args.no_lock)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"[ERROR] Enrollment benchmark failed: {e}")
+            return 1
+        print(f"[INFO] {result['attempts']} enrollments from {result['clients']} clients in "
+              f"{result['seconds']:.2f} s ({result['per_second']:.0f}/s, "
+              f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms)")
+        print(f"[INFO] Enrolled {result['enrolled']}, full {result['full']}, busy {result['busy']}, "
+              f"duplicate {result['duplicate']} (capacity {result['capacity']})")
+        if not result["consistent"]:
+            print(f"[ERROR] Counter {result['counter']} and Attends {result['counted']} "
+                  f"do not match the capacity.")
+            return 1
+        print("[INFO] Counter, Attends and capacity agree.")
+        return 0
+
+    try:
+        conn = profiles.connect(args.db_file, verbose=False)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+    try:
+        if args.command == "enroll":
+            if enroll(conn, args.member_id, args.class_id, args.day):
+                print(f"[INFO] Member {args.member_id} enrolled in class {args.class_id} on {args.day}.")
+            else:
+                print(f"[INFO] Member {args.member_id} was already enrolled.")
+        elif args.command == "cancel":
+            if cancel(conn, args.member_id, args.class_id, args.day):
+                print("[INFO] Seat given up.")
+            else:
+                print(f"[INFO] Member {args.member_id} was not enrolled.")
+        elif args.command == "occupancy":
+            seats = occupancy(conn, args.class_id, args.day)
+            if seats is None:
+                print(f"[ERROR] Class {args.class_id} not found.")
+                return 1
+            print(f"Class {args.class_id} on {session_date(args.day)}: {seats[0]} of {seats[1]} seats taken")
+        elif args.command == "sessions":
+            render(sessions(conn, args.class_id, args.start),
+                   header=["Session Date | Enrolled | Capacity", "-----------------------------------"],
+                   empty="No upcoming sessions with members enrolled.")
+        else:
+            drift = verify(conn)
+            print(f"[INFO] {len(drift)} session counter(s) out of sync.")
+            for (class_id, day), stored, actual in drift[:20]:
+                print(f"{class_id} | {day} | stored {stored} | actual {actual}")
+            if args.command == "rebuild":
+                print(f"[INFO] Rebuilt ClassSessionOccupancy: {rebuild(conn)} session(s)")
+            elif drift:
+                return 1
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Enrollment {args.command} failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
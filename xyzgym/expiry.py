@@ -0,0 +1,184 @@
+"""
+expiry.py
+-----------
+Membership expiry calendar and the daily status sweep.
+
+The calendar is the (membershipEndDate, name, age) index on Member (schema
+migration 10): "expired", "expiring within N days" and "expired between two
+dates" are range lookups on it, and calendar() returns the number of
+memberships ending on each day of a range.
+
+sweep() is meant to run once a day (the management app runs it at
+startup). It returns only the members whose status changed since the last
+sweep:
+    - memberships that ended in between (a range lookup on the end date);
+    - members whose end date was changed, or who were added, and whose
+      status now differs from before (recorded by triggers in
+      ExpiryStatusLog).
+Functions added with add_sweep_hook() are called with the changes.
+
+Usage (from the repository root):
+    python -m xyzgym.expiry 4/XYZGym.sqlite expiring 14
+    python -m xyzgym.expiry 4/XYZGym.sqlite between 2025-01-01 2025-03-31
+    python -m xyzgym.expiry 4/XYZGym.sqlite sweep
+"""
+
+import argparse
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+from xyzgym import clock, profiles
+from xyzgym.render import render
+from xyzgym.transaction import UnitOfWork
+
+DEFAULT_EXPIRING_DAYS = 30
+
+# Called as hook(conn, changes) after every sweep
+SWEEP_HOOKS = []
+
+MEMBER_HEADER = ["Member ID | Name | Membership End Date",
+                 "-------------------------------------------"]
+
+
+def _today():
+    return clock.today().isoformat()
+
+
+def expired(conn, as_of=None):
+    """
+    Returns a cursor of (memberId, name, membershipEndDate) for memberships
+    that ended before as_of (default: today), by end date.
+    """
+    return conn.execute("""
+        SELECT memberId, name, membershipEndDate
+        FROM Member
+        WHERE membershipEndDate < ?
+        ORDER BY membershipEndDate
+    """, (as_of or _today(),))
+
+
+def expiring_within(conn, days=DEFAULT_EXPIRING_DAYS, as_of=None):
+    """
+    Returns a cursor of (memberId, name, membershipEndDate) for active
+    memberships that end within the next days days.
+    """
+    start = as_of or _today()
+    end = (date.fromisoformat(start) + timedelta(days=days)).isoformat()
+    return expired_between(conn, start, end)
+
+
+def expired_between(conn, start, end):
+    """
+    Returns a cursor of (memberId, name, membershipEndDate) for memberships
+    ending from start to end (YYYY-MM-DD, both included), by end date.
+    """
+    return conn.execute("""
+        SELECT memberId, name, membershipEndDate
+        FROM Member
+        WHERE membershipEndDate >= ? AND membershipEndDate <= ?
+        ORDER BY membershipEndDate
+    """, (start, end))
+
+
+def calendar(conn, start, end):
+    """Returns (day, memberships ending that day) rows from start to end."""
+    return conn.execute("""
+        SELECT membershipEndDate, COUNT(*)
+        FROM Member
+        WHERE membershipEndDate >= ? AND membershipEndDate <= ?
+        GROUP BY membershipEndDate
+    """, (start, end)).fetchall()
+
+
+def add_sweep_hook(hook):
+    """Registers hook(conn, changes) to be called after every sweep."""
+    SWEEP_HOOKS.append(hook)
+
+
+def sweep(conn, today=None):
+    """
+    Finds the members whose membership status changed since the last sweep
+    and records today as the new sweep day.
+
+    Args:
+        conn: An active SQLite database connection.
+        today (str): The current day (YYYY-MM-DD); defaults to today.
+
+    Returns:
+        list: (memberId, name, membershipEndDate, expired) rows, where
+        expired is 1 if the membership is now expired and 0 if it is active
+        again.
+    """
+    today = today or _today()
+    with UnitOfWork(conn):
+        last = conn.execute("SELECT lastSweep FROM ExpirySweepState WHERE id = 1").fetchone()[0]
+        changes = conn.execute("""
+            SELECT memberId, name, membershipEndDate, 1
+            FROM Member
+            WHERE membershipEndDate >= ? AND membershipEndDate < ?
+              AND memberId NOT IN (SELECT memberId FROM ExpiryStatusLog)
+            UNION ALL
+            SELECT m.memberId, m.name, m.membershipEndDate, m.membershipEndDate < ?
+            FROM ExpiryStatusLog l
+            JOIN Member m ON m.memberId = l.memberId
+            WHERE (m.membershipEndDate < ?) != l.wasExpired
+            ORDER BY 1
+        """, (last, today, today, today)).fetchall()
+        conn.execute("DELETE FROM ExpiryStatusLog")
+        conn.execute("UPDATE ExpirySweepState SET lastSweep = ? WHERE id = 1", (today,))
+    for hook in SWEEP_HOOKS:
+        hook(conn, changes)
+    return changes
+
+
+def print_sweep(changes, limit=20):
+    """Prints the result of a sweep."""
+    expired_count = sum(1 for c in changes if c[3])
+    print(f"[INFO] Daily membership sweep: {expired_count} membership(s) expired, "
+          f"{len(changes) - expired_count} renewed since the last sweep.")
+    for member_id, name, end_date, is_expired in changes[:limit]:
+        print(f"{member_id} | {name} | {end_date} | {'expired' if is_expired else 'active'}")
+    if len(changes) > limit:
+        print(f"... and {len(changes) - limit} more")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Membership expiry lists and daily sweep.")
+    parser.add_argument("db_file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("expired", help="memberships that have ended")
+    expiring = sub.add_parser("expiring", help="memberships ending in the next N days")
+    expiring.add_argument("days", type=int, nargs="?", default=DEFAULT_EXPIRING_DAYS)
+    between = sub.add_parser("between", help="memberships ending between two dates")
+    between.add_argument("start", type=date.fromisoformat)
+    between.add_argument("end", type=date.fromisoformat)
+    sub.add_parser("sweep", help="run the daily status sweep")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = profiles.connect(args.db_file, verbose=False)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+    try:
+        if args.command == "sweep":
+            print_sweep(sweep(conn))
+        elif args.command == "expired":
+            render(expired(conn), header=MEMBER_HEADER, empty="No expired memberships found.")
+        elif args.command == "expiring":
+            render(expiring_within(conn, args.days), header=MEMBER_HEADER,
+                   empty=f"No memberships end in the next {args.days} days.")
+        else:
+            render(expired_between(conn, args.start.isoformat(), args.end.isoformat()),
+                   header=MEMBER_HEADER, empty="No memberships end in that range.")
+    except sqlite3.Error as e:
+        print(f"[ERROR] Expiry {args.command} failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+export.py
+-----------
+Exports a whole table (e.g. Attends) as CSV, TSV or JSON Lines, optionally
+gzipped, for downstream jobs.
+
+Rows are streamed from the cursor in batches straight into the writer (see
+xyzgym/render.py), so memory stays flat whatever the table size. Use
+--format/--output/--gzip on 3/file.py to export a report query instead.
+
+Usage (from the repository root):
+    python -m xyzgym.export 4/XYZGym.sqlite Attends --gzip --output attends.csv.gz
+    python -m xyzgym.export 4/XYZGym.sqlite Member --format jsonl > members.jsonl
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from contextlib import redirect_stdout
+
+from xyzgym import profiles
+from xyzgym.render import output_stream, render, WRITERS
+
+DEFAULT_FORMAT = "csv"
+
+
+def table_names(conn):
+    """Returns the names of the tables in the database."""
+    return [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+
+
+def export_table(conn, table, writer):
+    """
+    Streams every row of a table to a writer, in rowid order when the table has one.
+
+    Args:
+        conn: An active SQLite database connection.
+        table (str): Name of an existing table.
+        writer: A writer from xyzgym.render.WRITERS.
+
+    Returns:
+        int: The number of rows written.
+
+    Raises:
+        ValueError: If the table does not exist.
+    """
+    names = {name.lower(): name for name in table_names(conn)}
+    if table.lower() not in names:
+        raise ValueError(f"No table named '{table}'")
+    table = names[table.lower()]
+    without_rowid = conn.execute(
+        "SELECT sql LIKE '%WITHOUT ROWID%' FROM sqlite_master WHERE name = ?", (table,)).fetchone()[0]
+    order = "" if without_rowid else " ORDER BY rowid"
+    return render(conn.execute(f'SELECT * FROM "{table}"{order}'), writer=writer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a table as CSV, TSV or JSON Lines.")
+    parser.add_argument("db_file")
+    parser.add_argument("table")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=[f for f in WRITERS if f != "text"])
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="compress the output")
+    parser.add_argument("--profile", default="reporting", choices=sorted(profiles.PROFILES))
+    args = parser.parse_args(argv)
+
+    try:
+        # Migration messages go to stderr so they never mix with the data
+        with redirect_stdout(sys.stderr):
+            conn = profiles.connect(args.db_file, args.profile, verbose=False)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}", file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    try:
+        with output_stream(args.output, args.gzip) as stream:
+            count = export_table(conn, args.table, WRITERS[args.format](stream))
+    except (ValueError, OSError, sqlite3.Error) as e:
+        print(f"[ERROR] Export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    print(f"[INFO] Exported {count} rows from {args.table} in {time.perf_counter() - start:.2f} s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+importer.py
+-----------
+Bulk import of members, with their first payment, from a CSV file.
+
+The CSV is streamed in chunks. Each row is checked against the schema's
+CHECK and UNIQUE(email) constraints before anything is written, so a bad
+row is reported and skipped instead of aborting the batch. Valid rows of a
+chunk are inserted with executemany() in a single transaction.
+
+CSV columns (header row required):
+    name, email, phone, address, age, membershipStartDate, membershipEndDate, plan
+    plus optional amountPaid and paymentDate.
+plan is a planId from MembershipPlan, or "Monthly" / "Annual" (planId 1 / 2,
+as in MemberManager.add_member). amountPaid defaults to the plan's cost and
+paymentDate to today.
+
+Usage (from the repository root):
+    python -m xyzgym.importer 4/XYZGym.sqlite members.csv --rejects rejected.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import sqlite3
+import sys
+import time
+from datetime import date
+
+from xyzgym import clock, profiles
+from xyzgym.transaction import UnitOfWork
+
+# Rows validated and inserted per transaction
+CHUNK_SIZE = 5000
+
+REQUIRED_COLUMNS = ["name", "email", "age", "membershipStartDate", "membershipEndDate", "plan"]
+MIN_AGE = 15
+# Same plan choices as the add-member menu
+PLAN_ALIASES = {"monthly": 1, "annual": 2}
+
+
+class ImportResult:
+    """
+    Outcome of a bulk import: counts, timing and the rejected rows.
+    """
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = []  # (line number, row dict, reason)
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        total = self.inserted + len(self.rejected)
+        return total / self.seconds if self.seconds > 0 else 0.0
+
+    def print_report(self, limit=20):
+        """Prints a summary and the first rejected rows."""
+        print(f"[INFO] Imported {self.inserted} member(s), rejected {len(self.rejected)} row(s) "
+              f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s).")
+        for line, _, reason in self.rejected[:limit]:
+            print(f"Line {line} | {reason}")
+        if len(self.rejected) > limit:
+            print(f"... and {len(self.rejected) - limit} more")
+
+
+def _valid_date(text):
+    """Returns text if it is a YYYY-MM-DD date, otherwise None."""
+    try:
+        return date.fromisoformat(text).isoformat() == text and text
+    except ValueError:
+        return None
+
+
+def validate_row(row, plans, today):
+    """
+    Checks one CSV row against the Member and Payment constraints.
+
+    Args:
+        row (dict): The CSV row.
+        plans (dict): planId -> cost for every MembershipPlan.
+        today (str): Default payment date.
+
+    Returns:
+        tuple: (member values, payment values without memberId), or a str
+        with the reason the row was rejected.
+    """
+    name = (row.get("name") or "").strip()
+    email = (row.get("email") or "").strip()
+    if not name:
+        return "name is required"
+    if not email or "@" not in email:
+        return "a valid email is required"
+
+    age_text = (row.get("age") or "").strip()
+    age = None
+    if age_text:
+        if not age_text.isdigit():
+            return f"age '{age_text}' is not a number"
+        age = int(age_text)
+        if age < MIN_AGE:
+            return f"age must be at least {MIN_AGE}"
+
+    start = (row.get("membershipStartDate") or "").strip()
+    end = (row.get("membershipEndDate") or "").strip()
+    if not _valid_date(start):
+        return f"membershipStartDate '{start}' is not a YYYY-MM-DD date"
+    if not _valid_date(end):
+        return f"membershipEndDate '{end}' is not a YYYY-MM-DD date"
+    if end < start:
+        return "membershipEndDate is before membershipStartDate"
+
+    plan_text = (row.get("plan") or "").strip()
+    plan_id = PLAN_ALIASES.get(plan_text.lower())
+    if plan_id is None and plan_text.isdigit():
+        plan_id = int(plan_text)
+    if plan_id not in plans:
+        return f"unknown plan '{plan_text}'"
+
+    amount_text = (row.get("amountPaid") or "").strip()
+    try:
+        amount = float(amount_text) if amount_text else float(plans[plan_id])
+    except ValueError:
+        return f"amountPaid '{amount_text}' is not a number"
+    # float() also accepts "nan" and "inf"
+    if not math.isfinite(amount):
+        return f"amountPaid '{amount_text}' is not a number"
+    if amount <= 0:
+        return "amountPaid must be greater than 0"
+    payment_date = (row.get("paymentDate") or "").strip() or today
+    if not _valid_date(payment_date):
+        return f"paymentDate '{payment_date}' is not a YYYY-MM-DD date"
+
+    member = (name, email, (row.get("phone") or "").strip() or None,
+              (row.get("address") or "").strip() or None, age, start, end)
+    return member, (plan_id, amount, payment_date)
+
+
+def _existing_emails(conn, emails):
+    """
+    Returns the subset of emails already used by a member (one indexed IN
+    query). The emails are bound as a single JSON array, so any chunk size
+    stays under SQLITE_MAX_VARIABLE_NUMBER.
+    """
+    if not emails:
+        return set()
+    rows = conn.execute("SELECT email FROM Member WHERE email IN (SELECT value FROM json_each(?))",
+                        (json.dumps(list(emails)),))
+    return {r[0] for r in rows}
+
+
+def _insert_chunk(conn, uow, chunk, result):
+    """
+    Inserts one chunk of validated rows in a single transaction.
+
+    Args:
+        uow (UnitOfWork): Transaction manager for conn.
+        chunk (list): (line number, row, member values, payment values).
+    """
+    with uow:
+        # Drop rows whose email is already taken (checked inside the
+        # transaction so no other writer can add it in between)
+        taken = _existing_emails(conn, [c[2][1] for c in chunk])
+        accepted = []
+        for line, row, member, payment in chunk:
+            if member[1] in taken:
+                result.rejected.append((line, row, f"email '{member[1]}' already exists"))
+            else:
+                accepted.append((member, payment))
+
+        # Give the members explicit ids so the payments can reference them
+        next_id = conn.execute("""
+            SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'Member'), 0),
+                       IFNULL((SELECT MAX(memberId) FROM Member), 0)) + 1
+        """).fetchone()[0]
+        members = []
+        payments = []
+        for offset, (member, payment) in enumerate(accepted):
+            member_id = next_id + offset
+            members.append((member_id,) + member)
+            payments.append((member_id,) + payment)
+
+        conn.executemany("""
+            INSERT INTO Member (memberId, name, email, phone, address, age,
+                                membershipStartDate, membershipEndDate)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, members)
+        conn.executemany("""
+            INSERT INTO Payment (memberId, planId, amountPaid, paymentDate)
+            VALUES (?, ?, ?, ?)
+        """, payments)
+    result.inserted += len(members)
+
+
+def import_members(conn, csv_file, chunk_size=CHUNK_SIZE, uow=None):
+    """
+    Imports members and their payments from a CSV file.
+
+    Args:
+        conn: An active SQLite database connection.
+        csv_file (str): Path of the CSV file.
+        chunk_size (int): Rows per transaction.
+        uow (UnitOfWork): Transaction manager to use; pass the managers'
+            one so the import nests inside any open batch.
+
+    Returns:
+        ImportResult: Counts, timing and rejected rows.
+
+    Raises:
+        ValueError: If the CSV header is missing required columns.
+    """
+    result = ImportResult()
+    uow = uow if uow is not None else UnitOfWork(conn)
+    start = time.perf_counter()
+    plans = dict(conn.execute("SELECT planId, cost FROM MembershipPlan"))
+    today = clock.today().isoformat()
+    seen_emails = set()
+
+    with open(csv_file, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+
+        chunk = []
+        for row in reader:
+            line = reader.line_num
+            checked = validate_row(row, plans, today)
+            if isinstance(checked, str):
+                result.rejected.append((line, row, checked))
+                continue
+            member, payment = checked
+            if member[1] in seen_emails:
+                result.rejected.append((line, row, f"email '{member[1]}' appears earlier in the file"))
+                continue
+            seen_emails.add(member[1])
+            chunk.append((line, row, member, payment))
+            if len(chunk) >= chunk_size:
+                _insert_chunk(conn, uow, chunk, result)
+                chunk = []
+        if chunk:
+            _insert_chunk(conn, uow, chunk, result)
+
+    result.rejected.sort(key=lambda r: r[0])
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def write_rejects(result, path):
+    """Writes the rejected rows, with the reason, to a CSV file."""
+    fieldnames = ["line", "reason"] + REQUIRED_COLUMNS + ["phone", "address", "amountPaid", "paymentDate"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        for line, row, reason in result.rejected:
+            writer.writerow(dict(row, line=line, reason=reason))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import members from a CSV file.")
+    parser.add_argument("db_file")
+    parser.add_argument("csv_file")
+    parser.add_argument("--rejects", help="write rejected rows and reasons to this CSV file")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--profile", default="interactive", choices=sorted(profiles.PROFILES),
+                        help="connection profile (bulk-load skips fsync; only for reloadable data)")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = profiles.connect(args.db_file, args.profile)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+    try:
+        result = import_members(conn, args.csv_file, args.chunk_size)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Import failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    result.print_report()
+    if args.rejects and result.rejected:
+        write_rejects(result, args.rejects)
+        print(f"[INFO] Rejected rows written to {args.rejects}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
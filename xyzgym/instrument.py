@@ -0,0 +1,338 @@
+"""
+instrument.py
+-----------
+Query instrumentation: per-statement and per-operation latency histograms,
+rows returned, SQLite VM steps and a slow-query log.
+
+Once enable() has been called, profiles.connect() attaches a Tracer to
+every new connection:
+    - set_trace_callback() reports each statement as it starts, with its
+      parameters filled in. The statement stays "open" until the next one
+      starts or the operation around it ends.
+    - set_progress_handler() is called every STEP_INTERVAL virtual machine
+      instructions and counts the steps of the open statement.
+    - a row_factory counts the rows the open statement returns, then
+      hands each row to the row_factory the connection already had.
+A connection that already has a progress handler is not instrumented:
+attach() raises rather than replace it.
+A statement's time runs to the last row or step it produced, so Python
+work after it (formatting rows, waiting on the user) is not counted; a
+statement that returns no rows and runs fewer than STEP_INTERVAL steps
+shows as 0 ms.
+Statements are grouped by their SQL with the literals replaced by "?";
+the slow-query log keeps the full text with parameters.
+
+Operations are the query functions of 3/file.py and the data methods of
+the managers in 4/gym_management.py, wrapped with @timed.
+
+Everything is recorded in one process-wide Recorder; summary() prints it.
+"""
+
+import atexit
+import bisect
+import functools
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+
+# A statement slower than this goes to the slow-query log
+SLOW_QUERY_MS = 100
+# Entries kept in memory for the summary (the log file keeps all of them)
+SLOW_LOG_SIZE = 20
+# The progress handler runs every this many VM instructions
+STEP_INTERVAL = 1000
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+SUMMARY_TOP = 15
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """Returns the SQL with string and number literals replaced by ?, on one line."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets (BUCKETS_MS) plus totals.
+    """
+    __slots__ = ("counts", "calls", "total_ms", "max_ms", "rows", "steps")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.steps = 0
+
+    def add(self, ms, rows=0, steps=0):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.calls += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows
+        self.steps += steps
+
+    def percentile(self, fraction):
+        """
+        Returns the upper bound (ms) of the bucket holding the given fraction
+        of the calls; the maximum for the last bucket.
+        """
+        wanted = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= wanted:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+
+class Recorder:
+    """
+    Process-wide store of the statement and operation histograms and the
+    slow-query log. Safe to use from several threads.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slow_ms = SLOW_QUERY_MS
+        self.slow_log_file = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.statements = {}
+            self.operations = {}
+            self.slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def statement(self, sql, ms, rows, steps):
+        key = normalize(sql)
+        with self.lock:
+            histogram = self.statements.get(key)
+            if histogram is None:
+                histogram = self.statements[key] = Histogram()
+            histogram.add(ms, rows, steps)
+            if ms < self.slow_ms:
+                return
+            entry = (time.strftime("%Y-%m-%d %H:%M:%S"), ms, rows, steps, _WHITESPACE.sub(" ", sql).strip())
+            self.slow.append(entry)
+            if self.slow_log_file:
+                try:
+                    with open(self.slow_log_file, "a", encoding="utf-8") as f:
+                        f.write(" | ".join([entry[0], f"{ms:.1f} ms", f"{rows} rows",
+                                            f"{steps} steps", entry[4]]) + "\n")
+                except OSError as e:
+                    print(f"[ERROR] Could not write slow-query log: {e}", file=sys.stderr)
+
+    def operation(self, name, ms, steps):
+        with self.lock:
+            histogram = self.operations.get(name)
+            if histogram is None:
+                histogram = self.operations[name] = Histogram()
+            histogram.add(ms, steps=steps)
+
+
+RECORDER = Recorder()
+_enabled = False
+_tracers = weakref.WeakSet()
+# Stream for the summary at exit (see enable()); the hook is registered once
+_exit_stream = None
+_exit_registered = False
+
+
+class Tracer:
+    """
+    Per-connection hooks that turn trace and progress callbacks into
+    statement records.
+    """
+    def __init__(self, conn, recorder=RECORDER):
+        self.conn = conn
+        self.recorder = recorder
+        self.steps = 0
+        self.sql = None        # the open statement
+        self.start = 0.0
+        self.last_activity = 0.0
+        self.start_steps = 0
+        self.rows = 0
+        self.row_factory = None  # the connection's own, called by _row()
+
+    def attach(self):
+        """
+        Installs the hooks.
+
+        Raises:
+            ValueError: If the connection already has a progress handler.
+        """
+        if getattr(self.conn, "progress_handler", None) is not None:
+            raise ValueError("Connection already has a progress handler; not instrumenting it")
+        self.row_factory = self.conn.row_factory
+        self.conn.set_trace_callback(self._trace)
+        self.conn.set_progress_handler(self._progress, STEP_INTERVAL)
+        self.conn.row_factory = self._row
+        return self
+
+    def _trace(self, sql):
+        # SQLite reports a statement again for every trigger program it
+        # runs, and virtual tables (FTS5) run nested statements shown as
+        # "-- ..."; both belong to the open statement
+        if sql == self.sql or sql.startswith("--"):
+            return
+        self.finish()
+        self.sql = sql
+        self.start = self.last_activity = time.perf_counter()
+        self.start_steps = self.steps
+        self.rows = 0
+
+    def _progress(self):
+        self.steps += STEP_INTERVAL
+        self.last_activity = time.perf_counter()
+        return 0
+
+    def _row(self, cursor, row):
+        self.rows += 1
+        self.last_activity = time.perf_counter()
+        if self.row_factory is not None:
+            return self.row_factory(cursor, row)
+        return row
+
+    def finish(self):
+        """Records the open statement, if any."""
+        if self.sql is None:
+            return
+        sql, self.sql = self.sql, None
+        # The last callback seen, not now: the caller may have spent time
+        # in Python since the statement finished
+        self.recorder.statement(sql, (self.last_activity - self.start) * 1000,
+                                self.rows, self.steps - self.start_steps)
+
+
+def enable(slow_ms=None, slow_log_file=None, at_exit=None):
+    """
+    Turns instrumentation on for every connection opened from now on.
+
+    Args:
+        slow_ms (float): Slow-query threshold (default SLOW_QUERY_MS).
+        slow_log_file (str): Also append slow statements to this file.
+        at_exit: Stream to print the summary to when the program exits
+            (e.g. sys.stdout), or None for no summary at exit.
+    """
+    global _enabled, _exit_stream, _exit_registered
+    _enabled = True
+    if slow_ms is not None:
+        RECORDER.slow_ms = slow_ms
+    RECORDER.slow_log_file = slow_log_file
+    _exit_stream = at_exit
+    if at_exit is not None and not _exit_registered:
+        atexit.register(_summary_at_exit)
+        _exit_registered = True
+
+
+def _summary_at_exit():
+    if _exit_stream is not None:
+        summary(_exit_stream)
+
+
+def enabled():
+    return _enabled
+
+
+def attach(conn):
+    """
+    Attaches a Tracer to a connection (profiles.connect() does this when
+    instrumentation is enabled).
+    """
+    tracer = Tracer(conn).attach()
+    _tracers.add(tracer)
+    try:
+        conn.tracer = tracer
+    except AttributeError:
+        pass  # plain sqlite3.Connection
+    return tracer
+
+
+def _connection_of(args):
+    """Finds the connection an operation works on: its first argument or self.conn."""
+    if not args:
+        return None
+    if isinstance(args[0], sqlite3.Connection):
+        return args[0]
+    return getattr(args[0], "conn", None)
+
+
+def timed(function):
+    """
+    Decorator that records a call of function as an operation, named after
+    its qualified name (e.g. "MemberManager.create_member").
+    """
+    name = function.__qualname__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return function(*args, **kwargs)
+        tracer = getattr(_connection_of(args), "tracer", None)
+        steps = tracer.steps if tracer else 0
+        if tracer:
+            tracer.finish()
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if tracer:
+                tracer.finish()
+            RECORDER.operation(name, (time.perf_counter() - start) * 1000,
+                               (tracer.steps - steps) if tracer else 0)
+    return wrapper
+
+
+def _table(title, histograms, with_rows, stream):
+    print(title, file=stream)
+    columns = ["Calls"] + (["Rows", "VM steps"] if with_rows else []) + [
+        "Total (ms)", "Mean", "p50", "p95", "Max"]
+    print(" | ".join(columns) + " | Name", file=stream)
+    print("-" * 90, file=stream)
+    ranked = sorted(histograms.items(), key=lambda item: item[1].total_ms, reverse=True)
+    for name, h in ranked[:SUMMARY_TOP]:
+        values = [str(h.calls)] + ([str(h.rows), str(h.steps)] if with_rows else []) + [
+            f"{h.total_ms:.1f}", f"{h.total_ms / h.calls:.2f}",
+            f"<={h.percentile(0.5):g}", f"<={h.percentile(0.95):g}", f"{h.max_ms:.1f}"]
+        label = name if len(name) <= 100 else name[:97] + "..."
+        print(" | ".join(values) + f" | {label}", file=stream)
+    if len(ranked) > SUMMARY_TOP:
+        print(f"... and {len(ranked) - SUMMARY_TOP} more", file=stream)
+
+
+def summary(stream=None):
+    """
+    Prints the operation and statement histograms (busiest first) and the
+    latest slow queries.
+    """
+    stream = stream or sys.stdout
+    # Record the statements that are still open
+    for tracer in list(_tracers):
+        tracer.finish()
+    with RECORDER.lock:
+        operations = dict(RECORDER.operations)
+        statements = dict(RECORDER.statements)
+        slow = list(RECORDER.slow)
+    if not operations and not statements:
+        print("[INFO] No queries recorded yet.", file=stream)
+        return
+    print(f"\n[INFO] Query instrumentation summary (VM steps counted per {STEP_INTERVAL})", file=stream)
+    if operations:
+        _table("\nOperations:", operations, False, stream)
+    if statements:
+        _table("\nStatements:", statements, True, stream)
+    print(f"\nSlow queries (over {RECORDER.slow_ms:g} ms): "
+          f"{'none' if not slow else f'latest {len(slow)}'}", file=stream)
+    for when, ms, rows, steps, sql in slow:
+        print(f"{when} | {ms:.1f} ms | {rows} rows | {steps} steps | {sql[:200]}", file=stream)
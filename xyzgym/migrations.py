@@ -0,0 +1,478 @@
+"""
+migrations.py
+-----------
+Versioned schema migrations for the XYZGym database.
+
+The schema version is stored in PRAGMA user_version. Every connection helper
+calls migrate() right after connecting, so an existing XYZGym.sqlite file is
+upgraded in place the first time a newer version of the scripts opens it.
+"""
+
+import sqlite3
+
+# Each migration is (version, description, statements). Versions must be
+# increasing; a migration is applied only once, inside its own transaction.
+MIGRATIONS = [
+    (1, "foreign-key indexes", [
+        # Payment(memberId) also carries planId so query1 never reads Payment rows
+        "CREATE INDEX IF NOT EXISTS idx_payment_member_plan ON Payment(memberId, planId)",
+        "CREATE INDEX IF NOT EXISTS idx_payment_plan ON Payment(planId)",
+        "CREATE INDEX IF NOT EXISTS idx_class_instructor ON Class(instructorId)",
+        "CREATE INDEX IF NOT EXISTS idx_class_gym ON Class(gymId)",
+        # Attends(classId) also carries memberId for query3 / find_members_by_class
+        "CREATE INDEX IF NOT EXISTS idx_attends_class_member ON Attends(classId, memberId)",
+        "CREATE INDEX IF NOT EXISTS idx_equipment_gym ON Equipment(gymId)",
+    ]),
+    (2, "filter and covering indexes for the report queries", [
+        # query4: equipment of a type without visiting the table
+        "CREATE INDEX IF NOT EXISTS idx_equipment_type ON Equipment(type, name, quantity)",
+        # query5 / query7: membership status ranges, with age for the averages
+        "CREATE INDEX IF NOT EXISTS idx_member_end_date ON Member(membershipEndDate, age)",
+        # query10: last month's attendance as a range scan on the date
+        "CREATE INDEX IF NOT EXISTS idx_attends_date ON Attends(attendanceDate, memberId, classId)",
+        # query9: classes of a type
+        "CREATE INDEX IF NOT EXISTS idx_class_type ON Class(classType)",
+        "ANALYZE",
+    ]),
+    (3, "trigger-maintained summary tables", [
+        # Attendance per class, classes per gym and classes per instructor.
+        # A row exists only while its count is above zero; see summaries.py
+        # for the rebuild / verify command.
+        """CREATE TABLE IF NOT EXISTS ClassAttendanceSummary (
+            classId INTEGER PRIMARY KEY,
+            attendance INTEGER NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS GymClassSummary (
+            gymId INTEGER PRIMARY KEY,
+            classCount INTEGER NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS InstructorClassSummary (
+            instructorId INTEGER PRIMARY KEY,
+            classCount INTEGER NOT NULL
+        )""",
+        """INSERT OR REPLACE INTO ClassAttendanceSummary (classId, attendance)
+           SELECT a.classId, COUNT(*) FROM Attends a
+           JOIN Class c ON c.classId = a.classId
+           GROUP BY a.classId""",
+        """INSERT OR REPLACE INTO GymClassSummary (gymId, classCount)
+           SELECT gymId, COUNT(*) FROM Class GROUP BY gymId""",
+        """INSERT OR REPLACE INTO InstructorClassSummary (instructorId, classCount)
+           SELECT instructorId, COUNT(*) FROM Class GROUP BY instructorId""",
+
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_insert_summary AFTER INSERT ON Attends
+        BEGIN
+            INSERT INTO ClassAttendanceSummary (classId, attendance) VALUES (NEW.classId, 1)
+            ON CONFLICT (classId) DO UPDATE SET attendance = attendance + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_delete_summary AFTER DELETE ON Attends
+        BEGIN
+            UPDATE ClassAttendanceSummary SET attendance = attendance - 1 WHERE classId = OLD.classId;
+            DELETE FROM ClassAttendanceSummary WHERE classId = OLD.classId AND attendance <= 0;
+        END""",
+        # Covers the bulk reassignment in ClassManager.delete_class
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_update_summary AFTER UPDATE OF classId ON Attends
+        WHEN OLD.classId IS NOT NEW.classId
+        BEGIN
+            UPDATE ClassAttendanceSummary SET attendance = attendance - 1 WHERE classId = OLD.classId;
+            DELETE FROM ClassAttendanceSummary WHERE classId = OLD.classId AND attendance <= 0;
+            INSERT INTO ClassAttendanceSummary (classId, attendance) VALUES (NEW.classId, 1)
+            ON CONFLICT (classId) DO UPDATE SET attendance = attendance + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_insert_summary AFTER INSERT ON Class
+        BEGIN
+            INSERT INTO GymClassSummary (gymId, classCount) VALUES (NEW.gymId, 1)
+            ON CONFLICT (gymId) DO UPDATE SET classCount = classCount + 1;
+            INSERT INTO InstructorClassSummary (instructorId, classCount) VALUES (NEW.instructorId, 1)
+            ON CONFLICT (instructorId) DO UPDATE SET classCount = classCount + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_delete_summary AFTER DELETE ON Class
+        BEGIN
+            UPDATE GymClassSummary SET classCount = classCount - 1 WHERE gymId = OLD.gymId;
+            DELETE FROM GymClassSummary WHERE gymId = OLD.gymId AND classCount <= 0;
+            UPDATE InstructorClassSummary SET classCount = classCount - 1
+            WHERE instructorId = OLD.instructorId;
+            DELETE FROM InstructorClassSummary WHERE instructorId = OLD.instructorId AND classCount <= 0;
+            DELETE FROM ClassAttendanceSummary WHERE classId = OLD.classId;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_gym_summary AFTER UPDATE OF gymId ON Class
+        WHEN OLD.gymId IS NOT NEW.gymId
+        BEGIN
+            UPDATE GymClassSummary SET classCount = classCount - 1 WHERE gymId = OLD.gymId;
+            DELETE FROM GymClassSummary WHERE gymId = OLD.gymId AND classCount <= 0;
+            INSERT INTO GymClassSummary (gymId, classCount) VALUES (NEW.gymId, 1)
+            ON CONFLICT (gymId) DO UPDATE SET classCount = classCount + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_instructor_summary AFTER UPDATE OF instructorId ON Class
+        WHEN OLD.instructorId IS NOT NEW.instructorId
+        BEGIN
+            UPDATE InstructorClassSummary SET classCount = classCount - 1
+            WHERE instructorId = OLD.instructorId;
+            DELETE FROM InstructorClassSummary WHERE instructorId = OLD.instructorId AND classCount <= 0;
+            INSERT INTO InstructorClassSummary (instructorId, classCount) VALUES (NEW.instructorId, 1)
+            ON CONFLICT (instructorId) DO UPDATE SET classCount = classCount + 1;
+        END""",
+    ]),
+    (4, "daily attendance rollups", [
+        # Sessions per (day, member, class) for completed days; see rollups.py.
+        # Days up to frozenThrough are rolled up; later days are read from Attends.
+        """CREATE TABLE IF NOT EXISTS AttendanceDailyRollup (
+            day TEXT NOT NULL,
+            memberId INTEGER NOT NULL,
+            classId INTEGER NOT NULL,
+            sessions INTEGER NOT NULL,
+            PRIMARY KEY (day, memberId, classId)
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS AttendanceRollupState (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            frozenThrough TEXT
+        )""",
+        "INSERT OR IGNORE INTO AttendanceRollupState (id, frozenThrough) VALUES (1, NULL)",
+        # Late changes to already rolled-up days are applied as deltas
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_insert_rollup AFTER INSERT ON Attends
+        WHEN date(NEW.attendanceDate) <= (SELECT frozenThrough FROM AttendanceRollupState)
+        BEGIN
+            INSERT INTO AttendanceDailyRollup (day, memberId, classId, sessions)
+            VALUES (date(NEW.attendanceDate), NEW.memberId, NEW.classId, 1)
+            ON CONFLICT (day, memberId, classId) DO UPDATE SET sessions = sessions + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_delete_rollup AFTER DELETE ON Attends
+        WHEN date(OLD.attendanceDate) <= (SELECT frozenThrough FROM AttendanceRollupState)
+        BEGIN
+            UPDATE AttendanceDailyRollup SET sessions = sessions - 1
+            WHERE day = date(OLD.attendanceDate) AND memberId = OLD.memberId AND classId = OLD.classId;
+            DELETE FROM AttendanceDailyRollup
+            WHERE day = date(OLD.attendanceDate) AND memberId = OLD.memberId
+              AND classId = OLD.classId AND sessions <= 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_update_rollup
+        AFTER UPDATE OF memberId, classId, attendanceDate ON Attends
+        BEGIN
+            UPDATE AttendanceDailyRollup SET sessions = sessions - 1
+            WHERE day = date(OLD.attendanceDate) AND memberId = OLD.memberId AND classId = OLD.classId
+              AND day <= (SELECT frozenThrough FROM AttendanceRollupState);
+            DELETE FROM AttendanceDailyRollup
+            WHERE day = date(OLD.attendanceDate) AND memberId = OLD.memberId
+              AND classId = OLD.classId AND sessions <= 0;
+            INSERT INTO AttendanceDailyRollup (day, memberId, classId, sessions)
+            SELECT date(NEW.attendanceDate), NEW.memberId, NEW.classId, 1
+            WHERE date(NEW.attendanceDate) <= (SELECT frozenThrough FROM AttendanceRollupState)
+            ON CONFLICT (day, memberId, classId) DO UPDATE SET sessions = sessions + 1;
+        END""",
+    ]),
+    (5, "member age statistics", [
+        # Members per (status, age), with status evaluated on MemberAgeStatsState.asOf;
+        # see age_stats.py for moving the day forward
+        """CREATE TABLE IF NOT EXISTS MemberAgeStats (
+            expired INTEGER NOT NULL,
+            age INTEGER NOT NULL,
+            members INTEGER NOT NULL,
+            PRIMARY KEY (expired, age)
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS MemberAgeStatsState (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            asOf TEXT NOT NULL
+        )""",
+        "INSERT OR REPLACE INTO MemberAgeStatsState (id, asOf) VALUES (1, date('now'))",
+        "DELETE FROM MemberAgeStats",
+        """INSERT INTO MemberAgeStats (expired, age, members)
+           SELECT membershipEndDate < date('now'), age, COUNT(*)
+           FROM Member WHERE age IS NOT NULL
+           GROUP BY 1, 2""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_insert_age_stats AFTER INSERT ON Member
+        WHEN NEW.age IS NOT NULL
+        BEGIN
+            INSERT INTO MemberAgeStats (expired, age, members)
+            VALUES (NEW.membershipEndDate < (SELECT asOf FROM MemberAgeStatsState), NEW.age, 1)
+            ON CONFLICT (expired, age) DO UPDATE SET members = members + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_delete_age_stats AFTER DELETE ON Member
+        WHEN OLD.age IS NOT NULL
+        BEGIN
+            UPDATE MemberAgeStats SET members = members - 1
+            WHERE expired = (OLD.membershipEndDate < (SELECT asOf FROM MemberAgeStatsState))
+              AND age = OLD.age;
+            DELETE FROM MemberAgeStats WHERE age = OLD.age AND members <= 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_update_age_stats
+        AFTER UPDATE OF age, membershipEndDate ON Member
+        BEGIN
+            UPDATE MemberAgeStats SET members = members - 1
+            WHERE expired = (OLD.membershipEndDate < (SELECT asOf FROM MemberAgeStatsState))
+              AND age = OLD.age;
+            DELETE FROM MemberAgeStats WHERE age = OLD.age AND members <= 0;
+            INSERT INTO MemberAgeStats (expired, age, members)
+            SELECT NEW.membershipEndDate < (SELECT asOf FROM MemberAgeStatsState), NEW.age, 1
+            WHERE NEW.age IS NOT NULL
+            ON CONFLICT (expired, age) DO UPDATE SET members = members + 1;
+        END""",
+    ]),
+    (6, "membership expiry calendar", [
+        # Expired / expiring lists as covering range scans on the end date
+        "CREATE INDEX IF NOT EXISTS idx_member_expiry ON Member(membershipEndDate, name)",
+        # Daily sweep (see expiry.py): the day of the last sweep, and the
+        # members written since then with their status at that time
+        """CREATE TABLE IF NOT EXISTS ExpirySweepState (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            lastSweep TEXT NOT NULL
+        )""",
+        "INSERT OR IGNORE INTO ExpirySweepState (id, lastSweep) VALUES (1, date('now'))",
+        """CREATE TABLE IF NOT EXISTS ExpiryStatusLog (
+            memberId INTEGER PRIMARY KEY,
+            wasExpired INTEGER NOT NULL
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_insert_expiry AFTER INSERT ON Member
+        BEGIN
+            INSERT OR REPLACE INTO ExpiryStatusLog (memberId, wasExpired)
+            VALUES (NEW.memberId, NEW.membershipEndDate < date('now'));
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_update_expiry
+        AFTER UPDATE OF membershipEndDate ON Member
+        BEGIN
+            INSERT OR IGNORE INTO ExpiryStatusLog (memberId, wasExpired)
+            VALUES (OLD.memberId, OLD.membershipEndDate < (SELECT lastSweep FROM ExpirySweepState));
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_delete_expiry AFTER DELETE ON Member
+        BEGIN
+            DELETE FROM ExpiryStatusLog WHERE memberId = OLD.memberId;
+        END""",
+        "ANALYZE",
+    ]),
+    (7, "full-text search", [
+        # External-content FTS5 indexes over the searchable columns; the rows
+        # stay in Member / Class / Equipment (see search.py)
+        """CREATE VIRTUAL TABLE IF NOT EXISTS MemberSearch USING fts5(
+            name, email, phone, address,
+            content='Member', content_rowid='memberId',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS ClassSearch USING fts5(
+            className,
+            content='Class', content_rowid='classId',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS EquipmentSearch USING fts5(
+            name,
+            content='Equipment', content_rowid='equipmentId',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        "INSERT INTO MemberSearch (MemberSearch) VALUES ('rebuild')",
+        "INSERT INTO ClassSearch (ClassSearch) VALUES ('rebuild')",
+        "INSERT INTO EquipmentSearch (EquipmentSearch) VALUES ('rebuild')",
+        # An external-content index is updated by deleting the old values and
+        # inserting the new ones
+        """CREATE TRIGGER IF NOT EXISTS trg_member_insert_search AFTER INSERT ON Member
+        BEGIN
+            INSERT INTO MemberSearch (rowid, name, email, phone, address)
+            VALUES (NEW.memberId, NEW.name, NEW.email, NEW.phone, NEW.address);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_delete_search AFTER DELETE ON Member
+        BEGIN
+            INSERT INTO MemberSearch (MemberSearch, rowid, name, email, phone, address)
+            VALUES ('delete', OLD.memberId, OLD.name, OLD.email, OLD.phone, OLD.address);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_member_update_search
+        AFTER UPDATE OF memberId, name, email, phone, address ON Member
+        BEGIN
+            INSERT INTO MemberSearch (MemberSearch, rowid, name, email, phone, address)
+            VALUES ('delete', OLD.memberId, OLD.name, OLD.email, OLD.phone, OLD.address);
+            INSERT INTO MemberSearch (rowid, name, email, phone, address)
+            VALUES (NEW.memberId, NEW.name, NEW.email, NEW.phone, NEW.address);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_insert_search AFTER INSERT ON Class
+        BEGIN
+            INSERT INTO ClassSearch (rowid, className) VALUES (NEW.classId, NEW.className);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_delete_search AFTER DELETE ON Class
+        BEGIN
+            INSERT INTO ClassSearch (ClassSearch, rowid, className)
+            VALUES ('delete', OLD.classId, OLD.className);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_update_search AFTER UPDATE OF classId, className ON Class
+        BEGIN
+            INSERT INTO ClassSearch (ClassSearch, rowid, className)
+            VALUES ('delete', OLD.classId, OLD.className);
+            INSERT INTO ClassSearch (rowid, className) VALUES (NEW.classId, NEW.className);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_equipment_insert_search AFTER INSERT ON Equipment
+        BEGIN
+            INSERT INTO EquipmentSearch (rowid, name) VALUES (NEW.equipmentId, NEW.name);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_equipment_delete_search AFTER DELETE ON Equipment
+        BEGIN
+            INSERT INTO EquipmentSearch (EquipmentSearch, rowid, name)
+            VALUES ('delete', OLD.equipmentId, OLD.name);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_equipment_update_search
+        AFTER UPDATE OF equipmentId, name ON Equipment
+        BEGIN
+            INSERT INTO EquipmentSearch (EquipmentSearch, rowid, name)
+            VALUES ('delete', OLD.equipmentId, OLD.name);
+            INSERT INTO EquipmentSearch (rowid, name) VALUES (NEW.equipmentId, NEW.name);
+        END""",
+    ]),
+    (8, "class session capacity", [
+        # Members enrolled per class session (class and day), so the capacity
+        # check is two primary-key lookups; see enrollment.py
+        """CREATE TABLE IF NOT EXISTS ClassSessionOccupancy (
+            classId INTEGER NOT NULL,
+            sessionDate TEXT NOT NULL,
+            enrolled INTEGER NOT NULL,
+            PRIMARY KEY (classId, sessionDate)
+        ) WITHOUT ROWID""",
+        "DELETE FROM ClassSessionOccupancy",
+        """INSERT INTO ClassSessionOccupancy (classId, sessionDate, enrolled)
+           SELECT a.classId, date(a.attendanceDate), COUNT(*) FROM Attends a
+           JOIN Class c ON c.classId = a.classId
+           GROUP BY 1, 2""",
+        # Refuses a new attendance record once the session is at classCapacity.
+        # A record that already exists falls through to the primary key, so
+        # INSERT OR IGNORE of a duplicate is still ignored.
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_capacity BEFORE INSERT ON Attends
+        WHEN (SELECT enrolled FROM ClassSessionOccupancy
+              WHERE classId = NEW.classId AND sessionDate = date(NEW.attendanceDate))
+             >= (SELECT classCapacity FROM Class WHERE classId = NEW.classId)
+         AND NOT EXISTS (SELECT 1 FROM Attends WHERE memberId = NEW.memberId
+                         AND classId = NEW.classId AND attendanceDate = NEW.attendanceDate)
+        BEGIN
+            SELECT RAISE(ABORT, 'class session is full');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_insert_occupancy AFTER INSERT ON Attends
+        BEGIN
+            INSERT INTO ClassSessionOccupancy (classId, sessionDate, enrolled)
+            VALUES (NEW.classId, date(NEW.attendanceDate), 1)
+            ON CONFLICT (classId, sessionDate) DO UPDATE SET enrolled = enrolled + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_delete_occupancy AFTER DELETE ON Attends
+        BEGIN
+            UPDATE ClassSessionOccupancy SET enrolled = enrolled - 1
+            WHERE classId = OLD.classId AND sessionDate = date(OLD.attendanceDate);
+            DELETE FROM ClassSessionOccupancy
+            WHERE classId = OLD.classId AND sessionDate = date(OLD.attendanceDate) AND enrolled <= 0;
+        END""",
+        # Moving records (classmerge.py) is not capacity checked
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_update_occupancy
+        AFTER UPDATE OF classId, attendanceDate ON Attends
+        BEGIN
+            UPDATE ClassSessionOccupancy SET enrolled = enrolled - 1
+            WHERE classId = OLD.classId AND sessionDate = date(OLD.attendanceDate);
+            DELETE FROM ClassSessionOccupancy
+            WHERE classId = OLD.classId AND sessionDate = date(OLD.attendanceDate) AND enrolled <= 0;
+            INSERT INTO ClassSessionOccupancy (classId, sessionDate, enrolled)
+            VALUES (NEW.classId, date(NEW.attendanceDate), 1)
+            ON CONFLICT (classId, sessionDate) DO UPDATE SET enrolled = enrolled + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_delete_occupancy AFTER DELETE ON Class
+        BEGIN
+            DELETE FROM ClassSessionOccupancy WHERE classId = OLD.classId;
+        END""",
+    ]),
+    (9, "attendance change versions", [
+        # Bumped on every change to a class's attendance, so the in-process
+        # attendance index (attendance_index.py) sees exactly which classes
+        # changed. No row yet means no change since the migration.
+        """CREATE TABLE IF NOT EXISTS AttendanceClassVersion (
+            classId INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_insert_version AFTER INSERT ON Attends
+        BEGIN
+            INSERT INTO AttendanceClassVersion (classId, version) VALUES (NEW.classId, 1)
+            ON CONFLICT (classId) DO UPDATE SET version = version + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_delete_version AFTER DELETE ON Attends
+        BEGIN
+            INSERT INTO AttendanceClassVersion (classId, version) VALUES (OLD.classId, 1)
+            ON CONFLICT (classId) DO UPDATE SET version = version + 1;
+        END""",
+        # Any column: a new memberId changes the class's members too
+        """CREATE TRIGGER IF NOT EXISTS trg_attends_update_version AFTER UPDATE ON Attends
+        BEGIN
+            INSERT INTO AttendanceClassVersion (classId, version) VALUES (OLD.classId, 1)
+            ON CONFLICT (classId) DO UPDATE SET version = version + 1;
+            INSERT INTO AttendanceClassVersion (classId, version) VALUES (NEW.classId, 1)
+            ON CONFLICT (classId) DO UPDATE SET version = version + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_class_delete_version AFTER DELETE ON Class
+        BEGIN
+            DELETE FROM AttendanceClassVersion WHERE classId = OLD.classId;
+        END""",
+    ]),
+    (10, "one membership end-date index", [
+        # idx_member_end_date (migration 2) and idx_member_expiry (migration
+        # 6) shared their leading column: one index covers both the status
+        # ranges with age (query5, query7, age_stats.py) and the expiry
+        # lists in name order within a day (expiry.py)
+        "DROP INDEX IF EXISTS idx_member_expiry",
+        "DROP INDEX IF EXISTS idx_member_end_date",
+        "CREATE INDEX IF NOT EXISTS idx_member_end_date ON Member(membershipEndDate, name, age)",
+        "ANALYZE",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    """
+    Returns the schema version recorded in the database.
+
+    Args:
+        conn: An active SQLite database connection.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def has_base_schema(conn):
+    """
+    Returns True if the tables from crtdb.sql exist in the database.
+
+    A freshly created (empty) database file has nothing to migrate yet.
+    """
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Member'"
+    ).fetchone()
+    return row is not None
+
+
+def migrate(conn, verbose=True):
+    """
+    Applies every pending migration to the database.
+
+    Args:
+        conn: An active SQLite database connection.
+        verbose (bool): Print a line for every migration that is applied.
+
+    Returns:
+        int: The schema version after migrating.
+
+    Raises:
+        sqlite3.Error: If a migration fails. The failed migration is rolled
+        back, so the database stays at the previous version.
+    """
+    current = schema_version(conn)
+    if current >= LATEST_VERSION or not has_base_schema(conn):
+        return current
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Another connection may have applied it while this one waited
+            # for the write lock
+            if schema_version(conn) >= version:
+                conn.rollback()
+                current = max(current, version)
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA does not accept parameters; version is an int from MIGRATIONS
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        current = version
+        if verbose:
+            print(f"[INFO] Applied schema migration {version}: {description}")
+    return current
@@ -0,0 +1,182 @@
+"""
+pagination.py
+-----------
+Keyset (seek) pagination for the member, class and equipment pick lists.
+
+Pages are fetched with "WHERE key > last_key ORDER BY key LIMIT n" on the
+primary key instead of OFFSET, so every page costs one index seek plus n
+rows no matter how deep into the table it is. choose_id() can also start
+from a full-text search (xyzgym/search.py) instead of the first page.
+"""
+
+from xyzgym.render import TextWriter
+
+PAGE_SIZE = 20
+
+
+class KeysetPager:
+    """
+    Pages forwards and backwards through a query ordered by an integer key.
+    """
+    def __init__(self, conn, select, key, where=None, params=(), page_size=PAGE_SIZE):
+        """
+        Args:
+            conn: An active SQLite database connection.
+            select (str): SELECT ... FROM ... without WHERE/ORDER BY/LIMIT.
+                The key column must be the first column selected.
+            key (str): The indexed key column, e.g. "m.memberId".
+            where (str): Optional extra filter, e.g. "classId != ?".
+            params (tuple): Parameters for the where filter.
+            page_size (int): Rows per page.
+        """
+        self.conn = conn
+        self.select = select
+        self.key = key
+        self.where = where
+        self.params = tuple(params)
+        self.page_size = page_size
+        self.rows = []
+        self.has_next = False
+        self.has_previous = False
+
+    def _fetch(self, op, order, bound):
+        """Runs one page query: rows whose key is op bound, in the given order."""
+        conditions = [f"{self.key} {op} ?"]
+        if self.where:
+            conditions.append(f"({self.where})")
+        sql = (f"{self.select} WHERE {' AND '.join(conditions)} "
+               f"ORDER BY {self.key} {order} LIMIT ?")
+        # One extra row tells us whether there is another page after this one
+        return self.conn.execute(sql, (bound,) + self.params + (self.page_size + 1,)).fetchall()
+
+    def first(self):
+        """Loads and returns the first page."""
+        return self.seek(None)
+
+    def seek(self, key):
+        """
+        Loads and returns the page starting at the first row with a key
+        greater than or equal to key (the first page when key is None).
+        """
+        if key is None:
+            rows = self._fetch(">", "ASC", float("-inf"))
+        else:
+            rows = self._fetch(">=", "ASC", key)
+        self.has_next = len(rows) > self.page_size
+        self.has_previous = key is not None and self._peek_before(rows)
+        self.rows = rows[:self.page_size]
+        return self.rows
+
+    def next(self):
+        """Loads and returns the page after the current one."""
+        if not self.has_next:
+            return self.rows
+        rows = self._fetch(">", "ASC", self.rows[-1][0])
+        self.has_next = len(rows) > self.page_size
+        self.has_previous = True
+        self.rows = rows[:self.page_size]
+        return self.rows
+
+    def previous(self):
+        """Loads and returns the page before the current one."""
+        if not self.has_previous:
+            return self.rows
+        rows = self._fetch("<", "DESC", self.rows[0][0])
+        self.has_previous = len(rows) > self.page_size
+        self.has_next = True
+        self.rows = list(reversed(rows[:self.page_size]))
+        return self.rows
+
+    def _peek_before(self, rows):
+        """Returns True if any row comes before the first row of a page."""
+        if not rows:
+            return False
+        return bool(self._fetch("<", "DESC", rows[0][0]))
+
+
+def _search_rows(search, text):
+    """Runs a pick list search; returns the rows, or None to go back to paging."""
+    if not text.strip():
+        return None
+    try:
+        rows = search(text)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return None
+    if not rows:
+        print("[INFO] No matches; showing all entries.")
+        return None
+    return rows
+
+
+def choose_id(pager, title, header, prompt, row_format=None, search=None):
+    """
+    Shows a pick list one page at a time and asks for an ID.
+
+    The user can type n / p to move to the next / previous page, g <id> to
+    jump to an ID, or q to cancel. With a search function the user is asked
+    for search words first and sees only the best matches; s <words>
+    searches again and l goes back to paging through every entry.
+
+    Args:
+        pager (KeysetPager): Pager for the pick list.
+        title (str): Line shown above each page, e.g. "Available Members".
+        header (list): Column header lines.
+        prompt (str): Question asked for the ID.
+        row_format (str): Optional str.format() pattern for each row.
+        search (callable): Optional search(text) -> rows, best match first
+            (see xyzgym/search.py).
+
+    Returns:
+        int: The chosen ID, or None if the list is empty or the user cancelled.
+    """
+    if not pager.rows and not pager.first():
+        return None
+    matches = None
+    if search is not None:
+        text = input("Search by name or other details (blank = list all): ")
+        matches = _search_rows(search, text)
+    writer = TextWriter(row_format=row_format)
+    while True:
+        nav = []
+        if matches is not None:
+            writer.title(f"\n{title} matching '{text.strip()}' (best match first):")
+            writer.header(header)
+            writer.rows(matches)
+            nav.append("l = list all")
+        else:
+            writer.title(f"\n{title} (IDs {pager.rows[0][0]}-{pager.rows[-1][0]}):")
+            writer.header(header)
+            writer.rows(pager.rows)
+            if pager.has_previous:
+                nav.append("p = previous page")
+            if pager.has_next:
+                nav.append("n = next page")
+        if search is not None:
+            nav.append("s <words> = search")
+        nav += ["g <id> = go to ID", "q = cancel"]
+        writer.title(" | ".join(nav))
+        writer.flush()
+
+        answer = input(prompt).strip()
+        command = answer.lower()
+        if command == "n" and matches is None and pager.has_next:
+            pager.next()
+        elif command == "p" and matches is None and pager.has_previous:
+            pager.previous()
+        elif command.startswith("g ") and command[2:].strip().isdigit():
+            matches = None
+            if not pager.seek(int(command[2:])):
+                print("[INFO] No entries at or after that ID.")
+                pager.first()
+        elif search is not None and command.startswith("s "):
+            text = answer[2:]
+            matches = _search_rows(search, text)
+        elif command == "l" and matches is not None:
+            matches = None
+        elif command == "q":
+            return None
+        elif command.isdigit():
+            return int(command)
+        else:
+            print("Invalid choice. Please try again.")
@@ -0,0 +1,336 @@
+"""
+plans.py
+-----------
+EXPLAIN QUERY PLAN regression check for the statements run by the reports
+(3/file.py) and the managers (4/gym_management.py).
+
+check builds a fixture database (datagen, fixed seed and date), runs a
+representative workload on it with a trace callback that collects every
+statement, adds the registered statements the workload did not reach
+(xyzgym/queries.py), explains each one and compares the plan with the
+baseline in plan_baseline.json. Statements are matched by their SQL with
+the literals replaced by "?". A check fails when a plan gains, compared
+with its baseline:
+    - a full SCAN of a table (or of an index, which reads every entry),
+    - a temp B-tree for ORDER BY, GROUP BY or DISTINCT,
+    - an automatic index.
+A new statement fails the same way if its plan has any of these. After a
+deliberate change, update rewrites the baseline.
+
+Usage (from the repository root):
+    python -m xyzgym.plans check
+    python -m xyzgym.plans check --db 4/XYZGym.sqlite   # with that database's statistics
+    python -m xyzgym.plans update
+    python -m xyzgym.plans show
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import date
+
+from xyzgym import datagen, enrollment, expiry, profiles, queries
+from xyzgym.instrument import normalize
+from xyzgym.pagination import KeysetPager
+from xyzgym.runner import FULL_PACK
+from xyzgym.schema import REPO_ROOT
+from xyzgym.stages import load_gym_management, load_reports
+from xyzgym.transaction import UnitOfWork
+
+BASELINE_FILE = os.path.join(REPO_ROOT, "xyzgym", "plan_baseline.json")
+# The fixture is the same every time: scale, seed and "today" are fixed
+FIXTURE_SCALE = "small"
+FIXTURE_SEED = 359
+FIXTURE_DATE = date(2025, 1, 1)
+EXPLAINED = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_SCAN = re.compile(r"^SCAN (\S+)")
+_TEMP_BTREE = re.compile(r"USE TEMP B-TREE FOR (.+)$")
+_AUTOMATIC = re.compile(r"^SEARCH (\S+) USING AUTOMATIC")
+# Expanded SQL writes an infinite float (the first pick list page) as Inf
+_INFINITY = re.compile(r"(?<![\w.])(-?)Inf\b")
+
+
+def statement_key(sql):
+    """Returns the key a statement is matched by: normalized SQL without the final ;"""
+    return normalize(sql).rstrip(";").rstrip()
+
+
+def build_fixture(path, scale=FIXTURE_SCALE):
+    """Creates the fixture database (schema, migrations, statistics) at path."""
+    datagen.generate(path, scale, seed=FIXTURE_SEED, as_of=FIXTURE_DATE, overwrite=True)
+
+
+def copy_database(source, path):
+    """Copies a database to path with the backup API (the workload writes to it)."""
+    src = sqlite3.connect(profiles.read_only_uri(source), uri=True)
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def workload(conn):
+    """
+    Runs the report pack and the manager operations on conn. Writes are
+    committed, so only run it on a fixture or a copy.
+    """
+    reports = load_reports()
+    gym = load_gym_management()
+    uow = UnitOfWork(conn)
+    members = gym.MemberManager(conn, uow)
+    classes = gym.ClassManager(conn, uow)
+    equipment = gym.EquipmentManager(conn, uow)
+
+    # Reports, with the rollup and age statistics upkeep run_batch does first
+    reports.run_batch(conn, reports.parse_batch(FULL_PACK))
+
+    # Pick lists, as the menus page through them
+    pagers = [
+        members.member_pager(),
+        KeysetPager(conn, queries.sql("class.pick_list"), "classId"),
+        KeysetPager(conn, queries.sql("class.short_pick_list"), "classId", where="classId != ?", params=(1,)),
+        KeysetPager(conn, queries.sql("equipment.listing"), "equipmentId"),
+    ]
+    for pager in pagers:
+        pager.first()
+        pager.next()
+        pager.previous()
+        pager.seek(5)
+    members.search_members("an")
+    classes.search_classes("yo")
+    equipment.search_equipment("tread")
+
+    # Listings and lookups
+    for cursor in (members.member_listing(), members.members_in_class(1), classes.class_attendance(),
+                   equipment.equipment_listing(), expiry.expiring_within(conn), expiry.expired(conn)):
+        cursor.fetchall()
+    for name in ("member.name", "class.name", "class.attendance_count", "equipment.name"):
+        queries.execute(conn, name, (1,)).fetchall()
+
+    # Writes
+    member_id = members.create_member("Plan Check", "plan.check@example.com", 30,
+                                      "2025-01-01", "2025-12-31", 1)
+    members.edit_member(member_id, "plan.check.2@example.com", 31)
+    members.remove_member(member_id)
+    class_id = classes.create_class("Plan Check", "Yoga", 60, 20)
+    classes.edit_class(class_id, "Plan Check 2", "HIIT")
+    classes.enroll(1, class_id, "2025-01-02")
+    enrollment.occupancy(conn, class_id, "2025-01-02")
+    enrollment.sessions(conn, class_id, "2025-01-01").fetchall()
+    enrollment.cancel(conn, 1, class_id, "2025-01-02")
+    merged_id = classes.create_class("Plan Check 3", "Yoga", 60, 20)
+    classes.enroll(1, merged_id, "2025-01-03")
+    classes.remove_class(merged_id, class_id)
+    classes.merge_classes({class_id: None}, discard=True)
+    equipment_id = equipment.create_equipment("Plan Check", "Cardio", 1)
+    equipment.edit_equipment(equipment_id, 2)
+    equipment.remove_equipment(equipment_id)
+    expiry.sweep(conn)
+
+
+def collect(conn):
+    """
+    Runs the workload with a trace callback and returns {key: sql} for every
+    statement it ran (with its parameters filled in), plus the registered
+    statements it did not run (with their placeholders).
+    """
+    seen = {}
+
+    def trace(sql):
+        # "-- ..." lines are statements run inside triggers and virtual
+        # tables; FTS5 also reads its shadow tables as 'main'.'...'
+        if sql.lstrip().upper().startswith(EXPLAINED) and "'main'." not in sql:
+            seen.setdefault(statement_key(sql), _INFINITY.sub(r"\g<1>9e999", sql))
+
+    conn.set_trace_callback(trace)
+    try:
+        with redirect_stdout(io.StringIO()):
+            workload(conn)
+    finally:
+        conn.set_trace_callback(None)
+    for stmt in queries.STATEMENTS.values():
+        seen.setdefault(statement_key(stmt.sql), stmt.sql)
+    return seen
+
+
+def explain(conn, sql):
+    """
+    Returns the query plan of a statement as indented lines; placeholders
+    are bound to 0.
+    """
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", (0,) * sql.count("?")).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def features(plan):
+    """
+    Returns a Counter of the costly steps of a plan: ("table scan", name),
+    ("temp b-tree", "ORDER BY"|...) and ("automatic index", name).
+    """
+    found = Counter()
+    for line in plan:
+        detail = line.strip()
+        scan = _SCAN.match(detail)
+        if scan and "VIRTUAL TABLE" not in detail and not detail.startswith("SCAN CONSTANT ROW"):
+            found[("table scan", scan.group(1))] += 1
+        temp = _TEMP_BTREE.search(detail)
+        if temp:
+            found[("temp b-tree", temp.group(1))] += 1
+        automatic = _AUTOMATIC.match(detail)
+        if automatic:
+            found[("automatic index", automatic.group(1))] += 1
+    return found
+
+
+def current_plans(db_file=None, scale=FIXTURE_SCALE):
+    """
+    Builds the fixture (or copies db_file), collects the statements and
+    explains them.
+
+    Returns:
+        dict: {key: plan lines}
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "plans.sqlite")
+        if db_file:
+            copy_database(db_file, path)
+        else:
+            build_fixture(path, scale)
+        # A copied database may need migrating; keep those messages quiet
+        with redirect_stdout(io.StringIO()):
+            conn = profiles.connect(path, verbose=False)
+        try:
+            statements = collect(conn)
+            return {key: explain(conn, sql) for key, sql in sorted(statements.items())}
+        finally:
+            conn.close()
+
+
+def load_baseline(path=BASELINE_FILE):
+    """Returns the stored baseline, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(plans, path=BASELINE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"sqlite_version": sqlite3.sqlite_version, "statements": plans}, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def compare(baseline, plans):
+    """
+    Compares current plans with the baseline.
+
+    Returns:
+        tuple: (regressions, new, missing, improved) where regressions and
+        new are lists of (key, gained features), missing is a list of keys
+        and improved a list of (key, lost features).
+    """
+    regressions, new, improved = [], [], []
+    for key, plan in plans.items():
+        now = features(plan)
+        if key not in baseline:
+            new.append((key, now))
+            continue
+        before = features(baseline[key])
+        gained = now - before
+        lost = before - now
+        if gained:
+            regressions.append((key, gained))
+        elif lost:
+            improved.append((key, lost))
+    missing = [key for key in baseline if key not in plans]
+    return regressions, new, missing, improved
+
+
+def _describe(found):
+    return ", ".join(f"{kind} {name}" + (f" (x{count})" if count > 1 else "")
+                     for (kind, name), count in sorted(found.items()))
+
+
+def _print_plan(label, plan):
+    print(f"    {label}:")
+    for line in plan or ["(no plan)"]:
+        print(f"      {line}")
+
+
+def check(baseline, plans):
+    """Prints the comparison; returns the number of failures."""
+    statements = baseline["statements"]
+    if baseline.get("sqlite_version") != sqlite3.sqlite_version:
+        print(f"[INFO] Baseline was recorded with SQLite {baseline.get('sqlite_version')}, "
+              f"running {sqlite3.sqlite_version}; plan wording may differ.")
+    regressions, new, missing, improved = compare(statements, plans)
+    failures = 0
+    for key, gained in regressions:
+        failures += 1
+        print(f"[ERROR] Plan regression ({_describe(gained)}): {key[:200]}")
+        _print_plan("baseline", statements[key])
+        _print_plan("now", plans[key])
+    for key, found in new:
+        if found:
+            failures += 1
+            print(f"[ERROR] New statement with {_describe(found)}: {key[:200]}")
+            _print_plan("now", plans[key])
+        else:
+            print(f"[INFO] New statement: {key[:200]}")
+    for key, lost in improved:
+        print(f"[INFO] Plan improved (no more {_describe(lost)}): {key[:200]}")
+    for key in missing:
+        print(f"[INFO] Statement no longer run: {key[:200]}")
+    if regressions or new or missing or improved:
+        print("[INFO] Run 'python -m xyzgym.plans update' to accept the current plans.")
+    print(f"[INFO] Checked {len(plans)} statements: {failures} failure(s).")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check query plans against the stored baseline.")
+    parser.add_argument("command", choices=["check", "update", "show"])
+    parser.add_argument("--db", help="explain against a copy of this database instead of the fixture")
+    parser.add_argument("--scale", choices=sorted(datagen.SCALES), default=FIXTURE_SCALE,
+                        help="fixture size")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    args = parser.parse_args(argv)
+
+    try:
+        plans = current_plans(args.db, args.scale)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not collect plans: {e}")
+        return 1
+    if args.command == "show":
+        for key, plan in plans.items():
+            print(key[:200])
+            _print_plan("plan", plan)
+        return 0
+    if args.command == "update":
+        save_baseline(plans, args.baseline)
+        print(f"[INFO] Baseline of {len(plans)} statements written to {args.baseline}")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"[ERROR] No baseline at {args.baseline}; run 'python -m xyzgym.plans update' first.")
+        return 1
+    return 1 if check(baseline, plans) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
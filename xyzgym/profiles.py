@@ -0,0 +1,178 @@
+"""
+profiles.py
+-----------
+Named connection profiles for the XYZGym database.
+
+A profile is a set of PRAGMAs applied right after connecting:
+    interactive  the menus and one-off queries: WAL so readers never block
+                 the writer, synchronous=NORMAL (safe in WAL mode, no fsync
+                 on every commit), a bigger page cache and memory-mapped I/O.
+    reporting    read-only (opened through a "mode=ro" URI) with a large
+                 cache and mmap, for the report queries.
+    bulk-load    imports and data generation: WAL, synchronous=OFF and a
+                 very large cache. Only use it on data that can be reloaded.
+
+Every profile turns on foreign keys and applies pending schema migrations.
+When instrumentation is enabled (xyzgym/instrument.py), every connection
+also gets its trace and progress hooks.
+"""
+
+import os
+import pathlib
+import sqlite3
+
+from xyzgym import instrument, migrations
+
+DEFAULT_PROFILE = "interactive"
+# Compiled statements kept per connection (sqlite3 cached_statements); the
+# statements in xyzgym/queries.py are reused from this cache
+STATEMENT_CACHE_SIZE = 256
+
+# Pragmas run in order; busy_timeout goes first so the others can wait for locks
+PROFILES = {
+    "interactive": {
+        "read_only": False,
+        "pragmas": [
+            ("busy_timeout", 5000),
+            ("journal_mode", "WAL"),
+            ("synchronous", "NORMAL"),
+            ("cache_size", -16000),        # 16 MB (negative = KiB)
+            ("mmap_size", 64 * 1024 ** 2),
+            ("temp_store", "MEMORY"),
+        ],
+    },
+    "reporting": {
+        "read_only": True,
+        "pragmas": [
+            ("busy_timeout", 5000),
+            ("cache_size", -64000),        # 64 MB
+            ("mmap_size", 256 * 1024 ** 2),
+            ("temp_store", "MEMORY"),
+        ],
+    },
+    "bulk-load": {
+        "read_only": False,
+        "pragmas": [
+            ("busy_timeout", 30000),
+            ("journal_mode", "WAL"),
+            ("synchronous", "OFF"),
+            ("cache_size", -256000),       # 256 MB
+            ("mmap_size", 256 * 1024 ** 2),
+            ("temp_store", "MEMORY"),
+        ],
+    },
+}
+
+
+class GymConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection that remembers which profile it was opened with.
+    """
+    profile = None
+    read_only = False
+    result_cache = None  # xyzgym.cache.ResultCache, created on first use
+    attendance_index = None  # xyzgym.attendance_index.AttendanceIndex, built on first use
+    # Serves many queries (server, report runner): per-connection structures
+    # such as the attendance index are worth building
+    long_lived = False
+    tracer = None  # xyzgym.instrument.Tracer, when instrumentation is enabled
+    # (handler, n) of the last set_progress_handler() call; sqlite3 offers
+    # no way to read it back
+    progress_handler = None
+
+    def set_progress_handler(self, handler, n):
+        super().set_progress_handler(handler, n)
+        self.progress_handler = (handler, n) if handler is not None else None
+
+
+def read_only_uri(db_file):
+    """Returns a URI that opens db_file read-only."""
+    return pathlib.Path(db_file).absolute().as_uri() + "?mode=ro"
+
+
+def apply_profile(conn, name):
+    """
+    Runs the PRAGMAs of a profile on an open connection.
+
+    Returns:
+        dict: The value SQLite reports for each pragma after setting it.
+    """
+    settings = {}
+    for pragma, value in PROFILES[name]["pragmas"]:
+        conn.execute(f"PRAGMA {pragma} = {value}")
+        settings[pragma] = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+    return settings
+
+
+def connect(db_file, profile=DEFAULT_PROFILE, verbose=True, **kwargs):
+    """
+    Opens a connection to the database using a named profile.
+
+    Args:
+        db_file (str): Path of the database file.
+        profile (str): One of PROFILES.
+        verbose (bool): Print the active profile and its settings.
+        **kwargs: Passed on to sqlite3.connect() (e.g. factory, check_same_thread).
+            cached_statements defaults to STATEMENT_CACHE_SIZE.
+
+    Returns:
+        The connection, with .profile and .read_only set.
+
+    Raises:
+        ValueError: If the profile does not exist.
+        sqlite3.Error: If the database cannot be opened or a pending schema
+            migration fails (the database stays at the last good version).
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown connection profile '{profile}' "
+                         f"(choose from {', '.join(sorted(PROFILES))})")
+    read_only = PROFILES[profile]["read_only"]
+    kwargs.setdefault("factory", GymConnection)
+    kwargs.setdefault("cached_statements", STATEMENT_CACHE_SIZE)
+
+    if read_only:
+        if not os.path.exists(db_file):
+            raise sqlite3.OperationalError(f"unable to open database file: {db_file}")
+        # A read-only connection cannot upgrade the schema itself
+        if _needs_migration(db_file):
+            writer = sqlite3.connect(db_file)
+            try:
+                writer.execute("PRAGMA busy_timeout = 5000")
+                migrations.migrate(writer)
+            finally:
+                writer.close()
+        conn = sqlite3.connect(read_only_uri(db_file), uri=True, **kwargs)
+    else:
+        conn = sqlite3.connect(db_file, **kwargs)
+
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        settings = apply_profile(conn, profile)
+        if not read_only:
+            migrations.migrate(conn)
+    except sqlite3.Error:
+        conn.close()
+        raise
+    if instrument.enabled():
+        instrument.attach(conn)
+    try:
+        conn.profile = profile
+        conn.read_only = read_only
+    except AttributeError:
+        pass  # plain sqlite3.Connection factory
+
+    if verbose:
+        details = ", ".join(f"{k}={v}" for k, v in settings.items())
+        mode = "read-only" if read_only else "read-write"
+        print(f"[INFO] Connection profile: {profile} ({mode}; {details})")
+    return conn
+
+
+def _needs_migration(db_file):
+    """Returns True if db_file is behind the latest schema version."""
+    conn = sqlite3.connect(read_only_uri(db_file), uri=True)
+    try:
+        return (migrations.schema_version(conn) < migrations.LATEST_VERSION
+                and migrations.has_base_schema(conn))
+    finally:
+        conn.close()
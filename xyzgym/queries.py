@@ -0,0 +1,502 @@
+"""
+queries.py
+-----------
+Central registry of the SQL statements used by the stage scripts
+(2/file.py, 3/file.py) and the managers in 4/gym_management.py.
+
+Every statement has a name, parameterized SQL and the result columns it
+declares. Callers run statements by name with execute(), so each SQL text
+exists exactly once and is always sent with the same string: the sqlite3
+statement cache (sized by profiles.STATEMENT_CACHE_SIZE) then compiles a
+hot statement once per connection and reuses it. Statements marked cached
+are served through the result cache (xyzgym/cache.py).
+
+execute() counts how often each statement runs; counters() returns the
+counts for the whole process.
+
+Usage (from the repository root):
+    python -m xyzgym.queries list
+    python -m xyzgym.queries check 4/XYZGym.sqlite
+"""
+
+import argparse
+import sqlite3
+import sys
+import threading
+from collections import Counter
+
+from xyzgym import profiles
+from xyzgym.cache import cached_execute
+
+
+class Statement:
+    """
+    A named, parameterized SQL statement.
+    """
+    __slots__ = ("name", "sql", "columns", "cached")
+
+    def __init__(self, name, sql, columns=(), cached=False):
+        """
+        Args:
+            name (str): Registry name, e.g. "member.listing".
+            sql (str): The SQL text, with ? placeholders.
+            columns (tuple): Names of the result columns (empty for writes).
+            cached (bool): Serve the result through the result cache.
+        """
+        self.name = name
+        self.sql = sql
+        self.columns = tuple(columns)
+        self.cached = cached
+
+
+STATEMENTS = {}
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+# Per-connection scratch tables read by registered statements; see
+# create_temp_tables()
+TEMP_TABLES = [
+    # Bulk class merges (classmerge.*): one row per class to merge or retire
+    """CREATE TEMP TABLE IF NOT EXISTS ClassMergeMap (
+        sourceId INTEGER PRIMARY KEY,
+        targetId INTEGER
+    )""",
+]
+
+
+def register(name, sql, columns=(), cached=False):
+    """
+    Adds a statement to the registry.
+
+    Raises:
+        ValueError: If the name is already registered.
+    """
+    if name in STATEMENTS:
+        raise ValueError(f"Statement '{name}' is already registered")
+    STATEMENTS[name] = Statement(name, sql, columns, cached)
+    return STATEMENTS[name]
+
+
+def statement(name):
+    """
+    Returns a registered Statement.
+
+    Raises:
+        KeyError: If no statement has that name.
+    """
+    try:
+        return STATEMENTS[name]
+    except KeyError:
+        raise KeyError(f"No statement named '{name}'") from None
+
+
+def sql(name):
+    """Returns the SQL text of a statement, e.g. as the base query of a KeysetPager."""
+    return statement(name).sql
+
+
+def execute(conn, name, params=()):
+    """
+    Runs a registered statement.
+
+    Args:
+        conn: An active SQLite database connection.
+        name (str): Registry name.
+        params (tuple): Values for the ? placeholders.
+
+    Returns:
+        An executed cursor (a CachedCursor for cached statements).
+    """
+    stmt = statement(name)
+    with _counts_lock:
+        _counts[name] += 1
+    if stmt.cached:
+        return cached_execute(conn, stmt.sql, params)
+    return conn.execute(stmt.sql, params)
+
+
+def create_temp_tables(conn):
+    """Creates the TEMP_TABLES on a connection (a no-op when they exist)."""
+    for ddl in TEMP_TABLES:
+        conn.execute(ddl)
+
+
+def counters():
+    """Returns {statement name: executions} for this process, busiest first."""
+    with _counts_lock:
+        return dict(_counts.most_common())
+
+
+def reset_counters():
+    with _counts_lock:
+        _counts.clear()
+
+
+# ---------------------------------------------------------------------------
+# Reports (query1 ... query10; the others use age_stats, expiry, rollups and
+# the attendance index)
+
+# Join Member, Payment, and MembershipPlan tables
+register("report.members_with_plans", """
+    SELECT m.name, m.email, m.age, mp.planType
+    FROM Member m
+    JOIN Payment p ON m.memberId = p.memberId
+    JOIN MembershipPlan mp ON p.planId = mp.planId;
+""", ("name", "email", "age", "planType"))
+
+# Read the per-gym counts kept by the summary triggers (see xyzgym/summaries.py)
+register("report.classes_per_gym", """
+    SELECT gf.location, s.classCount AS class_count
+    FROM GymClassSummary s
+    JOIN GymFacility gf ON s.gymId = gf.gymId
+    ORDER BY s.gymId;
+""", ("location", "class_count"), cached=True)
+
+# Equipment by type
+register("report.equipment_by_type", """
+    SELECT name, type, quantity
+    FROM Equipment
+    WHERE type = ?;
+""", ("name", "type", "quantity"))
+
+# Classes for a given instructor
+register("report.classes_by_instructor", """
+    SELECT i.name, i.phone, c.className, c.classType, c.duration, c.classCapacity
+    FROM Class c
+    JOIN Instructor i ON c.instructorId = i.instructorId
+    WHERE i.instructorId = ?;
+""", ("name", "phone", "className", "classType", "duration", "classCapacity"))
+
+# query3 / query9 on one-shot connections; long-lived ones use the attendance
+# index (see xyzgym/attendance_index.py). Members in memberId order, once each.
+register("report.class_members", """
+    SELECT m.name
+    FROM Attends a
+    JOIN Member m ON m.memberId = a.memberId
+    WHERE a.classId = ?
+    GROUP BY a.memberId
+    ORDER BY a.memberId;
+""", ("name",))
+
+register("report.class_type_count", "SELECT COUNT(*) AS classes FROM Class WHERE classType = ?",
+         ("classes",))
+
+# Names are looked up only for the members that qualify
+register("report.members_in_all_classes", """
+    SELECT m.memberId, m.name
+    FROM (
+        SELECT a.memberId
+        FROM Class c
+        JOIN Attends a ON a.classId = c.classId
+        WHERE c.classType = ?
+        GROUP BY a.memberId
+        HAVING COUNT(DISTINCT a.classId) = ?
+    ) x
+    JOIN Member m ON m.memberId = x.memberId
+    ORDER BY x.memberId;
+""", ("memberId", "name"))
+
+# Top three from the per-instructor counts kept by the summary triggers
+register("report.top_instructors", """
+    SELECT i.name, s.classCount AS class_count
+    FROM InstructorClassSummary s
+    JOIN Instructor i ON s.instructorId = i.instructorId
+    ORDER BY class_count DESC, s.instructorId
+    LIMIT 3;
+""", ("name", "class_count"), cached=True)
+
+# ---------------------------------------------------------------------------
+# Members
+
+register("member.listing", """
+    SELECT m.memberId, m.name, m.email, m.age, IFNULL(mp.planType, 'No Plan') AS planType
+    FROM Member m
+    LEFT JOIN Payment p ON m.memberId = p.memberId
+    LEFT JOIN MembershipPlan mp ON p.planId = mp.planId;
+""", ("memberId", "name", "email", "age", "planType"))
+
+# One row per member with the plan of their most recent payment (pick list base)
+register("member.pick_list", """
+    SELECT m.memberId, m.name, m.email, m.age,
+           IFNULL((SELECT mp.planType
+                   FROM Payment p
+                   JOIN MembershipPlan mp ON p.planId = mp.planId
+                   WHERE p.memberId = m.memberId
+                   ORDER BY p.paymentId DESC LIMIT 1), 'No Plan') AS planType
+    FROM Member m
+""", ("memberId", "name", "email", "age", "planType"))
+
+# Pick list rows for a full-text search (see xyzgym/search.py), best match
+# first; a name match counts most, then email, then phone and address
+register("member.search", """
+    SELECT m.memberId, m.name, m.email, m.age,
+           IFNULL((SELECT mp.planType
+                   FROM Payment p
+                   JOIN MembershipPlan mp ON p.planId = mp.planId
+                   WHERE p.memberId = m.memberId
+                   ORDER BY p.paymentId DESC LIMIT 1), 'No Plan') AS planType
+    FROM MemberSearch
+    JOIN Member m ON m.memberId = MemberSearch.rowid
+    WHERE MemberSearch MATCH ?
+    ORDER BY bm25(MemberSearch, 10.0, 5.0, 1.0, 1.0)
+    LIMIT ?
+""", ("memberId", "name", "email", "age", "planType"))
+
+register("member.insert", """
+    INSERT INTO Member (name, email, age, membershipStartDate, membershipEndDate)
+    VALUES (?, ?, ?, ?, ?)
+""")
+
+register("member.insert_payment", """
+    INSERT INTO Payment (memberId, planId, amountPaid, paymentDate)
+    VALUES (?, ?, ?, ?)
+""")
+
+register("member.update_contact", """
+    UPDATE Member
+    SET email = ?, age = ?
+    WHERE memberId = ?
+""")
+
+register("member.delete", "DELETE FROM Member WHERE memberId = ?")
+
+register("member.name", "SELECT name FROM Member WHERE memberId = ?", ("name",))
+
+register("member.names_in_class", """
+    SELECT DISTINCT m.name
+    FROM Member m
+    JOIN Attends a ON m.memberId = a.memberId
+    WHERE a.classId = ?
+""", ("name",))
+
+# ---------------------------------------------------------------------------
+# Classes
+
+register("class.attendance", """
+    SELECT c.classId, c.className, IFNULL(s.attendance, 0) AS attendance
+    FROM Class c
+    LEFT JOIN ClassAttendanceSummary s ON c.classId = s.classId
+    ORDER BY c.classId;
+""", ("classId", "className", "attendance"), cached=True)
+
+register("class.pick_list", "SELECT classId, className, classType FROM Class",
+         ("classId", "className", "classType"))
+
+register("class.short_pick_list", "SELECT classId, className FROM Class",
+         ("classId", "className"))
+
+register("class.search", """
+    SELECT c.classId, c.className, c.classType
+    FROM ClassSearch
+    JOIN Class c ON c.classId = ClassSearch.rowid
+    WHERE ClassSearch MATCH ?
+    ORDER BY bm25(ClassSearch)
+    LIMIT ?
+""", ("classId", "className", "classType"))
+
+register("class.insert", """
+    INSERT INTO Class (className, classType, duration, classCapacity, instructorId, gymID)
+    VALUES (?, ?, ?, ?, ?, ?)
+""")
+
+register("class.update", """
+    UPDATE Class
+    SET className = ?, classType = ?
+    WHERE classId = ?
+""")
+
+register("class.delete", "DELETE FROM Class WHERE classId = ?")
+
+register("class.name", "SELECT className FROM Class WHERE classId = ?", ("className",))
+
+register("class.attendance_count", "SELECT COUNT(*) AS attendees FROM Attends WHERE classId = ?",
+         ("attendees",))
+
+# Bulk merge / retire (xyzgym/classmerge.py); temp.ClassMergeMap holds
+# sourceId -> targetId, with a NULL target for a class that is retired
+register("classmerge.map_clear", "DELETE FROM temp.ClassMergeMap")
+
+register("classmerge.map_insert", """
+    INSERT INTO temp.ClassMergeMap (sourceId, targetId)
+    SELECT value ->> 0, value ->> 1 FROM json_each(?)
+""")
+
+register("classmerge.problems", """
+    SELECT m.sourceId, m.targetId,
+           CASE WHEN s.classId IS NULL THEN 'class not found'
+                WHEN m.targetId = m.sourceId THEN 'merged into itself'
+                WHEN m.targetId IS NOT NULL AND t.classId IS NULL THEN 'target class not found'
+                WHEN EXISTS (SELECT 1 FROM temp.ClassMergeMap n WHERE n.sourceId = m.targetId)
+                    THEN 'target class is merged or retired too'
+                WHEN m.targetId IS NULL AND NOT ?
+                     AND EXISTS (SELECT 1 FROM Attends a WHERE a.classId = m.sourceId)
+                    THEN 'class has attendees'
+           END AS problem
+    FROM temp.ClassMergeMap m
+    LEFT JOIN Class s ON s.classId = m.sourceId
+    LEFT JOIN Class t ON t.classId = m.targetId
+    WHERE problem IS NOT NULL
+    ORDER BY m.sourceId
+    LIMIT ?
+""", ("sourceId", "targetId", "problem"))
+
+# OR IGNORE leaves a record in place when its target row already exists;
+# those leftovers are the duplicates deleted next
+register("classmerge.move_attendance", """
+    UPDATE OR IGNORE Attends
+    SET classId = (SELECT m.targetId FROM temp.ClassMergeMap m WHERE m.sourceId = Attends.classId)
+    WHERE classId IN (SELECT sourceId FROM temp.ClassMergeMap WHERE targetId IS NOT NULL)
+""")
+
+register("classmerge.delete_duplicates", """
+    DELETE FROM Attends
+    WHERE classId IN (SELECT sourceId FROM temp.ClassMergeMap WHERE targetId IS NOT NULL)
+""")
+
+register("classmerge.delete_retired_attendance", """
+    DELETE FROM Attends
+    WHERE classId IN (SELECT sourceId FROM temp.ClassMergeMap WHERE targetId IS NULL)
+""")
+
+register("classmerge.delete_classes", """
+    DELETE FROM Class WHERE classId IN (SELECT sourceId FROM temp.ClassMergeMap)
+""")
+
+# ---------------------------------------------------------------------------
+# Equipment
+
+register("equipment.listing", "SELECT equipmentId, name, type, quantity FROM Equipment",
+         ("equipmentId", "name", "type", "quantity"))
+
+register("equipment.search", """
+    SELECT e.equipmentId, e.name, e.type, e.quantity
+    FROM EquipmentSearch
+    JOIN Equipment e ON e.equipmentId = EquipmentSearch.rowid
+    WHERE EquipmentSearch MATCH ?
+    ORDER BY bm25(EquipmentSearch)
+    LIMIT ?
+""", ("equipmentId", "name", "type", "quantity"))
+
+register("equipment.insert", """
+    INSERT INTO Equipment (name, type, quantity, gymId)
+    VALUES (?, ?, ?, ?)
+""")
+
+register("equipment.update_quantity", """
+    UPDATE Equipment
+    SET quantity = ?
+    WHERE equipmentId = ?
+""")
+
+register("equipment.delete", "DELETE FROM Equipment WHERE equipmentId = ?")
+
+register("equipment.name", "SELECT name FROM Equipment WHERE equipmentId = ?", ("name",))
+
+# ---------------------------------------------------------------------------
+# Enrollment (see xyzgym/enrollment.py; the capacity check is a trigger)
+
+# A duplicate is ignored; a full session raises "class session is full"
+register("enrollment.insert", """
+    INSERT OR IGNORE INTO Attends (memberId, classId, attendanceDate)
+    VALUES (?, ?, ?)
+""")
+
+# A whole check-in batch as one statement (see xyzgym/checkin.py); the
+# parameter is a JSON array of [memberId, classId, attendanceDate]
+register("checkin.insert_batch", """
+    INSERT OR IGNORE INTO Attends (memberId, classId, attendanceDate)
+    SELECT value ->> 0, value ->> 1, value ->> 2 FROM json_each(?)
+""")
+
+# Whether a check-in names an existing member and class. The capacity
+# trigger runs before the foreign-key check, so a refused row is only
+# "full" if both exist
+register("checkin.references_exist", """
+    SELECT EXISTS (SELECT 1 FROM Member WHERE memberId = ?)
+       AND EXISTS (SELECT 1 FROM Class WHERE classId = ?) AS valid
+""", ("valid",))
+
+register("enrollment.delete", """
+    DELETE FROM Attends
+    WHERE memberId = ? AND classId = ? AND attendanceDate = ?
+""")
+
+register("enrollment.occupancy", """
+    SELECT c.classCapacity, IFNULL(o.enrolled, 0) AS enrolled
+    FROM Class c
+    LEFT JOIN ClassSessionOccupancy o ON o.classId = c.classId AND o.sessionDate = ?
+    WHERE c.classId = ?
+""", ("classCapacity", "enrolled"))
+
+register("enrollment.sessions", """
+    SELECT o.sessionDate, o.enrolled, c.classCapacity
+    FROM ClassSessionOccupancy o
+    JOIN Class c ON c.classId = o.classId
+    WHERE o.classId = ? AND o.sessionDate >= ?
+    ORDER BY o.sessionDate
+    LIMIT ?
+""", ("sessionDate", "enrolled", "classCapacity"))
+
+
+def check(conn):
+    """
+    Runs every query statement with 0 for every parameter (inside a
+    transaction that is rolled back) and compares its result columns with
+    the declared ones.
+
+    Returns:
+        list: (name, declared columns, actual columns) for each mismatch.
+    """
+    mismatches = []
+    create_temp_tables(conn)
+    conn.execute("BEGIN")
+    try:
+        for stmt in STATEMENTS.values():
+            if not stmt.columns:
+                continue
+            cursor = conn.execute(stmt.sql, (0,) * stmt.sql.count("?"))
+            actual = tuple(d[0] for d in cursor.description or ())
+            cursor.close()
+            if actual != stmt.columns:
+                mismatches.append((stmt.name, stmt.columns, actual))
+    finally:
+        conn.rollback()
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List or check the registered SQL statements.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show every statement and its columns")
+    checker = sub.add_parser("check", help="compare declared and actual result columns")
+    checker.add_argument("db_file")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for stmt in STATEMENTS.values():
+            columns = ", ".join(stmt.columns) or "(no result)"
+            print(f"{stmt.name} | {columns}{' | cached' if stmt.cached else ''}")
+        return 0
+
+    try:
+        conn = profiles.connect(args.db_file, "reporting", verbose=False)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+    try:
+        mismatches = check(conn)
+    except sqlite3.Error as e:
+        print(f"[ERROR] Check failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    for name, declared, actual in mismatches:
+        print(f"[ERROR] {name}: declares {', '.join(declared)} but returns {', '.join(actual)}")
+    if not mismatches:
+        print(f"[INFO] All {sum(1 for s in STATEMENTS.values() if s.columns)} query statements "
+              f"return their declared columns.")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
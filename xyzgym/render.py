@@ -0,0 +1,259 @@
+"""
+render.py
+-----------
+Streaming output of query results.
+
+Rows are pulled from the cursor in fetchmany() batches and each batch is
+written to the output as a single string, so memory use stays flat and the
+first rows appear right away even when a query returns millions of rows.
+
+TextWriter produces the human-readable report text. CSVWriter, TSVWriter
+and JSONLinesWriter produce machine-readable output for downstream jobs:
+the column names come from the cursor, each batch is handed to the C
+csv/json encoders as is, and titles and text headers are left out.
+output_stream() opens a file (or stdout) for them, optionally gzipped.
+"""
+
+import csv
+import gzip
+import io
+import json
+import sys
+from contextlib import contextmanager
+
+# Rows fetched from SQLite per batch
+BATCH_SIZE = 1000
+# Bytes buffered before each write to the file (or to the compressor)
+OUTPUT_BUFFER = 1024 ** 2
+# Fast compression: exports are limited by disk speed rather than CPU
+GZIP_LEVEL = 1
+
+
+def iter_batches(cursor, batch_size=BATCH_SIZE):
+    """
+    Yields lists of rows from an executed cursor until it is exhausted.
+
+    Args:
+        cursor: A cursor on which execute() has been called.
+        batch_size (int): Rows per fetchmany() call.
+    """
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield batch
+
+
+class TextWriter:
+    """
+    Writes query output as text lines, with the columns of each row
+    joined by " | " unless a row_format is given.
+    """
+    def __init__(self, stream=None, row_format=None):
+        """
+        Args:
+            stream: File-like object to write to. Defaults to whatever
+                sys.stdout is at the time of writing.
+            row_format (str): Optional str.format() pattern for each row,
+                e.g. "Member ID: {} | Name: {}".
+        """
+        self._stream = stream
+        self.row_format = row_format
+
+    @property
+    def stream(self):
+        return self._stream if self._stream is not None else sys.stdout
+
+    def columns(self, names):
+        """Receives the column names of the result; the text layout does not use them."""
+
+    def title(self, text):
+        """Writes the line that introduces a result, e.g. "[INFO] Query 1: ..."."""
+        self.stream.write(text + "\n")
+
+    def header(self, lines):
+        """Writes the column header lines."""
+        self.stream.write("\n".join(lines) + "\n")
+
+    def rows(self, batch):
+        """Formats a batch of rows and writes them with a single write() call."""
+        if self.row_format is not None:
+            fmt = self.row_format.format
+            text = "\n".join([fmt(*row) for row in batch])
+        else:
+            text = "\n".join([" | ".join(map(str, row)) for row in batch])
+        self.stream.write(text + "\n")
+
+    def empty(self, message):
+        """Writes the message shown when a query returned no rows."""
+        self.stream.write(message + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+
+class RecordWriter:
+    """
+    Base for the machine-readable writers: only the column names and the
+    rows are written.
+    """
+    def __init__(self, stream=None):
+        """
+        Args:
+            stream: Text stream to write to (open it with newline="").
+                Defaults to whatever sys.stdout is at the time of writing.
+        """
+        self._stream = stream
+        self.names = None
+
+    @property
+    def stream(self):
+        return self._stream if self._stream is not None else sys.stdout
+
+    def columns(self, names):
+        self.names = list(names)
+
+    def title(self, text):
+        pass
+
+    def header(self, lines):
+        pass
+
+    def empty(self, message):
+        pass
+
+    def flush(self):
+        self.stream.flush()
+
+
+class CSVWriter(RecordWriter):
+    """
+    Writes rows as CSV, with the column names on the first line.
+    """
+    dialect = "excel"
+
+    def columns(self, names):
+        super().columns(names)
+        self._writer().writerow(self.names)
+
+    def _writer(self):
+        return csv.writer(self.stream, dialect=self.dialect)
+
+    def rows(self, batch):
+        """Writes a batch of rows in one writerows() call."""
+        self._writer().writerows(batch)
+
+
+class TSVWriter(CSVWriter):
+    """
+    Writes rows as tab-separated values, with the column names on the first line.
+    """
+    dialect = "excel-tab"
+
+
+class JSONLinesWriter(RecordWriter):
+    """
+    Writes one JSON object per row, keyed by column name.
+
+    Unlike CSV, records of different shapes can share one stream, so a
+    batch of queries can be written to it; fields (e.g. {"query": 3}) are
+    added to every record to tell them apart.
+    """
+    _encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self.fields = {}
+
+    def rows(self, batch):
+        """Encodes a batch of rows and writes them with a single write() call."""
+        encode = self._encode
+        fields = self.fields
+        if self.names is None:
+            if fields:
+                text = "\n".join([encode({**fields, "values": list(row)}) for row in batch])
+            else:
+                text = "\n".join([encode(list(row)) for row in batch])
+        else:
+            names = self.names
+            text = "\n".join([encode({**fields, **dict(zip(names, row))}) for row in batch])
+        self.stream.write(text + "\n")
+
+
+# Output formats by name, for --format options
+WRITERS = {
+    "text": TextWriter,
+    "csv": CSVWriter,
+    "tsv": TSVWriter,
+    "jsonl": JSONLinesWriter,
+}
+
+
+@contextmanager
+def output_stream(path=None, compress=False, compresslevel=GZIP_LEVEL):
+    """
+    Opens the destination of an export as a buffered UTF-8 text stream.
+
+    Args:
+        path (str): File to write; None or "-" means stdout.
+        compress (bool): Gzip the output.
+        compresslevel (int): Gzip level, 1 (fastest) to 9 (smallest).
+
+    Yields:
+        A text stream, flushed and (unless it is stdout) closed on exit.
+    """
+    to_stdout = path in (None, "-")
+    if to_stdout and not compress:
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    if to_stdout:
+        sys.stdout.flush()
+        raw = gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb", compresslevel=compresslevel)
+    elif compress:
+        raw = gzip.open(path, "wb", compresslevel=compresslevel)
+    else:
+        raw = open(path, "wb")
+    stream = io.TextIOWrapper(io.BufferedWriter(raw, OUTPUT_BUFFER), encoding="utf-8", newline="")
+    try:
+        yield stream
+    finally:
+        stream.close()
+        if to_stdout:
+            sys.stdout.buffer.flush()
+
+
+def render(cursor, title=None, header=None, empty=None, writer=None,
+           header_if_rows=False, batch_size=BATCH_SIZE):
+    """
+    Streams the rows of an executed cursor to a writer.
+
+    Args:
+        cursor: A cursor on which execute() has been called.
+        title (str): Line written before anything else.
+        header (list): Column header lines.
+        empty (str): Message written when there are no rows.
+        writer: Output writer; a TextWriter on stdout by default.
+        header_if_rows (bool): Only write the header if there is at least one row.
+        batch_size (int): Rows per fetchmany() call.
+
+    Returns:
+        int: The number of rows written.
+    """
+    writer = writer or TextWriter()
+    if cursor.description is not None:
+        writer.columns([d[0] for d in cursor.description])
+    if title:
+        writer.title(title)
+    if header and not header_if_rows:
+        writer.header(header)
+    count = 0
+    for batch in iter_batches(cursor, batch_size):
+        if count == 0 and header and header_if_rows:
+            writer.header(header)
+        writer.rows(batch)
+        count += len(batch)
+    if count == 0 and empty:
+        writer.empty(empty)
+    writer.flush()
+    return count
@@ -0,0 +1,119 @@
+"""
+rollups.py
+-----------
+Daily attendance rollups for the recent-attendance report (query10).
+
+AttendanceDailyRollup holds the number of sessions per (day, member,
+class). Completed days are rolled up once and then frozen: refresh() only
+adds the days that ended since the last refresh, and today (which is still
+changing) is always read straight from Attends. Later inserts, deletes or
+reassignments that touch a frozen day are applied by triggers (schema
+migration 4), so frozen days stay exact.
+
+recent_attendance() reads only the days inside the window (7, 30 or 90
+days) and returns one structured row per member and class instead of
+concatenated strings.
+"""
+
+from datetime import date, timedelta
+
+from xyzgym import clock
+from xyzgym.transaction import UnitOfWork
+
+WINDOWS = (7, 30, 90)
+DEFAULT_WINDOW = 30
+
+
+def frozen_through(conn):
+    """Returns the last rolled-up day (YYYY-MM-DD), or None before the first refresh."""
+    return conn.execute("SELECT frozenThrough FROM AttendanceRollupState WHERE id = 1").fetchone()[0]
+
+
+def refresh(conn, today=None):
+    """
+    Rolls up every completed day that is not frozen yet.
+
+    Args:
+        conn: An active SQLite database connection.
+        today (date): The current day; defaults to clock.today() (UTC).
+
+    Returns:
+        int: Number of rollup rows written. Read-only connections cannot
+        write, so they skip the refresh and return 0.
+    """
+    today = today or clock.today()
+    yesterday = (today - timedelta(days=1)).isoformat()
+    last = frozen_through(conn)
+    if last is not None and last >= yesterday:
+        return 0
+    if getattr(conn, "read_only", False):
+        return 0
+
+    start = (date.fromisoformat(last) + timedelta(days=1)).isoformat() if last else ""
+    with UnitOfWork(conn):
+        conn.execute("DELETE FROM AttendanceDailyRollup WHERE day >= ? AND day <= ?", (start, yesterday))
+        cursor = conn.execute("""
+            INSERT INTO AttendanceDailyRollup (day, memberId, classId, sessions)
+            SELECT date(attendanceDate), memberId, classId, COUNT(*)
+            FROM Attends
+            WHERE attendanceDate >= ? AND attendanceDate < ?
+            GROUP BY date(attendanceDate), memberId, classId
+        """, (start, today.isoformat()))
+        conn.execute("UPDATE AttendanceRollupState SET frozenThrough = ? WHERE id = 1", (yesterday,))
+    return cursor.rowcount
+
+
+def recent_attendance(conn, window=DEFAULT_WINDOW, today=None):
+    """
+    Returns the classes each member attended in the last window days.
+
+    Frozen days come from AttendanceDailyRollup; only the days after the
+    last refresh (normally just today) are read from Attends.
+
+    Args:
+        conn: An active SQLite database connection.
+        window (int): One of WINDOWS.
+        today (date): The current day; defaults to clock.today() (UTC).
+
+    Returns:
+        An executed cursor of (memberId, name, classId, className,
+        classType, sessions) rows, ordered by member and class.
+
+    Raises:
+        ValueError: If window is not one of WINDOWS.
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"Window must be one of {', '.join(map(str, WINDOWS))} days")
+    today = today or clock.today()
+    refresh(conn, today)
+    start = (today - timedelta(days=window)).isoformat()
+    frozen = frozen_through(conn) or ""
+    live_start = start
+    if frozen >= start:
+        live_start = (date.fromisoformat(frozen) + timedelta(days=1)).isoformat()
+    return conn.execute("""
+        WITH recent (memberId, classId, sessions) AS (
+            SELECT memberId, classId, sessions FROM AttendanceDailyRollup
+            WHERE day >= ? AND day <= ?
+            UNION ALL
+            SELECT memberId, classId, 1 FROM Attends
+            WHERE attendanceDate >= ?
+        ),
+        totals AS (
+            SELECT memberId, classId, SUM(sessions) AS sessions
+            FROM recent
+            GROUP BY memberId, classId
+        )
+        SELECT m.memberId, m.name, c.classId, c.className, c.classType, t.sessions
+        FROM totals t
+        JOIN Member m ON m.memberId = t.memberId
+        JOIN Class c ON c.classId = t.classId
+        ORDER BY t.memberId, t.classId
+    """, (start, frozen, live_start))
+
+
+def rebuild(conn):
+    """Drops every rollup so the next refresh recomputes them from Attends."""
+    with UnitOfWork(conn):
+        conn.execute("DELETE FROM AttendanceDailyRollup")
+        conn.execute("UPDATE AttendanceRollupState SET frozenThrough = NULL WHERE id = 1")
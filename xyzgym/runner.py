@@ -0,0 +1,316 @@
+"""
+runner.py
+-----------
+Runs a pack of report queries (query1 ... query10 from 3/file.py) in
+parallel and prints their output in the order they were requested.
+
+Every worker has its own read-only connection, and all of them read the
+same snapshot of the database. While the workers open their connections and
+start their read transactions, a pin connection holds the write lock
+(BEGIN IMMEDIATE), so no write can commit in between. The pin is released
+as soon as the last worker has its snapshot. In WAL mode, writers then
+carry on while the reports still see the pinned data.
+
+Workers are threads by default; SQLite releases the GIL while it runs a
+statement. With --processes each worker is a separate process, which also
+runs the Python side of the reports (formatting, the attendance index) in
+parallel. query3 and query9 are run one after the other by the same worker,
+so the attendance index they share is built once per run.
+
+Usage (from the repository root):
+    python -m xyzgym.runner 4/XYZGym.sqlite                 # the full pack
+    python -m xyzgym.runner 4/XYZGym.sqlite 1 3:5 9:Yoga --workers 3 --processes
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from xyzgym import profiles
+from xyzgym.stages import load_reports
+
+# query1 ... query10 with representative parameters
+FULL_PACK = ["1", "2", "3:1", "4:Cardio", "5", "6:1", "7", "8", "9:Yoga", "10"]
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+# Queries answered from the per-connection attendance index
+INDEX_QUERIES = {"3", "9"}
+# Seconds to wait for every worker to start its read transaction
+PIN_TIMEOUT = 60
+
+
+def migrate(db_file):
+    """
+    Applies pending schema migrations. Must run before pin_writes(): the
+    workers' read-only connections migrate through a writer connection of
+    their own, which would wait on the pin.
+    """
+    profiles.connect(db_file, verbose=False).close()
+
+
+def pin_writes(db_file):
+    """
+    Takes the write lock of a database so no write can commit until the
+    returned connection is rolled back. Also switches the database to WAL
+    mode, so readers keep going after the pin is released.
+
+    Returns:
+        The pin connection, or None if the database cannot be written
+        (the workers then start their snapshots unpinned).
+    """
+    try:
+        pin = sqlite3.connect(db_file, isolation_level=None)
+        pin.execute("PRAGMA busy_timeout = 5000")
+        pin.execute("PRAGMA journal_mode = WAL")
+        pin.execute("BEGIN IMMEDIATE")
+        return pin
+    except sqlite3.Error as e:
+        print(f"[INFO] Snapshot not pinned ({e}); workers read the latest data when they start.")
+        return None
+
+
+def release(pin):
+    if pin is not None:
+        pin.rollback()
+        pin.close()
+
+
+def open_snapshot(db_file, **kwargs):
+    """
+    Opens a read-only connection and starts its read transaction, which
+    fixes the snapshot it sees until it is rolled back.
+    """
+    conn = profiles.connect(db_file, "reporting", verbose=False, **kwargs)
+    # Runs a share of the batch; the index queries share one connection
+    conn.long_lived = True
+    conn.execute("BEGIN")
+    # The first read takes the snapshot
+    conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    return conn
+
+
+def run_report(reports, conn, query_number, params):
+    """
+    Runs one query; its output (including any error, which the queries
+    report themselves) goes to sys.stdout.
+
+    Returns:
+        float: Seconds the query took.
+    """
+    start = time.perf_counter()
+    try:
+        reports.run_query(conn, query_number, params)
+    except ValueError as e:
+        print(e)
+    except sqlite3.Error as e:
+        print(f"[ERROR] Query {query_number} failed: {e}")
+    return time.perf_counter() - start
+
+
+def plan_jobs(batch):
+    """
+    Splits a batch into jobs, each a list of (position, (query_number, params)).
+    The index queries share one job (started first); every other query is
+    a job of its own.
+    """
+    jobs, shared = [], []
+    for position, entry in enumerate(batch):
+        if entry[0] in INDEX_QUERIES:
+            shared.append((position, entry))
+        else:
+            jobs.append([(position, entry)])
+    if shared:
+        jobs.insert(0, shared)
+    return jobs
+
+
+def _in_order(batch, jobs, results):
+    """
+    Yields the result of every batch position in order.
+
+    Args:
+        results: results(job number) -> {position: result}, blocking until
+            that job is done.
+    """
+    job_of = {position: number for number, job in enumerate(jobs) for position, _ in job}
+    done = {}
+    for position in range(len(batch)):
+        number = job_of[position]
+        if number not in done:
+            done[number] = results(number)
+        yield done[number].pop(position)
+
+
+class ThreadStdout:
+    """
+    Stand-in for sys.stdout that sends each thread's output to the stream
+    set for that thread (redirect_stdout is process-wide, so threads cannot use it).
+    """
+    def __init__(self, default):
+        self.default = default
+        self._local = threading.local()
+
+    def capture(self, stream):
+        self._local.stream = stream
+
+    @property
+    def _stream(self):
+        return getattr(self._local, "stream", None) or self.default
+
+    def write(self, text):
+        return self._stream.write(text)
+
+    def flush(self):
+        self._stream.flush()
+
+
+def _run_threads(db_file, batch, workers):
+    """Runs the batch on a thread pool; yields results in request order."""
+    reports = load_reports()
+    migrate(db_file)
+    pin = pin_writes(db_file)
+    try:
+        # Closed from this thread at the end, hence check_same_thread
+        conns = [open_snapshot(db_file, check_same_thread=False) for _ in range(workers)]
+    finally:
+        release(pin)
+    idle = queue.Queue()
+    for conn in conns:
+        idle.put(conn)
+
+    stdout = ThreadStdout(sys.stdout)
+
+    def run_job(job):
+        conn = idle.get()
+        try:
+            results = {}
+            for position, entry in job:
+                output = io.StringIO()
+                stdout.capture(output)
+                try:
+                    seconds = run_report(reports, conn, *entry)
+                finally:
+                    stdout.capture(None)
+                results[position] = (output.getvalue(), seconds)
+            return results
+        finally:
+            idle.put(conn)
+
+    jobs = plan_jobs(batch)
+    original, sys.stdout = sys.stdout, stdout
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_job, job) for job in jobs]
+            yield from _in_order(batch, jobs, lambda number: futures[number].result())
+    finally:
+        sys.stdout = original
+        for conn in conns:
+            conn.rollback()
+            conn.close()
+
+
+# Per-process state of --processes workers
+_process_reports = None
+_process_conn = None
+
+
+def _start_process(db_file, ready):
+    """Pool initializer: opens the worker's snapshot and reports it is ready."""
+    global _process_reports, _process_conn
+    _process_reports = load_reports()
+    _process_conn = open_snapshot(db_file)
+    ready.put(True)
+
+
+def _process_job(job):
+    results = {}
+    for position, entry in job:
+        output = io.StringIO()
+        with redirect_stdout(output):
+            seconds = run_report(_process_reports, _process_conn, *entry)
+        results[position] = (output.getvalue(), seconds)
+    return results
+
+
+def _run_processes(db_file, batch, workers):
+    """Runs the batch on a process pool; yields results in request order."""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Manager().Queue()
+    migrate(db_file)
+    pin = pin_writes(db_file)
+    try:
+        pool = context.Pool(workers, initializer=_start_process, initargs=(db_file, ready))
+        for _ in range(workers):
+            ready.get(timeout=PIN_TIMEOUT)
+    except BaseException:
+        release(pin)
+        raise
+    release(pin)
+    jobs = plan_jobs(batch)
+    try:
+        pending = [pool.apply_async(_process_job, (job,)) for job in jobs]
+        yield from _in_order(batch, jobs, lambda number: pending[number].get())
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def run_parallel(db_file, batch, workers=DEFAULT_WORKERS, processes=False):
+    """
+    Runs report queries in parallel on one snapshot.
+
+    Args:
+        db_file (str): Path of the database file.
+        batch (list): (query_number, params) pairs, e.g. from parse_batch().
+        workers (int): Number of threads or processes (each has a connection).
+        processes (bool): Use a process pool instead of threads.
+
+    Yields:
+        tuple: (output text, seconds) for each query, in batch order.
+    """
+    workers = max(1, min(workers, len(plan_jobs(batch))))
+    runner = _run_processes if processes else _run_threads
+    yield from runner(db_file, batch, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run report queries in parallel on one snapshot.")
+    parser.add_argument("db_file")
+    parser.add_argument("queries", nargs="*", default=FULL_PACK,
+                        help="queries with optional parameter, e.g. 1 3:5 9:Yoga (default: all ten)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--processes", action="store_true", help="use processes instead of threads")
+    args = parser.parse_args(argv)
+
+    batch = load_reports().parse_batch(args.queries)
+    start = time.perf_counter()
+    timings = []
+    try:
+        for (query_number, params), (text, seconds) in zip(
+                batch, run_parallel(args.db_file, batch, args.workers, args.processes)):
+            sys.stdout.write(text + "\n")
+            timings.append((query_number, " ".join(params), seconds))
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Report run failed: {e}")
+        return 1
+    wall = time.perf_counter() - start
+
+    mode = "processes" if args.processes else "threads"
+    print(f"[INFO] Parallel run summary: {len(timings)} queries on {args.workers} {mode}")
+    print("Query | Parameters | Time (ms)")
+    print("------------------------------")
+    for query_number, params, seconds in timings:
+        print(f"{query_number} | {params or '-'} | {seconds * 1000:.1f}")
+    print(f"Total: {wall * 1000:.1f} ms (sum of queries {sum(t[2] for t in timings) * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
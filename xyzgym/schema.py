@@ -0,0 +1,42 @@
+"""
+schema.py
+-----------
+Access to the XYZGym base schema (crtdb.sql) for tools that need to build a
+database from scratch, such as the data generator.
+"""
+
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The latest project stage holds the canonical copy of the schema
+SCHEMA_FILE = os.path.join(REPO_ROOT, "4", "crtdb.sql")
+
+
+def load_schema_sql(path=SCHEMA_FILE):
+    """
+    Reads crtdb.sql and returns it as a script that can be executed.
+
+    The file was exported from the sqlite3 shell as UTF-16 and contains the
+    internal sqlite_sequence table, which SQLite creates on its own.
+
+    Args:
+        path (str): Location of the schema file.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    text = raw.decode("utf-16") if raw[:2] in (b"\xff\xfe", b"\xfe\xff") else raw.decode("utf-8")
+    statements = [s.strip() for s in text.split(";") if s.strip()]
+    statements = [s for s in statements if "sqlite_sequence" not in s]
+    return ";\n".join(statements) + ";\n"
+
+
+def create_schema(conn, path=SCHEMA_FILE):
+    """
+    Creates the XYZGym tables in an empty database.
+
+    Args:
+        conn: An active SQLite database connection.
+        path (str): Location of the schema file.
+    """
+    conn.executescript(load_schema_sql(path))
@@ -0,0 +1,156 @@
+"""
+search.py
+-----------
+Full-text search over members, classes and equipment.
+
+MemberSearch (name, email, phone, address), ClassSearch (className) and
+EquipmentSearch (name) are FTS5 indexes created by schema migration 7 and
+kept in sync with their tables by triggers. Every word typed is matched as
+a prefix ("jo smi" finds "John Smith" and "joanna.smits@..."), all words
+must match, and results come best match (BM25) first. A word with
+punctuation matches as a phrase, so "kevin.sanchez.1@" or "555-19" only
+finds those tokens next to each other.
+
+The pick lists in 4/gym_management.py and the /search routes of the HTTP
+service use these functions instead of listing every row.
+
+Usage (from the repository root):
+    python -m xyzgym.search 4/XYZGym.sqlite members jo smi
+    python -m xyzgym.search 4/XYZGym.sqlite equipment tread
+    python -m xyzgym.search 4/XYZGym.sqlite rebuild
+"""
+
+import argparse
+import re
+import sqlite3
+import sys
+import time
+
+from xyzgym import profiles, queries
+from xyzgym.render import render
+from xyzgym.transaction import UnitOfWork
+
+SEARCH_LIMIT = 20
+
+# kind -> (registered statement, FTS5 table, header lines)
+INDEXES = {
+    "members": ("member.search", "MemberSearch",
+                ["Member ID | Member Name | Email | Age | Membership Plan",
+                 "----------------------------------------------------------"]),
+    "classes": ("class.search", "ClassSearch",
+                ["Class ID | Class Name | Class Type",
+                 "-----------------------------------"]),
+    "equipment": ("equipment.search", "EquipmentSearch",
+                  ["Equipment ID | Name | Type | Quantity",
+                   "--------------------------------------"]),
+}
+
+
+def match_query(text):
+    """
+    Turns what a user typed into an FTS5 query: every whitespace-separated
+    word becomes a quoted prefix phrase, so punctuation and FTS5 operators
+    are taken literally.
+
+    Raises:
+        ValueError: If the text has no letters or digits.
+    """
+    words = [word for word in text.split() if re.search(r"\w", word)]
+    if not words:
+        raise ValueError("Type at least one letter or digit to search for")
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def search(conn, kind, text, limit=SEARCH_LIMIT):
+    """
+    Runs a full-text search.
+
+    Args:
+        conn: An active SQLite database connection.
+        kind (str): "members", "classes" or "equipment".
+        text (str): The words to search for.
+        limit (int): Maximum number of rows returned.
+
+    Returns:
+        A cursor over the matching pick list rows, best match first.
+
+    Raises:
+        ValueError: If kind is unknown or text has no words.
+    """
+    if kind not in INDEXES:
+        raise ValueError(f"Unknown search '{kind}' (choose from {', '.join(INDEXES)})")
+    return queries.execute(conn, INDEXES[kind][0], (match_query(text), limit))
+
+
+def search_members(conn, text, limit=SEARCH_LIMIT):
+    """Returns (memberId, name, email, age, planType) rows matching text."""
+    return search(conn, "members", text, limit)
+
+
+def search_classes(conn, text, limit=SEARCH_LIMIT):
+    """Returns (classId, className, classType) rows matching text."""
+    return search(conn, "classes", text, limit)
+
+
+def search_equipment(conn, text, limit=SEARCH_LIMIT):
+    """Returns (equipmentId, name, type, quantity) rows matching text."""
+    return search(conn, "equipment", text, limit)
+
+
+def rebuild(conn):
+    """
+    Rebuilds every search index from its table, e.g. after rows were
+    changed with the triggers dropped.
+    """
+    with UnitOfWork(conn):
+        for _, table, _ in INDEXES.values():
+            conn.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+
+
+def verify(conn):
+    """
+    Checks that every search index matches its table.
+
+    Raises:
+        sqlite3.DatabaseError: If an index is out of sync.
+    """
+    for _, table, _ in INDEXES.values():
+        conn.execute(f"INSERT INTO {table} ({table}, rank) VALUES ('integrity-check', 1)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text search over members, classes and equipment.")
+    parser.add_argument("db_file")
+    parser.add_argument("kind", choices=list(INDEXES) + ["rebuild", "verify"])
+    parser.add_argument("words", nargs="*")
+    parser.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    args = parser.parse_args(argv)
+
+    profile = "interactive" if args.kind in ("rebuild", "verify") else "reporting"
+    try:
+        conn = profiles.connect(args.db_file, profile, verbose=False)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+    try:
+        start = time.perf_counter()
+        if args.kind == "rebuild":
+            rebuild(conn)
+            print(f"[INFO] Search indexes rebuilt in {time.perf_counter() - start:.2f} s")
+        elif args.kind == "verify":
+            verify(conn)
+            print("[INFO] Search indexes match their tables.")
+        else:
+            count = render(search(conn, args.kind, " ".join(args.words), args.limit),
+                           header=INDEXES[args.kind][2], empty="No matches found.")
+            print(f"[INFO] {count} match(es) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Search {args.kind} failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
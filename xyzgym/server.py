@@ -0,0 +1,742 @@
+"""
+server.py
+-----------
+Local HTTP/JSON service for the gym managers and the report queries, so
+the front desk, the kiosks and the reporting dashboard can share one
+database.
+
+The server runs on asyncio (standard library only). Every request is
+parsed on the event loop and its SQLite work runs on a bounded thread pool;
+each pool thread opens its own connection (with its own result cache and
+attendance index) the first time it is used. The event loop never touches
+SQLite, so hundreds of keep-alive clients can wait on a handful of threads.
+
+Listings are streamed: the worker thread encodes rows to JSON in
+fetchmany() batches and hands each batch to the event loop through a small
+queue, which is sent as one HTTP chunk. A slow client fills the queue and
+the worker waits, so memory stays flat whatever the size of the result;
+a client that disconnects stops the worker at the next batch.
+
+Endpoints (JSON bodies; listings return {"columns", "rows", "count"}):
+    GET    /health
+    GET    /members                        POST /members
+    PUT    /members/{id}                   DELETE /members/{id}
+    GET    /members/expiring?days=30
+    GET    /members/search?q=...&limit=20  (also /classes/search, /equipment/search)
+    GET    /classes                        POST /classes
+    PUT    /classes/{id}                   DELETE /classes/{id}?reassignTo={id}
+    POST   /classes/merge                  (body {"merges": [{"classId", "into"}, ...],
+                                            "discardAttendance"}; no "into" retires the class)
+    GET    /classes/{id}/members
+    POST   /classes/{id}/enrollments       DELETE /classes/{id}/enrollments?memberId=&date=
+           (body {"memberId", "date"}; 409 when the session is full)
+    GET    /classes/{id}/occupancy?date=   GET /classes/{id}/sessions?from=&limit=
+    GET    /equipment                      POST /equipment
+    PUT    /equipment/{id}                 DELETE /equipment/{id}
+    POST   /checkins                       (body {"memberId", "classId", "date"} or
+                                            {"checkIns": [...]}; 202, or 503 when the queue is full)
+    GET    /checkins/metrics
+    GET    /reports/query1 ... /reports/query10
+           (query3 ?classId=, query4 ?type=, query6 ?instructorId=,
+            query9 ?classType=, query10 ?window=7|30|90)
+
+Usage (from the repository root):
+    python -m xyzgym.server 4/XYZGym.sqlite --port 8080 --workers 8
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from queue import Full
+from urllib.parse import parse_qs, urlsplit
+
+from xyzgym import age_stats, checkin, enrollment, expiry, migrations, profiles, queries, rollups, search
+from xyzgym.attendance_index import attendance_index, member_rows
+from xyzgym.stages import load_gym_management
+from xyzgym.transaction import UnitOfWork
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 8
+# Rows encoded per streamed chunk
+BATCH_SIZE = 500
+# Encoded chunks a worker may get ahead of a slow client
+QUEUE_DEPTH = 4
+MAX_BODY_BYTES = 1024 ** 2
+MAX_HEADERS = 100
+
+
+class Request:
+    """
+    A parsed HTTP request.
+    """
+    def __init__(self, method, path, query, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query      # name -> first value
+        self.headers = headers  # lower-case name -> value
+        self.body = body        # parsed JSON object ({} when there is no body)
+        self.params = {}        # path parameters of the matched route
+
+    @property
+    def keep_alive(self):
+        return self.headers.get("connection", "").lower() != "close"
+
+
+class HTTPError(Exception):
+    """Error returned to the client with a given status."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class WorkerState:
+    """
+    The connection and managers of one pool thread.
+    """
+    def __init__(self, db_file, profile, gym_management, checkins=None):
+        # Closed from the main thread at shutdown, hence check_same_thread
+        self.conn = profiles.connect(db_file, profile, verbose=False, check_same_thread=False)
+        self.conn.long_lived = True
+        self.checkins = checkins  # the server's CheckInWriter, shared by every thread
+        uow = UnitOfWork(self.conn)
+        self.members = gym_management.MemberManager(self.conn, uow)
+        self.classes = gym_management.ClassManager(self.conn, uow)
+        self.equipment = gym_management.EquipmentManager(self.conn, uow)
+
+
+# ---------------------------------------------------------------------------
+# Request helpers
+
+def _field(values, name, convert=str, default=None, required=True):
+    """
+    Reads one value from a JSON body or query string.
+
+    Raises:
+        ValueError: If the value is missing (and required) or cannot be converted.
+    """
+    if values.get(name) is None:
+        if required:
+            raise ValueError(f"Missing field '{name}'")
+        return default
+    try:
+        return convert(values[name])
+    except (TypeError, ValueError):
+        raise ValueError(f"Field '{name}' has an invalid value: {values[name]!r}")
+
+
+def _changed(count, what, key):
+    """Turns a rowcount into the response of an update or delete."""
+    if not count:
+        return HTTPStatus.NOT_FOUND, {"error": f"{what} {key} not found"}
+    return HTTPStatus.OK, {"updated": key}
+
+
+# ---------------------------------------------------------------------------
+# Handlers: run on a pool thread, return (status, payload) or a cursor to stream
+
+def health(state, request):
+    return HTTPStatus.OK, {"status": "ok", "schemaVersion": migrations.schema_version(state.conn),
+                           "statements": queries.counters()}
+
+
+def list_members(state, request):
+    return state.members.member_listing()
+
+
+def add_member(state, request):
+    body = request.body
+    member_id = state.members.create_member(
+        _field(body, "name"), _field(body, "email"), _field(body, "age", int),
+        _field(body, "membershipStartDate"), _field(body, "membershipEndDate"),
+        _field(body, "planId", int))
+    return HTTPStatus.CREATED, {"memberId": member_id}
+
+
+def update_member(state, request):
+    member_id = request.params["id"]
+    count = state.members.edit_member(member_id, _field(request.body, "email"),
+                                      _field(request.body, "age", int))
+    return _changed(count, "Member", member_id)
+
+
+def delete_member(state, request):
+    member_id = request.params["id"]
+    status, payload = _changed(state.members.remove_member(member_id), "Member", member_id)
+    return status, {"deleted": member_id} if status == HTTPStatus.OK else payload
+
+
+def expiring_members(state, request):
+    days = _field(request.query, "days", int, expiry.DEFAULT_EXPIRING_DAYS, required=False)
+    return expiry.expiring_within(state.conn, days)
+
+
+def search_handler(kind):
+    """Returns a handler for GET /{kind}/search?q=...&limit=..."""
+    def handler(state, request):
+        return search.search(state.conn, kind, _field(request.query, "q"),
+                             _field(request.query, "limit", int, search.SEARCH_LIMIT, required=False))
+    return handler
+
+
+def list_classes(state, request):
+    return state.classes.class_attendance()
+
+
+def add_class(state, request):
+    body = request.body
+    class_id = state.classes.create_class(
+        _field(body, "className"), _field(body, "classType"),
+        _field(body, "duration", int), _field(body, "capacity", int),
+        _field(body, "instructorId", int, 1, required=False),
+        _field(body, "gymId", int, 1, required=False))
+    return HTTPStatus.CREATED, {"classId": class_id}
+
+
+def update_class(state, request):
+    class_id = request.params["id"]
+    count = state.classes.edit_class(class_id, _field(request.body, "className"),
+                                     _field(request.body, "classType"))
+    return _changed(count, "Class", class_id)
+
+
+def delete_class(state, request):
+    class_id = request.params["id"]
+    reassign_to = _field(request.query, "reassignTo", int, required=False)
+    merged = state.classes.remove_class(class_id, reassign_to)
+    if merged is None:
+        return HTTPStatus.NOT_FOUND, {"error": f"Class {class_id} not found"}
+    return HTTPStatus.OK, {"deleted": class_id, "moved": merged["moved"],
+                           "deduplicated": merged["deduplicated"]}
+
+
+def merge_classes(state, request):
+    # {"merges": [{"classId", "into"}, ...]}; no "into" retires the class
+    body = request.body
+    merges = body.get("merges")
+    if not isinstance(merges, list) or not merges:
+        raise ValueError("Field 'merges' must be a non-empty list")
+    if not all(isinstance(item, dict) for item in merges):
+        raise ValueError("Every merge must be a JSON object")
+    mapping = {_field(item, "classId", int): _field(item, "into", int, required=False) for item in merges}
+    return HTTPStatus.OK, state.classes.merge_classes(mapping, bool(body.get("discardAttendance")))
+
+
+def class_members(state, request):
+    return state.members.members_in_class(request.params["id"])
+
+
+def _occupancy(state, class_id, day):
+    enrolled, capacity = enrollment.occupancy(state.conn, class_id, day)
+    return {"classId": class_id, "date": enrollment.session_date(day), "enrolled": enrolled,
+            "capacity": capacity, "seatsLeft": max(0, capacity - enrolled)}
+
+
+def enroll(state, request):
+    # A full session raises SessionFull (an IntegrityError): 409 Conflict
+    class_id = request.params["id"]
+    day = _field(request.body, "date")
+    added = state.classes.enroll(_field(request.body, "memberId", int), class_id, day)
+    payload = _occupancy(state, class_id, day)
+    payload["enrolledNow"] = added
+    return (HTTPStatus.CREATED if added else HTTPStatus.OK), payload
+
+
+def cancel_enrollment(state, request):
+    class_id = request.params["id"]
+    day = _field(request.query, "date")
+    if not enrollment.cancel(state.conn, _field(request.query, "memberId", int), class_id, day,
+                             state.classes.uow):
+        return HTTPStatus.NOT_FOUND, {"error": "Member is not enrolled in that session"}
+    return HTTPStatus.OK, _occupancy(state, class_id, day)
+
+
+def class_occupancy(state, request):
+    class_id = request.params["id"]
+    if queries.execute(state.conn, "class.name", (class_id,)).fetchone() is None:
+        return HTTPStatus.NOT_FOUND, {"error": f"Class {class_id} not found"}
+    return HTTPStatus.OK, _occupancy(state, class_id, _field(request.query, "date"))
+
+
+def class_sessions(state, request):
+    return enrollment.sessions(state.conn, request.params["id"],
+                               _field(request.query, "from", required=False),
+                               _field(request.query, "limit", int, enrollment.SESSIONS_LIMIT,
+                                      required=False))
+
+
+def add_checkins(state, request):
+    # One check-in, or {"checkIns": [...]}; written by the group-commit writer
+    body = request.body
+    events = body.get("checkIns", [body])
+    if not isinstance(events, list) or not events:
+        raise ValueError("Field 'checkIns' must be a non-empty list")
+    if not all(isinstance(event, dict) for event in events):
+        raise ValueError("Every check-in must be a JSON object")
+    # Check them all before queueing any
+    parsed = [(_field(event, "memberId", int), _field(event, "classId", int),
+               _field(event, "date", enrollment.session_date, required=False)) for event in events]
+    queued = 0
+    for member_id, class_id, day in parsed:
+        try:
+            state.checkins.submit(member_id, class_id, day, block=False)
+        except Full:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE,
+                            f"Check-in queue is full; {queued} of {len(events)} queued, retry the rest")
+        queued += 1
+    return HTTPStatus.ACCEPTED, {"queued": queued, "queueDepth": state.checkins.stats()["queueDepth"]}
+
+
+def checkin_metrics(state, request):
+    return HTTPStatus.OK, state.checkins.stats()
+
+
+def list_equipment(state, request):
+    return state.equipment.equipment_listing()
+
+
+def add_equipment(state, request):
+    body = request.body
+    equipment_id = state.equipment.create_equipment(
+        _field(body, "name"), _field(body, "type"), _field(body, "quantity", int),
+        _field(body, "gymId", int, 1, required=False))
+    return HTTPStatus.CREATED, {"equipmentId": equipment_id}
+
+
+def update_equipment(state, request):
+    equipment_id = request.params["id"]
+    count = state.equipment.edit_equipment(equipment_id, _field(request.body, "quantity", int))
+    return _changed(count, "Equipment", equipment_id)
+
+
+def delete_equipment(state, request):
+    equipment_id = request.params["id"]
+    status, payload = _changed(state.equipment.remove_equipment(equipment_id), "Equipment", equipment_id)
+    return status, {"deleted": equipment_id} if status == HTTPStatus.OK else payload
+
+
+def _age_summary(dist):
+    return {
+        "members": dist.members,
+        "mean": dist.mean,
+        "percentiles": {str(p): dist.percentile(p) for p in (25, 50, 75, 90)},
+        "histogram": {f"{start}-{start + age_stats.HISTOGRAM_BAND - 1}": n
+                      for start, n in sorted(dist.histogram().items())},
+    }
+
+
+def report(state, request):
+    """Runs the same statements as query1 ... query10 in 3/file.py."""
+    conn, query = state.conn, request.query
+    number = request.params["number"]
+    if number == 1:
+        return queries.execute(conn, "report.members_with_plans")
+    if number == 2:
+        return queries.execute(conn, "report.classes_per_gym")
+    if number == 3:
+        members = attendance_index(conn).members_of(_field(query, "classId", int))
+        return member_rows(conn, members, "m.name")
+    if number == 4:
+        return queries.execute(conn, "report.equipment_by_type", (_field(query, "type"),))
+    if number == 5:
+        return expiry.expired(conn)
+    if number == 6:
+        return queries.execute(conn, "report.classes_by_instructor", (_field(query, "instructorId", int),))
+    if number == 7:
+        stats = age_stats.age_statistics(conn)
+        return HTTPStatus.OK, {"active": _age_summary(stats[age_stats.ACTIVE]),
+                               "expired": _age_summary(stats[age_stats.EXPIRED])}
+    if number == 8:
+        return queries.execute(conn, "report.top_instructors")
+    if number == 9:
+        index = attendance_index(conn)
+        class_ids = index.classes_of_type(_field(query, "classType"))
+        return member_rows(conn, index.members_in_all(class_ids), "m.memberId, m.name")
+    if number == 10:
+        window = _field(query, "window", int, rollups.DEFAULT_WINDOW, required=False)
+        return rollups.recent_attendance(conn, window)
+    return HTTPStatus.NOT_FOUND, {"error": f"No report query{number}; choose 1 to 10"}
+
+
+# (method, path pattern, handler); path groups named "id" or "number" are integers
+ROUTES = [
+    ("GET", r"/health", health),
+    ("GET", r"/members", list_members),
+    ("POST", r"/members", add_member),
+    ("GET", r"/members/expiring", expiring_members),
+    ("GET", r"/members/search", search_handler("members")),
+    ("PUT", r"/members/(?P<id>\d+)", update_member),
+    ("DELETE", r"/members/(?P<id>\d+)", delete_member),
+    ("GET", r"/classes", list_classes),
+    ("POST", r"/classes", add_class),
+    ("GET", r"/classes/search", search_handler("classes")),
+    ("POST", r"/classes/merge", merge_classes),
+    ("GET", r"/classes/(?P<id>\d+)/members", class_members),
+    ("POST", r"/classes/(?P<id>\d+)/enrollments", enroll),
+    ("DELETE", r"/classes/(?P<id>\d+)/enrollments", cancel_enrollment),
+    ("GET", r"/classes/(?P<id>\d+)/occupancy", class_occupancy),
+    ("GET", r"/classes/(?P<id>\d+)/sessions", class_sessions),
+    ("PUT", r"/classes/(?P<id>\d+)", update_class),
+    ("DELETE", r"/classes/(?P<id>\d+)", delete_class),
+    ("GET", r"/equipment", list_equipment),
+    ("POST", r"/equipment", add_equipment),
+    ("GET", r"/equipment/search", search_handler("equipment")),
+    ("PUT", r"/equipment/(?P<id>\d+)", update_equipment),
+    ("DELETE", r"/equipment/(?P<id>\d+)", delete_equipment),
+    ("POST", r"/checkins", add_checkins),
+    ("GET", r"/checkins/metrics", checkin_metrics),
+    ("GET", r"/reports/query(?P<number>\d+)", report),
+]
+_COMPILED_ROUTES = [(method, re.compile(pattern + r"/?"), handler) for method, pattern, handler in ROUTES]
+
+
+def resolve(request):
+    """
+    Finds the handler of a request and fills in request.params.
+
+    Raises:
+        HTTPError: 404 for an unknown path, 405 for a known path with another method.
+    """
+    allowed = []
+    for method, pattern, handler in _COMPILED_ROUTES:
+        match = pattern.fullmatch(request.path)
+        if match is None:
+            continue
+        if method != request.method:
+            allowed.append(method)
+            continue
+        request.params = {name: int(value) for name, value in match.groupdict().items()}
+        return handler
+    if allowed:
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {' or '.join(allowed)} for {request.path}")
+    raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown path {request.path}")
+
+
+def error_status(exc):
+    """Maps an exception raised by a handler to an HTTP status."""
+    if isinstance(exc, HTTPError):
+        return exc.status
+    if isinstance(exc, (ValueError, KeyError, TypeError)):
+        return HTTPStatus.BAD_REQUEST
+    if isinstance(exc, sqlite3.IntegrityError):
+        return HTTPStatus.CONFLICT
+    if isinstance(exc, sqlite3.OperationalError) and ("locked" in str(exc) or "busy" in str(exc)):
+        return HTTPStatus.SERVICE_UNAVAILABLE
+    return HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def _encode(payload):
+    return json.dumps(payload, default=str).encode()
+
+
+# ---------------------------------------------------------------------------
+# Server
+
+class GymServer:
+    """
+    Asyncio HTTP server that runs the handlers on a bounded thread pool.
+    """
+    def __init__(self, db_file, workers=DEFAULT_WORKERS, profile=profiles.DEFAULT_PROFILE,
+                 batch_size=BATCH_SIZE, checkin_options=None):
+        """
+        Args:
+            db_file (str): Path of the database file.
+            workers (int): Pool threads, i.e. SQLite connections.
+            profile (str): Connection profile of the pool connections.
+            batch_size (int): Rows per streamed chunk.
+            checkin_options (dict): batch_size, flush_interval and queue_size
+                of the check-in writer (see xyzgym/checkin.py).
+        """
+        self.db_file = db_file
+        self.profile = profile
+        self.workers = workers
+        self.batch_size = batch_size
+        # Loaded once here: importing a stage script is not thread-safe
+        self.gym_management = load_gym_management()
+        # One writer connection for every check-in; started with the server
+        self.checkins = checkin.CheckInWriter(db_file, **(checkin_options or {}))
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="xyzgym-db")
+        self.requests = 0
+        self.errors = 0
+        self._local = threading.local()
+        self._states = []
+        self._states_lock = threading.Lock()
+        self._loop = None
+        self._server = None
+
+    # -- pool side ----------------------------------------------------------
+
+    def _state(self):
+        """Returns the WorkerState of the current pool thread, opening it on first use."""
+        state = getattr(self._local, "state", None)
+        if state is None:
+            state = WorkerState(self.db_file, self.profile, self.gym_management, self.checkins)
+            self._local.state = state
+            with self._states_lock:
+                self._states.append(state)
+        return state
+
+    def _run(self, handler, request, queue, cancelled):
+        """
+        Runs a handler on a pool thread and passes its output to the event
+        loop through queue, ending with None. Messages:
+            ("json", status, body)   a complete response
+            ("stream", head)         start of a streamed listing
+            ("chunk", data)          more of the listing
+            ("error", exception)
+        """
+        def put(message):
+            # Blocks while the queue is full: backpressure from the client
+            asyncio.run_coroutine_threadsafe(queue.put(message), self._loop).result()
+
+        try:
+            result = handler(self._state(), request)
+            if isinstance(result, tuple):
+                status, payload = result
+                put(("json", status, _encode(payload)))
+            else:
+                self._stream(result, put, cancelled)
+        except Exception as e:
+            put(("error", e))
+        finally:
+            put(None)
+
+    def _stream(self, cursor, put, cancelled):
+        """Encodes the rows of a cursor as JSON, one batch per chunk."""
+        columns = [d[0] for d in cursor.description or ()]
+        put(("stream", b'{"columns": ' + _encode(columns) + b', "rows": ['))
+        count = 0
+        try:
+            while not cancelled.is_set():
+                batch = cursor.fetchmany(self.batch_size)
+                if not batch:
+                    break
+                text = ", ".join([json.dumps(dict(zip(columns, row)), default=str) for row in batch])
+                put(("chunk", (", " if count else "").encode() + text.encode()))
+                count += len(batch)
+        finally:
+            # Release the statement (and its read snapshot) right away
+            close = getattr(cursor, "close", None)
+            if close is not None:
+                close()
+        put(("chunk", b'], "count": ' + str(count).encode() + b"}"))
+
+    # -- event loop side ----------------------------------------------------
+
+    async def _read_request(self, reader):
+        """
+        Reads one request from a connection.
+
+        Returns:
+            Request, or None when the client closed the connection.
+
+        Raises:
+            HTTPError: For a malformed request.
+        """
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, _version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        body = {}
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        if length:
+            raw = await reader.readexactly(length)
+            try:
+                body = json.loads(raw)
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+
+        url = urlsplit(target)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        return Request(method.upper(), url.path, query, headers, body)
+
+    @staticmethod
+    def _head(status, keep_alive, extra):
+        status = HTTPStatus(status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 "Content-Type: application/json",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"] + extra
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _send_json(self, writer, status, body, keep_alive):
+        writer.write(self._head(status, keep_alive, [f"Content-Length: {len(body)}"]) + body)
+        await writer.drain()
+
+    async def _send_error(self, writer, exc, keep_alive):
+        self.errors += 1
+        await self._send_json(writer, error_status(exc), _encode({"error": str(exc)}), keep_alive)
+
+    async def _respond(self, request, writer):
+        """
+        Runs a request on the pool and writes the response.
+
+        Returns:
+            bool: False if the connection must be closed afterwards.
+        """
+        handler = resolve(request)
+        queue = asyncio.Queue(maxsize=QUEUE_DEPTH)
+        cancelled = threading.Event()
+        job = self._loop.run_in_executor(self.pool, self._run, handler, request, queue, cancelled)
+        streaming = False
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                kind = message[0]
+                if kind == "json":
+                    await self._send_json(writer, message[1], message[2], request.keep_alive)
+                elif kind == "error":
+                    if streaming:
+                        # Too late to change the status: cut the response short
+                        return False
+                    await self._send_error(writer, message[1], request.keep_alive)
+                elif kind == "stream":
+                    streaming = True
+                    writer.write(self._head(HTTPStatus.OK, request.keep_alive,
+                                            ["Transfer-Encoding: chunked"]))
+                    self._write_chunk(writer, message[1])
+                    await writer.drain()
+                else:
+                    self._write_chunk(writer, message[1])
+                    await writer.drain()
+            if streaming:
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+            return request.keep_alive
+        finally:
+            if not job.done():
+                # Client went away (or an error cut the stream): stop the
+                # worker at its next batch and let it finish its puts
+                cancelled.set()
+                while not job.done():
+                    try:
+                        if await asyncio.wait_for(queue.get(), timeout=0.1) is None:
+                            break
+                    except asyncio.TimeoutError:
+                        pass
+                await job
+
+    @staticmethod
+    def _write_chunk(writer, data):
+        writer.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    self.requests += 1
+                    keep_alive = await self._respond(request, writer)
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive=e.status != HTTPStatus.BAD_REQUEST)
+                    keep_alive = e.status != HTTPStatus.BAD_REQUEST
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass  # client went away or sent a line longer than the stream limit
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Starts listening; returns the asyncio server."""
+        self._loop = asyncio.get_running_loop()
+        self.checkins.start()
+        # Room for hundreds of clients connecting at once
+        self._server = await asyncio.start_server(self._handle_connection, host, port, backlog=1024)
+        return self._server
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await self.start(host, port)
+        address = server.sockets[0].getsockname()
+        print(f"[INFO] Serving {self.db_file} on http://{address[0]}:{address[1]} "
+              f"({self.workers} worker connections, profile {self.profile})")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """Stops the pool and closes every worker connection."""
+        if self._server is not None:
+            self._server.close()
+        self.pool.shutdown(wait=True)
+        # Commits the check-ins still queued
+        self.checkins.close()
+        with self._states_lock:
+            for state in self._states:
+                state.conn.close()
+            self._states.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON service for the XYZGym database.")
+    parser.add_argument("db_file")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="pool threads, each with its own connection (default %(default)s)")
+    parser.add_argument("--profile", default=profiles.DEFAULT_PROFILE, choices=sorted(profiles.PROFILES))
+    parser.add_argument("--checkin-batch-size", type=int, default=checkin.DEFAULT_BATCH_SIZE,
+                        help="most check-ins per commit (default %(default)s)")
+    parser.add_argument("--checkin-flush-ms", type=float, default=checkin.DEFAULT_FLUSH_INTERVAL * 1000,
+                        help="most milliseconds a check-in waits to be batched (default %(default)s)")
+    parser.add_argument("--checkin-queue-size", type=int, default=checkin.DEFAULT_QUEUE_SIZE,
+                        help="check-ins waiting before POST /checkins returns 503 (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    # Apply pending migrations once, before the workers connect
+    try:
+        profiles.connect(args.db_file, args.profile, verbose=True).close()
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+
+    server = GymServer(args.db_file, args.workers, args.profile, checkin_options={
+        "batch_size": args.checkin_batch_size, "flush_interval": args.checkin_flush_ms / 1000,
+        "queue_size": args.checkin_queue_size})
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        print("[INFO] Server stopped.")
+    except OSError as e:
+        print(f"[ERROR] Could not start server: {e}")
+        return 1
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+stages.py
+-----------
+Loads the project stage scripts (3/file.py, 4/gym_management.py) as modules,
+so tools in this package can call their query functions and managers.
+The scripts live in numbered folders and cannot be imported by name.
+"""
+
+import importlib.util
+import os
+import sys
+
+from xyzgym.schema import REPO_ROOT
+
+REPORTS_FILE = os.path.join(REPO_ROOT, "3", "file.py")
+GYM_MANAGEMENT_FILE = os.path.join(REPO_ROOT, "4", "gym_management.py")
+
+
+def load_stage(path, module_name):
+    """
+    Imports a stage script from its file path (only once per process).
+
+    Args:
+        path (str): Path of the script.
+        module_name (str): Name to register the module under in sys.modules.
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
+def load_reports():
+    """Returns 3/file.py, which defines query1 ... query10."""
+    return load_stage(REPORTS_FILE, "xyzgym_reports")
+
+
+def load_gym_management():
+    """Returns 4/gym_management.py, which defines the CRUD managers."""
+    return load_stage(GYM_MANAGEMENT_FILE, "xyzgym_gym_management")
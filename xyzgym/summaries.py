@@ -0,0 +1,119 @@
+"""
+summaries.py
+-----------
+Summary tables for the count reports, kept in sync by triggers.
+
+    ClassAttendanceSummary  attendance per class     (list_classes_and_attendance)
+    GymClassSummary         classes per gym          (query2)
+    InstructorClassSummary  classes per instructor   (query8)
+
+The tables and triggers are created by schema migration 3. Triggers on
+Class and Attends adjust the counts on every insert, update and delete, so
+the reports read one row per group instead of running COUNT/GROUP BY over
+the base tables. A row exists only while its count is above zero.
+
+If the counts ever drift (e.g. rows written with the triggers dropped),
+verify() reports the difference and rebuild() recomputes everything.
+
+Usage (from the repository root):
+    python -m xyzgym.summaries 4/XYZGym.sqlite verify
+    python -m xyzgym.summaries 4/XYZGym.sqlite rebuild
+"""
+
+import argparse
+import sqlite3
+import sys
+
+from xyzgym import profiles
+from xyzgym.transaction import UnitOfWork
+
+# (table, key column, count column, query computing the true counts)
+SUMMARIES = [
+    ("ClassAttendanceSummary", "classId", "attendance", """
+        SELECT a.classId, COUNT(*) FROM Attends a
+        JOIN Class c ON c.classId = a.classId
+        GROUP BY a.classId
+    """),
+    ("GymClassSummary", "gymId", "classCount", """
+        SELECT gymId, COUNT(*) FROM Class GROUP BY gymId
+    """),
+    ("InstructorClassSummary", "instructorId", "classCount", """
+        SELECT instructorId, COUNT(*) FROM Class GROUP BY instructorId
+    """),
+]
+
+
+def verify(conn):
+    """
+    Compares every summary table with counts computed from the base tables.
+
+    Args:
+        conn: An active SQLite database connection.
+
+    Returns:
+        list: (table, key, stored count, actual count) for every row that
+        differs; a missing row has a count of None.
+    """
+    drift = []
+    for table, key, count, source in SUMMARIES:
+        stored = dict(conn.execute(f"SELECT {key}, {count} FROM {table}"))
+        actual = dict(conn.execute(source))
+        for group in sorted(stored.keys() | actual.keys()):
+            if stored.get(group) != actual.get(group):
+                drift.append((table, group, stored.get(group), actual.get(group)))
+    return drift
+
+
+def rebuild(conn, uow=None):
+    """
+    Recomputes every summary table from the base tables in one transaction.
+
+    Args:
+        conn: An active SQLite database connection.
+        uow (UnitOfWork): Transaction manager to use, if the caller has one.
+
+    Returns:
+        dict: Number of rows written to each summary table.
+    """
+    uow = uow if uow is not None else UnitOfWork(conn)
+    written = {}
+    with uow:
+        for table, key, count, source in SUMMARIES:
+            conn.execute(f"DELETE FROM {table}")
+            cursor = conn.execute(f"INSERT INTO {table} ({key}, {count}) {source}")
+            written[table] = cursor.rowcount
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify or rebuild the summary tables.")
+    parser.add_argument("db_file")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    args = parser.parse_args(argv)
+
+    try:
+        conn = profiles.connect(args.db_file, verbose=False)
+    except (ValueError, sqlite3.Error) as e:
+        print(f"[ERROR] Could not connect to database: {e}")
+        return 1
+    try:
+        drift = verify(conn)
+        print(f"[INFO] {len(drift)} summary row(s) out of sync.")
+        for table, group, stored, actual in drift[:20]:
+            print(f"{table} | {group} | stored {stored} | actual {actual}")
+        if len(drift) > 20:
+            print(f"... and {len(drift) - 20} more")
+        if args.command == "rebuild":
+            for table, rows in rebuild(conn).items():
+                print(f"[INFO] Rebuilt {table}: {rows} row(s)")
+            return 0
+        return 1 if drift else 0
+    except sqlite3.Error as e:
+        print(f"[ERROR] Summary {args.command} failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
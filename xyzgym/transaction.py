@@ -0,0 +1,102 @@
+"""
+transaction.py
+-----------
+Unit-of-work transaction manager shared by the CRUD managers.
+
+Every logical operation (add a member with its payment, reassign and delete
+a class, ...) runs inside "with uow:" and is committed once, atomically.
+Scopes can be nested: an inner scope becomes a SAVEPOINT, so a failed step
+is rolled back on its own while the outer transaction carries on. Wrapping
+several operations in uow.batch() makes them share a single commit.
+"""
+
+import sqlite3
+
+
+class UnitOfWork:
+    """
+    Groups the writes made on one connection into atomic transactions.
+
+    Use one UnitOfWork per connection and share it between the managers so
+    nesting works across them.
+    """
+    def __init__(self, conn):
+        """
+        Args:
+            conn: An active SQLite database connection.
+        """
+        self.conn = conn
+        self.depth = 0
+        self.commits = 0
+        self.rollbacks = 0
+        # One entry per open scope: the savepoint name, or None for the
+        # scope that owns the transaction
+        self._scopes = []
+        self._savepoint_seq = 0
+
+    def __enter__(self):
+        if not self._scopes and not self.conn.in_transaction:
+            # Take the write lock up front so the transaction never has to
+            # upgrade from a read lock (a common source of SQLITE_BUSY)
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._scopes.append(None)
+        else:
+            # Nested scope, or a transaction opened by someone else:
+            # protect just this step with a savepoint
+            self._savepoint_seq += 1
+            name = f"uow_{self._savepoint_seq}"
+            self.conn.execute(f"SAVEPOINT {name}")
+            self._scopes.append(name)
+        self.depth = len(self._scopes)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        name = self._scopes.pop()
+        self.depth = len(self._scopes)
+        try:
+            if name is None:
+                if exc_type is None:
+                    try:
+                        self.conn.commit()
+                    except sqlite3.Error:
+                        # A failed COMMIT (SQLITE_BUSY, a deferred constraint)
+                        # leaves the transaction open; later scopes would
+                        # nest inside it and never commit
+                        if self.conn.in_transaction:
+                            self.conn.rollback()
+                        self.rollbacks += 1
+                        raise
+                    self.commits += 1
+                else:
+                    self.conn.rollback()
+                    self.rollbacks += 1
+            elif exc_type is None:
+                self.conn.execute(f"RELEASE SAVEPOINT {name}")
+            else:
+                self.conn.execute(f"ROLLBACK TO SAVEPOINT {name}")
+                self.conn.execute(f"RELEASE SAVEPOINT {name}")
+                self.rollbacks += 1
+        except sqlite3.Error:
+            if exc_type is None:
+                raise
+            # Keep the original error; the transaction is gone anyway
+        return False
+
+    def batch(self):
+        """
+        Returns a scope that groups several operations into one commit.
+
+        Operations run inside the batch become savepoints: if one fails
+        (and its error is handled), only that operation is undone. Nothing
+        is written to disk until the batch ends.
+
+            with uow.batch():
+                manager.create_member(...)
+                manager.create_member(...)
+        """
+        return self
+
+    @property
+    def active(self):
+        """True while a scope is open."""
+        return bool(self._scopes)